@@ -0,0 +1,115 @@
+r"""
+benchmarks/bench_bulk_load.py
+
+Compare the bulk loader in scripts/dw_bulk_loader.py with the pandas to_sql path
+used by insert_sales() when loading the sale table.
+
+Each size is loaded into a fresh temporary database with the warehouse schema.
+Rows are generated and inserted in slices, so memory stays bounded even at 50M rows.
+
+How to Run (from the root project folder, with the .venv active):
+
+    py benchmarks\bench_bulk_load.py
+    python3 benchmarks/bench_bulk_load.py --sizes 1000000 10000000 --skip-to-sql-above 10000000
+"""
+
+import argparse
+import pathlib
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.dw_bulk_loader import apply_load_pragmas, bulk_insert, deferred_indexes  # noqa: E402
+from scripts.etl_to_dw import create_schema, insert_sales  # noqa: E402
+from utils.dates import date_keys  # noqa: E402
+
+DEFAULT_SIZES = [1_000_000, 10_000_000, 50_000_000]
+SLICE_ROWS = 1_000_000
+
+
+def make_sales_slice(start: int, rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Generate one slice of synthetic sale rows with the warehouse sale schema (keys and measures)."""
+    dates = pd.Series(pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1826, rows), unit="D"))
+    return pd.DataFrame({
+        "sale_id": np.arange(start, start + rows),
+        "customer_id": rng.integers(1000, 101000, rows),
+        "product_id": rng.integers(100, 10100, rows),
+        "store_key": rng.integers(1, 51, rows),
+        "campaign_key": rng.integers(1, 11, rows),
+        "payment_type_key": rng.integers(1, 4, rows),
+        "date_key": date_keys(dates).astype("int64"),
+        "sale_amount": rng.gamma(2.0, 60.0, rows).round(2),
+        "discount_percent": rng.integers(0, 51, rows).astype(float),
+    })
+
+
+def run_load(method: str, total_rows: int, db_path: pathlib.Path) -> float:
+    """
+    Load total_rows synthetic sales with the given method and return the seconds spent loading.
+
+    Time spent generating the slices is not counted.
+    """
+    rng = np.random.default_rng(42)
+    conn = sqlite3.connect(db_path)
+    try:
+        if method == "bulk":
+            apply_load_pragmas(conn)
+        cursor = conn.cursor()
+        create_schema(cursor)
+        conn.commit()
+
+        slices = (make_sales_slice(start, min(SLICE_ROWS, total_rows - start), rng)
+                  for start in range(0, total_rows, SLICE_ROWS))
+        elapsed = 0.0
+        if method == "bulk":
+            cursor.execute("BEGIN")
+            start_time = time.perf_counter()
+            with deferred_indexes(cursor, ["sale"]):
+                elapsed += time.perf_counter() - start_time
+                for sales_df in slices:
+                    start_time = time.perf_counter()
+                    bulk_insert(sales_df, "sale", cursor)
+                    elapsed += time.perf_counter() - start_time
+                # Rebuilding the indexes on exit and the commit count too
+                start_time = time.perf_counter()
+            conn.commit()
+            elapsed += time.perf_counter() - start_time
+        else:
+            for sales_df in slices:
+                start_time = time.perf_counter()
+                insert_sales(sales_df, cursor)
+                elapsed += time.perf_counter() - start_time
+        return elapsed
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark bulk loading against DataFrame.to_sql.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="sale row counts to load")
+    parser.add_argument("--skip-to-sql-above", type=int, default=None,
+                        help="skip the to_sql path for sizes larger than this")
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'to_sql (s)':>12} {'bulk (s)':>12} {'speedup':>9}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            bulk_seconds = run_load("bulk", size, pathlib.Path(temp_dir).joinpath("bulk.db"))
+            if args.skip_to_sql_above is not None and size > args.skip_to_sql_above:
+                print(f"{size:>12,} {'skipped':>12} {bulk_seconds:>12.2f} {'-':>9}")
+                continue
+            to_sql_seconds = run_load("to_sql", size, pathlib.Path(temp_dir).joinpath("to_sql.db"))
+        print(f"{size:>12,} {to_sql_seconds:>12.2f} {bulk_seconds:>12.2f} {to_sql_seconds / bulk_seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+r"""
+benchmarks/bench_concurrent_reads.py
+
+Measure how readers fare while a load writes to the warehouse.
+
+A writer thread appends synthetic sales to the sale table in one transaction, the way
+etl_to_dw.py loads, while N reader threads repeatedly run a date-range query (pausing
+between queries, like a dashboard refreshing). Two setups are compared:
+
+- per-call: rollback-journal mode, and every read opens and closes its own connection
+  (how the scripts accessed the warehouse before scripts/dw_access.py)
+- pooled:   WAL mode, readers borrow pooled read-only connections from dw_access.py
+
+For each it reports the reads completed during the load, their median and worst latency,
+and how long the load itself took. On few CPUs, readers that are not blocked compete
+with the load for CPU time, so the load takes longer when they can run.
+
+How to Run (from the root project folder, with the .venv active):
+
+    py benchmarks\bench_concurrent_reads.py
+    python3 benchmarks/bench_concurrent_reads.py --readers 1 4 8 --rows 2000000 --pause-ms 20
+"""
+
+import argparse
+import pathlib
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts import dw_access  # noqa: E402
+from scripts.dw_bulk_loader import bulk_insert  # noqa: E402
+from scripts.etl_to_dw import create_schema  # noqa: E402
+from utils.dates import date_keys  # noqa: E402
+
+DEFAULT_READERS = [1, 4]
+SLICE_ROWS = 100_000
+READ_QUERY = """
+    SELECT COUNT(*), SUM(sale_amount)
+    FROM sale
+    WHERE date_key BETWEEN ? AND ?
+"""
+
+
+def make_sales(start: int, rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Generate synthetic sale fact rows with sale_ids from start."""
+    dates = pd.Series(pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1826, rows), unit="D"))
+    return pd.DataFrame({
+        "sale_id": np.arange(start, start + rows),
+        "customer_id": rng.integers(1000, 11000, rows),
+        "product_id": rng.integers(100, 1100, rows),
+        "date_key": date_keys(dates).astype("int64"),
+        "sale_amount": rng.gamma(2.0, 60.0, rows).round(2),
+    })
+
+
+def create_warehouse(db_path: pathlib.Path, journal_mode: str, rows: int) -> None:
+    """Create the schema and the sales already in the warehouse before the load."""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+        create_schema(conn.cursor())
+        bulk_insert(make_sales(0, rows, np.random.default_rng(1)), "sale", conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def read_per_call(db_path: pathlib.Path) -> None:
+    conn = sqlite3.connect(db_path, timeout=dw_access.BUSY_TIMEOUT)
+    try:
+        conn.execute(READ_QUERY, (20210101, 20211231)).fetchone()
+    finally:
+        conn.close()
+
+
+def read_pooled(db_path: pathlib.Path) -> None:
+    with dw_access.reader(db_path) as conn:
+        conn.execute(READ_QUERY, (20210101, 20211231)).fetchone()
+
+
+def load_sales(db_path: pathlib.Path, pooled: bool, start: int, rows: int) -> None:
+    """Append rows sales in one transaction, in slices."""
+    rng = np.random.default_rng(2)
+    if pooled:
+        with dw_access.writer(db_path) as conn:
+            for offset in range(0, rows, SLICE_ROWS):
+                bulk_insert(make_sales(start + offset, min(SLICE_ROWS, rows - offset), rng), "sale", conn.cursor())
+        return
+    conn = sqlite3.connect(db_path, timeout=dw_access.BUSY_TIMEOUT)
+    try:
+        for offset in range(0, rows, SLICE_ROWS):
+            bulk_insert(make_sales(start + offset, min(SLICE_ROWS, rows - offset), rng), "sale", conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run(setup: str, readers: int, base_rows: int, load_rows: int, pause: float) -> dict:
+    """Run one load with concurrent readers and return the read and load statistics."""
+    pooled = setup == "pooled"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = pathlib.Path(temp_dir).joinpath("bench.db")
+        create_warehouse(db_path, "WAL" if pooled else "DELETE", base_rows)
+        read = read_pooled if pooled else read_per_call
+
+        loaded = threading.Event()
+        latencies, errors = [], []
+
+        def read_until_loaded() -> None:
+            while not loaded.is_set():
+                start_time = time.perf_counter()
+                try:
+                    read(db_path)
+                    latencies.append(time.perf_counter() - start_time)
+                except sqlite3.OperationalError as e:
+                    errors.append(str(e))
+                loaded.wait(pause)
+
+        threads = [threading.Thread(target=read_until_loaded) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        start_time = time.perf_counter()
+        load_sales(db_path, pooled, base_rows, load_rows)
+        load_seconds = time.perf_counter() - start_time
+        loaded.set()
+        for thread in threads:
+            thread.join()
+        dw_access.close_pools(db_path)
+
+    return {
+        "reads": len(latencies),
+        "median_ms": 1000 * float(np.median(latencies)) if latencies else float("nan"),
+        "max_ms": 1000 * max(latencies) if latencies else float("nan"),
+        "errors": len(errors),
+        "load_s": load_seconds,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark warehouse reads during a load.")
+    parser.add_argument("--readers", type=int, nargs="+", default=DEFAULT_READERS, help="reader thread counts")
+    parser.add_argument("--base-rows", type=int, default=200_000, help="sales in the warehouse before the load")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="sales appended by the load")
+    parser.add_argument("--pause-ms", type=float, default=100.0, help="pause of each reader between queries")
+    args = parser.parse_args()
+
+    print(f"{'setup':>9} {'readers':>8} {'reads':>7} {'median (ms)':>12} {'max (ms)':>10} {'errors':>7} {'load (s)':>9}")
+    for readers in args.readers:
+        for setup in ("per-call", "pooled"):
+            stats = run(setup, readers, args.base_rows, args.rows, args.pause_ms / 1000)
+            print(f"{setup:>9} {readers:>8} {stats['reads']:>7} {stats['median_ms']:>12.1f} {stats['max_ms']:>10.1f} "
+                  f"{stats['errors']:>7} {stats['load_s']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
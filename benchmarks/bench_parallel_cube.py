@@ -0,0 +1,83 @@
+r"""
+benchmarks/bench_parallel_cube.py
+
+Compare the serial create_olap_cube() groupby with the multi-core path in
+scripts/olap/parallel_cube.py at several worker counts.
+
+The sales are synthetic and already hold the cube dimensions, so only aggregation is
+timed (not reading the warehouse). Every parallel cube is checked to be identical to
+the serial one before its time is reported.
+
+How to Run (from the root project folder, with the .venv active):
+
+    py benchmarks\bench_parallel_cube.py
+    python3 benchmarks/bench_parallel_cube.py --rows 20000000 --workers 1 8 16 32 64
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.olap.olap_cubing import CUBE_DIMENSIONS, CUBE_METRICS, create_olap_cube  # noqa: E402
+
+DEFAULT_ROWS = 5_000_000
+REGIONS = 5
+
+
+def make_sales(rows: int, products: int, seed: int = 42) -> pd.DataFrame:
+    """Generate synthetic sales with the cube dimensions (integer keys) already derived."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "sale_id": np.arange(rows),
+        "Year": rng.integers(2020, 2026, rows),
+        "Month": rng.integers(1, 13, rows),
+        "region_key": rng.integers(1, REGIONS + 1, rows),
+        "product_id": rng.integers(100, 100 + products, rows),
+        "sale_amount": rng.gamma(2.0, 60.0, rows).round(2),
+    })
+
+
+def time_cube(sales_df: pd.DataFrame, workers: int, partition_by: str) -> tuple:
+    """Build the cube and return (seconds, cube)."""
+    start_time = time.perf_counter()
+    cube = create_olap_cube(sales_df, CUBE_DIMENSIONS, CUBE_METRICS, workers=workers, partition_by=partition_by)
+    return time.perf_counter() - start_time, cube
+
+
+def main() -> None:
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Benchmark serial against multi-core OLAP cube aggregation.")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="number of synthetic sales")
+    parser.add_argument("--products", type=int, default=10_000, help="number of distinct products")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({2 ** power for power in range(cpus.bit_length()) if 2 ** power <= cpus} | {cpus}),
+                        help="worker counts to time")
+    parser.add_argument("--partition-by", default="product_id", help="cube dimension to partition on")
+    args = parser.parse_args()
+
+    sales_df = make_sales(args.rows, args.products)
+    serial_seconds, serial_cube = time_cube(sales_df, 1, args.partition_by)
+
+    print(f"{args.rows:,} sales, {len(serial_cube):,} cells, partitioned by {args.partition_by}, {cpus} CPUs")
+    print(f"{'workers':>8} {'seconds':>10} {'speedup':>9}")
+    print(f"{'serial':>8} {serial_seconds:>10.2f} {1.0:>8.1f}x")
+    for workers in args.workers:
+        if workers == 1:
+            continue
+        seconds, cube = time_cube(sales_df, workers, args.partition_by)
+        pd.testing.assert_frame_equal(cube, serial_cube, check_exact=True)
+        print(f"{workers:>8} {seconds:>10.2f} {serial_seconds / seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
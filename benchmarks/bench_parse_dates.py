@@ -0,0 +1,64 @@
+r"""
+benchmarks/bench_parse_dates.py
+
+Compare parse_dates() in utils/dates.py with the pd.to_datetime(errors="coerce") call
+the sales prep used before, on M/D/YYYY strings like the raw sales file.
+
+Both results are checked to be identical before the times are reported.
+
+How to Run (from the root project folder, with the .venv active):
+
+    py benchmarks\bench_parse_dates.py
+    python3 benchmarks/bench_parse_dates.py --rows 1000000 5000000 --days 4000
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.dates import parse_dates  # noqa: E402
+
+DEFAULT_ROWS = [1_000_000]
+
+
+def make_dates(rows: int, days: int, seed: int = 42) -> pd.Series:
+    """Generate M/D/YYYY strings drawn from the given number of distinct days."""
+    rng = np.random.default_rng(seed)
+    calendar = pd.date_range("2015-01-01", periods=days, freq="D")
+    labels = np.array([f"{day.month}/{day.day}/{day.year}" for day in calendar], dtype=object)
+    return pd.Series(labels[rng.integers(0, days, rows)])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark parse_dates against pd.to_datetime.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="date strings to parse")
+    parser.add_argument("--days", type=int, default=4000, help="distinct dates among them")
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'to_datetime (s)':>16} {'parse_dates (s)':>16} {'speedup':>9}")
+    for rows in args.rows:
+        values = make_dates(rows, args.days)
+
+        start_time = time.perf_counter()
+        expected = pd.to_datetime(values, errors="coerce")
+        inferred_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        actual = parse_dates(values, errors="coerce")
+        parse_seconds = time.perf_counter() - start_time
+
+        pd.testing.assert_series_equal(actual, expected, check_dtype=False)
+        print(f"{rows:>12,} {inferred_seconds:>16.2f} {parse_seconds:>16.2f} {inferred_seconds / parse_seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+r"""
+benchmarks/bench_pipeline.py
+
+Time every pipeline stage on synthetic data at several scales, and keep the results
+so runs on different commits can be compared.
+
+For each scale a temporary project folder gets a copy of scripts/ and utils/ and a
+set of raw files from generate_raw_data.py. The whole pipeline (scripts/run_pipeline.py)
+then runs there from scratch, so nothing in this checkout's data/ is touched.
+Besides the wall time of each stage, the per-function metrics the stages record
+(utils/metrics.py) are kept: wall and CPU time, peak memory and rows.
+
+Every result is appended as a JSON line to benchmarks/results/pipeline.jsonl, tagged
+with the git commit (marked +dirty with uncommitted changes), the machine and the
+time. --compare prints the median time per stage and function of the current commit
+next to a baseline commit (by default the one benchmarked before it) and marks what
+got slower by more than --threshold and by at least --min-seconds (so millisecond
+functions do not flag noise); the script then exits with status 1.
+
+Above about 10^7 sales, pass --chunksize so the prep scripts stream the raw files;
+the warehouse load still reads each prepared table whole.
+
+How to Run (from the root project folder, with the .venv active):
+
+    py benchmarks\bench_pipeline.py
+    python3 benchmarks/bench_pipeline.py --scales 10000 100000 1000000 --repeat 3
+    python3 benchmarks/bench_pipeline.py --compare --baseline 4f30ab3
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from benchmarks.generate_raw_data import generate_raw_data  # noqa: E402
+from scripts.run_pipeline import STAGES, Stage, run_pipeline  # noqa: E402
+from utils.metrics import RUN_ID, read_metrics  # noqa: E402
+
+DEFAULT_SCALES = [10_000, 100_000, 1_000_000]
+RESULTS_FILE = PROJECT_ROOT.joinpath("benchmarks", "results", "pipeline.jsonl")
+CODE_FOLDERS = ["scripts", "utils"]
+PREP_STAGES = {"prepare_customers", "prepare_products", "prepare_sales"}
+# Status of the rows worth comparing: stages that ran (not skipped, failed or blocked), functions that returned
+COMPARED_STATUSES = {"stage": "ran", "function": "ok"}
+
+
+def git_commit() -> str:
+    """Return the short hash of HEAD, with +dirty if the tree has uncommitted changes ("unknown" outside git)."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, check=True,
+                                capture_output=True, text=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=PROJECT_ROOT,
+                                check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}+dirty" if status else commit
+
+
+def machine() -> str:
+    """Describe the machine, so results from different machines are not compared by mistake."""
+    return f"{platform.node()} {platform.machine()} {os.cpu_count()} CPUs Python {platform.python_version()}"
+
+
+def pipeline_stages(chunksize: Optional[int]) -> List[Stage]:
+    """The pipeline stages, with the prep scripts streaming in chunks when chunksize is given."""
+    if not chunksize:
+        return STAGES
+    return [stage._replace(args=["--chunksize", str(chunksize)]) if stage.name in PREP_STAGES else stage
+            for stage in STAGES]
+
+
+def bench_scale(scale: int, seed: int, workers: int, chunksize: Optional[int]) -> List[Dict[str, object]]:
+    """
+    Run the pipeline once on scale synthetic sales in a temporary project folder.
+
+    Returns:
+        list: One result per stage (kind "stage") and per instrumented function (kind "function").
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = pathlib.Path(temp_dir)
+        for folder in CODE_FOLDERS:
+            shutil.copytree(PROJECT_ROOT.joinpath(folder), root.joinpath(folder),
+                            ignore=shutil.ignore_patterns("__pycache__"))
+        generate_raw_data(root.joinpath("data", "raw"), scale, seed)
+
+        stage_results = run_pipeline(pipeline_stages(chunksize), workers=workers, force=True, root=root)
+        # The stages log under the temporary root unless SMART_LOG_DIR moves their logs (as in the tests)
+        log_dir = root.joinpath(os.environ.get("SMART_LOG_DIR", "logs"))
+        functions = read_metrics(log_dir.joinpath("metrics.jsonl"), RUN_ID)
+
+    results = [{"kind": "stage", "name": name, "status": result["status"], "seconds": round(result["seconds"], 3)}
+               for name, result in stage_results.items()]
+    for record in functions.to_dict("records"):
+        results.append({
+            "kind": "function", "name": record["stage"], "status": record["status"],
+            "seconds": round(record["wall_s"], 3), "cpu_s": record["cpu_s"], "peak_rss_mb": record.get("peak_rss_mb"),
+            "rows_in": None if pd.isna(record["rows_in"]) else int(record["rows_in"]),
+            "rows_out": None if pd.isna(record["rows_out"]) else int(record["rows_out"]),
+        })
+    return results
+
+
+def append_results(results: List[Dict[str, object]], results_file: pathlib.Path) -> None:
+    results_file.parent.mkdir(parents=True, exist_ok=True)
+    with results_file.open("a") as file:
+        for result in results:
+            file.write(json.dumps(result, default=str) + "\n")
+
+
+def compare(results_file: pathlib.Path, current: str, baseline: Optional[str], threshold: float,
+            min_seconds: float) -> pd.DataFrame:
+    """
+    Compare the median seconds per scale, kind and name of two commits.
+
+    Args:
+        results_file (pathlib.Path): Stored benchmark results.
+        current (str): Commit to check.
+        baseline (str, optional): Commit to compare with; default the latest other commit in the file.
+        threshold (float): Slowdown (0.1 = 10%) above which a row is marked as a regression.
+        min_seconds (float): Smallest slowdown in seconds marked as a regression.
+
+    Returns:
+        pd.DataFrame: baseline_s, current_s, ratio and regression per (scale, kind, name), on
+        this machine only; empty if either commit has no results here.
+    """
+    results = pd.read_json(results_file, lines=True, dtype={"commit": str})
+    results = results[(results["machine"] == machine()) & (results["status"] == results["kind"].map(COMPARED_STATUSES))]
+    if baseline is None:
+        others = results.loc[results["commit"] != current, "commit"]
+        if others.empty:
+            return pd.DataFrame()
+        baseline = others.iloc[-1]
+
+    keys = ["scale", "kind", "name"]
+    medians = results[results["commit"].isin([baseline, current])].groupby(keys + ["commit"])["seconds"].median()
+    table = medians.unstack("commit")
+    if baseline not in table.columns or current not in table.columns:
+        return pd.DataFrame()
+    table = table[[baseline, current]].dropna().set_axis(["baseline_s", "current_s"], axis=1)
+    table["ratio"] = table["current_s"] / table["baseline_s"]
+    table["regression"] = (table["ratio"] > 1 + threshold) & (table["current_s"] - table["baseline_s"] >= min_seconds)
+    table.attrs["baseline"] = baseline
+    return table
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="sales rows per run")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scale")
+    parser.add_argument("--seed", type=int, default=42, help="seed of the synthetic data")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="stages run at the same time (1 keeps stage timings independent)")
+    parser.add_argument("--chunksize", type=int, default=None, help="stream the prep scripts in chunks of this size")
+    parser.add_argument("--results", type=pathlib.Path, default=RESULTS_FILE, help="results file (JSON lines)")
+    parser.add_argument("--compare", action="store_true", help="only compare stored results, without running")
+    parser.add_argument("--baseline", default=None, help="commit to compare with (default: the previous one)")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown reported as a regression")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="smallest slowdown reported, in seconds")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    if not args.compare:
+        for scale in args.scales:
+            for run in range(args.repeat):
+                tags = {"commit": commit, "machine": machine(), "timestamp": datetime.now().isoformat(timespec="seconds"),
+                        "scale": scale, "run": run, "seed": args.seed, "chunksize": args.chunksize}
+                results = [{**tags, **result} for result in bench_scale(scale, args.seed, args.workers, args.chunksize)]
+                append_results(results, args.results)
+                for result in results:
+                    if result["kind"] == "stage":
+                        print(f"{scale:>12,} {result['name']:<26} {result['status']:<8} {result['seconds']:>9.2f} s")
+
+    table = compare(args.results, commit, args.baseline, args.threshold, args.min_seconds) if args.results.exists() else pd.DataFrame()
+    if table.empty:
+        print(f"No earlier commit with results on this machine to compare {commit} with.")
+        return
+    print(f"\n{commit} compared with {table.attrs['baseline']} (regression: more than {args.threshold:.0%} slower)")
+    print(table.round(3).to_string())
+    if table["regression"].any():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+r"""
+benchmarks/bench_sql_cube.py
+
+Compare the OLAP cube aggregated inside SQLite (scripts/olap/sql_cube.py) with the
+pandas path (read every sale with SALES_CUBE_QUERY, then create_olap_cube).
+
+Each size is loaded into a fresh temporary warehouse with synthetic customers, products
+and sales. Both cubes are checked to be equal before the times are reported.
+
+How to Run (from the root project folder, with the .venv active):
+
+    py benchmarks\bench_sql_cube.py
+    python3 benchmarks/bench_sql_cube.py --sizes 1000000 5000000 --products 10000
+"""
+
+import argparse
+import pathlib
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.dw_bulk_loader import bulk_load  # noqa: E402
+from scripts.etl_to_dw import create_schema, insert_date_dimension, lookup_dimension_keys  # noqa: E402
+from scripts.olap.olap_cubing import (  # noqa: E402
+    CUBE_DIMENSIONS, CUBE_METRICS, SALES_CUBE_QUERY, add_time_dimensions, create_olap_cube,
+)
+from scripts.olap.sql_cube import create_sql_cube  # noqa: E402
+from utils.dates import date_keys  # noqa: E402
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+CUSTOMERS = 10_000
+REGIONS = pd.Series(["East", "West", "North", "South", "Central"])
+
+
+def build_warehouse(db_path: pathlib.Path, rows: int, products: int, seed: int = 42) -> None:
+    """Create a warehouse with synthetic customers, products and rows sales."""
+    rng = np.random.default_rng(seed)
+    dates = pd.Series(pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1826, rows), unit="D"))
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        create_schema(cursor)
+        customer_regions = REGIONS[rng.integers(0, len(REGIONS), CUSTOMERS)].reset_index(drop=True)
+        customers_df = pd.DataFrame({
+            "customer_id": np.arange(1000, 1000 + CUSTOMERS),
+            "region_key": lookup_dimension_keys(customer_regions, ("region_dim", "region_key", "region_name"), cursor),
+        })
+        products_df = pd.DataFrame({
+            "product_id": np.arange(100, 100 + products),
+            "product_name": [f"product_{number:05d}" for number in range(products)],
+        })
+        sales_df = pd.DataFrame({
+            "sale_id": np.arange(rows),
+            "customer_id": rng.integers(1000, 1000 + CUSTOMERS, rows),
+            "product_id": rng.integers(100, 100 + products, rows),
+            "date_key": date_keys(dates).astype("int64"),
+            "sale_amount": rng.gamma(2.0, 60.0, rows).round(2),
+        })
+        insert_date_dimension(sales_df["date_key"], cursor)
+        bulk_load(conn, {"customer": customers_df, "product": products_df, "sale": sales_df})
+    finally:
+        conn.close()
+
+
+def pandas_cube(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Read every sale into pandas and aggregate there."""
+    sales_df = add_time_dimensions(pd.read_sql_query(SALES_CUBE_QUERY, conn))
+    return create_olap_cube(sales_df, CUBE_DIMENSIONS, CUBE_METRICS)
+
+
+def sql_cube(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Aggregate inside SQLite and read only the cube cells."""
+    return create_sql_cube(conn, CUBE_DIMENSIONS, CUBE_METRICS)
+
+
+def time_cube(build, db_path: pathlib.Path) -> tuple:
+    """Build a cube on a fresh connection and return (seconds, cube)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        start_time = time.perf_counter()
+        cube = build(conn)
+        return time.perf_counter() - start_time, cube
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite GROUP BY cube against the pandas path.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="sale row counts")
+    parser.add_argument("--products", type=int, default=100, help="number of distinct products")
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'cells':>9} {'pandas (s)':>11} {'sql (s)':>9} {'speedup':>9}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = pathlib.Path(temp_dir).joinpath("bench.db")
+            build_warehouse(db_path, size, args.products)
+            pandas_seconds, expected = time_cube(pandas_cube, db_path)
+            sql_seconds, actual = time_cube(sql_cube, db_path)
+
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+        print(f"{size:>12,} {len(actual):>9,} {pandas_seconds:>11.2f} {sql_seconds:>9.2f} "
+              f"{pandas_seconds / sql_seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+r"""
+benchmarks/bench_top_k.py
+
+Compare top_k_per_group() in scripts/olap/top_k.py with the sort_values +
+groupby(...).head(k) approach the goal scripts used before.
+
+The cube cells are synthetic, with the dimensions of the OLAP cube. Both results are
+checked to be identical (ties go to the first cell in table order) before the times
+are reported.
+
+How to Run (from the root project folder, with the .venv active):
+
+    py benchmarks\bench_top_k.py
+    python3 benchmarks/bench_top_k.py --cells 1000000 5000000 --k 3 10
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.olap.top_k import top_k_per_group  # noqa: E402
+
+DEFAULT_CELLS = [1_000_000, 5_000_000]
+GROUP_KEYS = ["Year", "Month", "region"]
+REGIONS = np.array(["East", "West", "North", "South", "Central"], dtype=object)
+
+
+def make_cube(cells: int, seed: int = 42) -> pd.DataFrame:
+    """Generate synthetic cube cells; sale counts are small integers, so ties are common."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Year": rng.integers(2015, 2026, cells),
+        "Month": rng.integers(1, 13, cells),
+        "region": REGIONS[rng.integers(0, len(REGIONS), cells)],
+        "product_name": [f"product_{number}" for number in rng.integers(0, 100_000, cells)],
+        "sale_id_count": rng.poisson(20, cells),
+    })
+
+
+def sort_head(cube: pd.DataFrame, metric: str, k: int) -> pd.DataFrame:
+    """The previous approach: sort every cell, then keep the first k per group."""
+    sorted_df = cube.sort_values(by=GROUP_KEYS + [metric], ascending=[True] * len(GROUP_KEYS) + [False], kind="stable")
+    return sorted_df.groupby(GROUP_KEYS).head(k).reset_index(drop=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark top-k per group against sort + head.")
+    parser.add_argument("--cells", type=int, nargs="+", default=DEFAULT_CELLS, help="cube cell counts")
+    parser.add_argument("--k", type=int, nargs="+", default=[3], help="rows kept per group")
+    args = parser.parse_args()
+
+    print(f"{'cells':>12} {'k':>4} {'sort+head (s)':>14} {'top_k (s)':>10} {'speedup':>9}")
+    for cells in args.cells:
+        cube = make_cube(cells)
+        for k in args.k:
+            start_time = time.perf_counter()
+            expected = sort_head(cube, "sale_id_count", k)
+            sort_seconds = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            actual = top_k_per_group(cube, GROUP_KEYS, "sale_id_count", k)
+            top_k_seconds = time.perf_counter() - start_time
+
+            pd.testing.assert_frame_equal(actual, expected)
+            print(f"{cells:>12,} {k:>4} {sort_seconds:>14.2f} {top_k_seconds:>10.2f} {sort_seconds / top_k_seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+r"""
+benchmarks/generate_raw_data.py
+
+Generate synthetic raw customers, products and sales files at any scale.
+
+The files have the same columns and formats as data/raw (M/D/YYYY dates, raw header
+names) and the same kinds of problems the prep scripts clean up, so the whole pipeline
+runs on them unchanged:
+
+- duplicates: about 1% of the rows repeat an earlier row, some across sales batches
+- nulls: missing LastActiveYear, PreferredContactMethod, StockQuantity and DiscountPercent
+- outliers: LastActiveYear outside 2020-2025, StockQuantity outside 0-250 and
+  DiscountPercent outside 0-50
+- messy labels: payment types and store sections in mixed case with stray spaces
+
+The data is skewed like real sales: a few customers and products account for most
+sales (Zipf-like weights), most sales run without a campaign, and November, December
+and weekends sell more. With the same seed and row count the files are identical.
+
+Customers and products scale with the sales (one customer per 100 sales, one product
+per 1,000, up to 100,000). Sales are generated and appended in batches, so 10^8 rows
+need no more memory than one batch.
+
+How to Run (from the root project folder, with the .venv active):
+
+    py benchmarks\generate_raw_data.py --rows 1000000 --out data\synthetic\raw
+    python3 benchmarks/generate_raw_data.py --rows 100000000 --out /tmp/raw --seed 7
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+
+BATCH_ROWS = 1_000_000
+FIRST_CUSTOMER_ID = 1001
+FIRST_PRODUCT_ID = 101
+FIRST_SALE_ID = 550
+DATES = pd.date_range("2020-01-01", "2025-12-31", freq="D")
+
+DUPLICATE_SHARE = 0.01
+NULL_SHARE = 0.02
+OUTLIER_SHARE = 0.005
+MESSY_LABEL_SHARE = 0.05
+
+REGIONS = {"East": 0.35, "West": 0.25, "North": 0.2, "South": 0.15, "Central": 0.05}
+CONTACT_METHODS = {"Email": 0.5, "Phone": 0.35, "Text": 0.15}
+FIRST_NAMES = ["William", "Olivia", "Liam", "Emma", "Noah", "Ava", "James", "Mia", "Lucas", "Sofia",
+               "Mason", "Amelia", "Ethan", "Harper", "Logan", "Ella", "Jacob", "Aria", "Elijah", "Chloe"]
+LAST_NAMES = ["White", "Smith", "Johnson", "Brown", "Garcia", "Miller", "Davis", "Lopez", "Wilson", "Moore",
+              "Taylor", "Clark", "Lewis", "Walker", "Young", "King", "Scott", "Green", "Baker", "Adams"]
+# Category -> (product nouns, median unit price)
+CATEGORIES = {
+    "Electronics": (["laptop", "phone", "tablet", "monitor", "headphones", "camera"], 350.0),
+    "Clothing": (["hoodie", "jacket", "cap", "jeans", "sneakers", "scarf"], 40.0),
+    "Sports": (["football", "racket", "yoga mat", "bike helmet", "dumbbells"], 30.0),
+    "Home": (["lamp", "blender", "kettle", "pillow", "rug"], 55.0),
+}
+STORE_SECTIONS = ["A", "B", "C", "D", "E", "F"]
+STORES = {401: 0.3, 402: 0.25, 403: 0.2, 404: 0.12, 405: 0.08, 406: 0.05}
+CAMPAIGNS = {0: 0.6, 1: 0.2, 2: 0.12, 3: 0.08}
+PAYMENT_TYPES = {"Credit": 0.45, "Debit": 0.25, "Cash": 0.2, "Gift Card": 0.1}
+DISCOUNTS = np.array([0, 5, 10, 15, 20, 25])
+
+
+def choice(rng: np.random.Generator, weights: Dict, size: int) -> np.ndarray:
+    """Draw size values from the keys of weights, with the values as probabilities."""
+    return rng.choice(np.array(list(weights)), size=size, p=np.array(list(weights.values())))
+
+
+def skewed_weights(rng: np.random.Generator, count: int, exponent: float) -> np.ndarray:
+    """Zipf-like probabilities for count items in random order (a few items get most of the draws)."""
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return rng.permutation(weights / weights.sum())
+
+
+def date_labels(dates: pd.DatetimeIndex) -> np.ndarray:
+    """Format dates as M/D/YYYY without leading zeros, like the raw files."""
+    return (dates.month.astype(str) + "/" + dates.day.astype(str) + "/" + dates.year.astype(str)).to_numpy()
+
+
+def mask(rng: np.random.Generator, size: int, share: float) -> np.ndarray:
+    """Pick about share of size rows at random."""
+    return rng.random(size) < share
+
+
+def spoil(rng: np.random.Generator, values: np.ndarray, share: float, replacements: list) -> None:
+    """Overwrite about share of the values (at least one) in place with draws from replacements."""
+    picked = mask(rng, len(values), share)
+    picked[rng.integers(0, len(values))] = True
+    values[picked] = rng.choice(replacements, size=int(picked.sum()))
+
+
+def messy(rng: np.random.Generator, labels: np.ndarray) -> np.ndarray:
+    """Lower-case and pad a few labels, the way hand-entered values drift."""
+    labels = labels.astype(object)
+    picked = mask(rng, len(labels), MESSY_LABEL_SHARE)
+    labels[picked] = [f" {label.lower()} " for label in labels[picked]]
+    return labels
+
+
+def add_duplicates(rng: np.random.Generator, df: pd.DataFrame, extra: pd.DataFrame = None) -> pd.DataFrame:
+    """Insert copies of about DUPLICATE_SHARE of the rows (taken from extra too, if given) at random places."""
+    pool = df if extra is None or extra.empty else pd.concat([df, extra], ignore_index=True)
+    copies = pool.sample(n=max(1, int(len(df) * DUPLICATE_SHARE)), random_state=rng)
+    combined = pd.concat([df, copies], ignore_index=True)
+    return combined.iloc[rng.permutation(len(combined))].reset_index(drop=True)
+
+
+def generate_customers(rng: np.random.Generator, count: int) -> pd.DataFrame:
+    """Return the raw customers table: CustomerID, Name, Region, JoinDate, LastActiveYear, PreferredContactMethod."""
+    join_dates = DATES[rng.integers(0, len(DATES), count)]
+    last_active = np.minimum(join_dates.year.to_numpy() + rng.integers(0, 4, count), 2025).astype(float)
+    spoil(rng, last_active, OUTLIER_SHARE, [1999, 2035, 2099])
+    spoil(rng, last_active, NULL_SHARE, [np.nan])
+    contact = choice(rng, CONTACT_METHODS, count).astype(object)
+    contact[mask(rng, count, NULL_SHARE)] = None
+    customers = pd.DataFrame({
+        "CustomerID": np.arange(FIRST_CUSTOMER_ID, FIRST_CUSTOMER_ID + count),
+        "Name": np.char.add(np.char.add(rng.choice(FIRST_NAMES, count), " "), rng.choice(LAST_NAMES, count)),
+        "Region": choice(rng, REGIONS, count),
+        "JoinDate": date_labels(join_dates),
+        "LastActiveYear": pd.array(last_active, dtype="Float64").astype("Int64"),
+        "PreferredContactMethod": contact,
+    })
+    return add_duplicates(rng, customers)
+
+
+def generate_products(rng: np.random.Generator, count: int) -> pd.DataFrame:
+    """Return the raw products table: ProductID, ProductName, Category, UnitPrice, StockQuantity, StoreSection."""
+    categories = rng.choice(list(CATEGORIES), count)
+    nouns = [rng.choice(CATEGORIES[category][0]) for category in categories]
+    medians = np.array([CATEGORIES[category][1] for category in categories])
+    stock = rng.integers(0, 251, count).astype(float)
+    spoil(rng, stock, OUTLIER_SHARE * 2, [-5, 999])
+    spoil(rng, stock, NULL_SHARE, [np.nan])
+    # Nouns repeat across products, so later products of the same noun get a number
+    nouns = pd.Series(nouns)
+    repeats = nouns.groupby(nouns).cumcount()
+    products = pd.DataFrame({
+        "ProductID": np.arange(FIRST_PRODUCT_ID, FIRST_PRODUCT_ID + count),
+        "ProductName": nouns.where(repeats == 0, nouns + " " + (repeats + 1).astype(str)).to_numpy(),
+        "Category": categories,
+        "UnitPrice": (medians * rng.lognormal(0.0, 0.5, count)).round(2),
+        "StockQuantity": pd.array(stock, dtype="Float64").astype("Int64"),
+        "StoreSection": messy(rng, rng.choice(STORE_SECTIONS, count)),
+    })
+    return add_duplicates(rng, products)
+
+
+def sale_day_weights() -> np.ndarray:
+    """Probability of a sale on each day of DATES: more in November and December and on weekends."""
+    weights = np.ones(len(DATES))
+    weights[DATES.month.isin([11, 12])] *= 1.6
+    weights[DATES.dayofweek >= 5] *= 1.3
+    return weights / weights.sum()
+
+
+def generate_sales(rng: np.random.Generator, start_id: int, count: int, customer_ids: np.ndarray,
+                   customer_weights: np.ndarray, products: pd.DataFrame, product_weights: np.ndarray,
+                   days: np.ndarray, day_weights: np.ndarray) -> pd.DataFrame:
+    """Return count raw sales with TransactionIDs from start_id (duplicates are added separately)."""
+    product_rows = rng.choice(len(products), size=count, p=product_weights)
+    quantity = rng.geometric(0.6, count)
+    discount = DISCOUNTS[rng.integers(0, len(DISCOUNTS), count)].astype(float)
+    amount = products["UnitPrice"].to_numpy()[product_rows] * quantity * (1 - discount / 100)
+    spoil(rng, discount, OUTLIER_SHARE, [-10, 75, 100])
+    spoil(rng, discount, NULL_SHARE, [np.nan])
+    return pd.DataFrame({
+        "TransactionID": np.arange(start_id, start_id + count),
+        "SaleDate": days[rng.choice(len(DATES), size=count, p=day_weights)],
+        "CustomerID": rng.choice(customer_ids, size=count, p=customer_weights),
+        "ProductID": products["ProductID"].to_numpy()[product_rows],
+        "StoreID": choice(rng, STORES, count),
+        "CampaignID": choice(rng, CAMPAIGNS, count),
+        "SaleAmount": amount.round(2),
+        "DiscountPercent": discount,
+        "PaymentType": messy(rng, choice(rng, PAYMENT_TYPES, count)),
+    })
+
+
+def generate_raw_data(out_dir: pathlib.Path, sales_rows: int, seed: int = 42,
+                      batch_rows: int = BATCH_ROWS) -> Dict[str, int]:
+    """
+    Write customers_data.csv, products_data.csv and sales_data.csv to out_dir.
+
+    Args:
+        out_dir (pathlib.Path): Folder for the raw files (created if needed).
+        sales_rows (int): Distinct sales to generate; about 1% more rows are written as duplicates.
+        seed (int): Random seed; the same seed and sales_rows give the same files.
+        batch_rows (int): Sales generated and appended per batch.
+
+    Returns:
+        dict: Rows written per file name, duplicates included.
+    """
+    rng = np.random.default_rng(seed)
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    customers = generate_customers(rng, max(10, sales_rows // 100))
+    products = generate_products(rng, max(8, min(sales_rows // 1000, 100_000)))
+    customers.to_csv(out_dir.joinpath("customers_data.csv"), index=False)
+    products.to_csv(out_dir.joinpath("products_data.csv"), index=False)
+
+    # Sales refer to the distinct customers and products, most often to a popular few
+    customer_ids = customers["CustomerID"].drop_duplicates().to_numpy()
+    distinct_products = products.drop_duplicates("ProductID").reset_index(drop=True)
+    customer_weights = skewed_weights(rng, len(customer_ids), 0.8)
+    product_weights = skewed_weights(rng, len(distinct_products), 1.1)
+    days, day_weights = date_labels(DATES), sale_day_weights()
+
+    sales_path = out_dir.joinpath("sales_data.csv")
+    written = 0
+    previous = None
+    for start in range(0, sales_rows, batch_rows):
+        batch = generate_sales(rng, FIRST_SALE_ID + start, min(batch_rows, sales_rows - start), customer_ids,
+                               customer_weights, distinct_products, product_weights, days, day_weights)
+        # Some duplicates repeat sales of the previous batch, so they cross chunk boundaries
+        tail = None if previous is None else previous.tail(len(batch) // 10)
+        previous = batch
+        batch = add_duplicates(rng, batch, tail)
+        batch.to_csv(sales_path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+        written += len(batch)
+
+    counts = {"customers_data.csv": len(customers), "products_data.csv": len(products), "sales_data.csv": written}
+    logger.info(f"Generated synthetic raw data in {out_dir}: {counts}")
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic raw customers, products and sales files.")
+    parser.add_argument("--rows", type=int, default=100_000, help="sales to generate (10^4 to 10^8)")
+    parser.add_argument("--out", type=pathlib.Path, required=True, help="folder for the raw CSV files")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS, help="sales generated per batch")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    counts = generate_raw_data(args.out, args.rows, args.seed, args.batch_rows)
+    for name, rows in counts.items():
+        print(f"{name:<20} {rows:>12,} rows")
+    print(f"Generated in {time.perf_counter() - start_time:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
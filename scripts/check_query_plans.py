@@ -0,0 +1,154 @@
+"""
+scripts/check_query_plans.py
+
+Run EXPLAIN QUERY PLAN on the project's known warehouse queries and fail when any
+of them falls back to a full table scan, or when a query meant to be answered from
+indexes alone still looks up rows in a table.
+
+A plan step such as "SCAN s" reads every row of a table. "SCAN ... USING COVERING INDEX"
+(reading a narrower index end to end) and "SEARCH ..." steps are accepted, except that
+the tables listed in COVERING_QUERIES must be read "USING COVERING INDEX": a plain
+"SEARCH sale USING INDEX ..." finds rows through the index and then reads each one
+from the table.
+
+A warehouse created before the current schema lacks tables or columns these queries
+use; the checker then asks for the migration instead of failing with a traceback.
+
+How to Run (from the root project folder, with the .venv active):
+
+    py scripts\\check_query_plans.py
+    python3 scripts/check_query_plans.py --db data/dw/smart_sales.db
+
+The exit status is 1 when at least one query fails a check, and 2 when the
+warehouse schema is too old to check.
+"""
+
+import argparse
+import pathlib
+import re
+import sqlite3
+import sys
+from typing import Dict, List
+
+# For local imports, temporarily add project root to sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from scripts.dw_access import reader  # noqa: E402
+from scripts.etl_to_dw import DB_PATH, SCHEMA_VERSION  # noqa: E402
+from scripts.olap.olap_cubing import CUBE_DIMENSIONS, CUBE_METRICS, SALES_CUBE_QUERY, SALES_DELTA_QUERY  # noqa: E402
+from scripts.olap.sql_cube import build_cube_query  # noqa: E402
+
+# Known queries by name. Parameters (?) are bound to NULL when explaining.
+KNOWN_QUERIES: Dict[str, str] = {
+    "olap_cube_ingest": SALES_CUBE_QUERY,
+    "olap_cube_delta": SALES_DELTA_QUERY,
+    "olap_sql_cube": build_cube_query(CUBE_DIMENSIONS, CUBE_METRICS),
+    "sales_by_date_range": """
+        SELECT date_key, sale_amount, customer_id, product_id
+        FROM sale
+        WHERE date_key BETWEEN ? AND ?
+    """,
+    "sales_for_customer": """
+        SELECT sale_id, date_key, sale_amount
+        FROM sale
+        WHERE customer_id = ?
+    """,
+    "sales_for_product": """
+        SELECT sale_id
+        FROM sale
+        WHERE product_id = ?
+    """,
+    "customers_in_region": """
+        SELECT c.customer_id
+        FROM customer c
+        JOIN region_dim r ON c.region_key = r.region_key
+        WHERE r.region_name = ?
+    """,
+}
+
+# Query name -> tables (by their alias in the query) that must be read from a covering
+# index only. The covering indexes are WAREHOUSE_INDEXES in etl_to_dw.py.
+COVERING_QUERIES: Dict[str, List[str]] = {
+    "olap_cube_ingest": ["s"],
+    "olap_sql_cube": ["s"],
+    "sales_by_date_range": ["sale"],
+    "sales_for_customer": ["sale"],
+    "sales_for_product": ["sale"],
+    "customers_in_region": ["r", "c"],
+}
+
+# "SCAN sale" or "SCAN TABLE sale AS s" (older SQLite) without a USING ... INDEX clause
+FULL_SCAN_PATTERN = re.compile(r"^SCAN (TABLE )?\S+( AS \S+)?$")
+
+# The table (or alias) a SCAN or SEARCH step reads
+TABLE_STEP_PATTERN = re.compile(r"^(?:SCAN|SEARCH) (?:TABLE )?(\S+)(?: AS (\S+))?")
+
+
+def explain(conn: sqlite3.Connection, query: str) -> List[str]:
+    """Return the detail lines of EXPLAIN QUERY PLAN for a query."""
+    parameters = (None,) * query.count("?")
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", parameters)]
+
+
+def find_full_scans(conn: sqlite3.Connection, queries: Dict[str, str] = KNOWN_QUERIES) -> Dict[str, List[str]]:
+    """Return {query name: offending plan steps} for every query that scans a whole table."""
+    failures = {}
+    for name, query in queries.items():
+        steps = explain(conn, query)
+        logger.info(f"Query plan for {name}: {steps}")
+        full_scans = [step for step in steps if FULL_SCAN_PATTERN.match(step)]
+        if full_scans:
+            failures[name] = full_scans
+    return failures
+
+
+def find_table_lookups(conn: sqlite3.Connection, queries: Dict[str, str] = KNOWN_QUERIES,
+                       covering: Dict[str, List[str]] = COVERING_QUERIES) -> Dict[str, List[str]]:
+    """Return {query name: plan steps} for the index-only queries that read a table without a covering index."""
+    failures = {}
+    for name, tables in covering.items():
+        if name not in queries:
+            continue
+        lookups = []
+        for step in explain(conn, queries[name]):
+            match = TABLE_STEP_PATTERN.match(step)
+            if match and (match.group(2) or match.group(1)) in tables and "USING COVERING INDEX" not in step:
+                lookups.append(step)
+        if lookups:
+            failures[name] = lookups
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fail when a known warehouse query uses a full table scan or misses its covering index.")
+    parser.add_argument("--db", type=pathlib.Path, default=DB_PATH, help="path to the SQLite warehouse")
+    args = parser.parse_args()
+
+    try:
+        with reader(args.db) as conn:
+            full_scans = find_full_scans(conn)
+            lookups = find_table_lookups(conn)
+    except sqlite3.OperationalError as error:
+        if not re.match(r"no such (table|column)", str(error)):
+            raise
+        print(f"The warehouse {args.db} has an older schema than the known queries ({error}).")
+        print(f"Migrate it to schema version {SCHEMA_VERSION} by running etl_to_dw.py "
+              "(e.g. python3 scripts/etl_to_dw.py --incremental), then check again.")
+        return 2
+
+    failures = {**lookups, **full_scans}
+    for name, steps in full_scans.items():
+        print(f"FAIL {name} (full table scan): {'; '.join(steps)}")
+    for name, steps in lookups.items():
+        print(f"FAIL {name} (table lookups, no covering index): {'; '.join(steps)}")
+    for name in KNOWN_QUERIES:
+        if name not in failures:
+            print(f"ok   {name}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,11 @@
 CREATE TABLE IF NOT EXISTS customer (
     customer_id INTEGER PRIMARY KEY,
     name TEXT,
-    region TEXT,
+    region_key INTEGER,
     join_date TEXT,
     last_active_year INTEGER,
-    preferred_contact_method TEXT
+    preferred_contact_method TEXT,
+    FOREIGN KEY (region_key) REFERENCES region_dim (region_key)
 );
 
 CREATE TABLE IF NOT EXISTS product (
@@ -16,16 +17,65 @@ CREATE TABLE IF NOT EXISTS product (
     store_section TEXT
 );
 
+-- Fact table: integer keys and measures only
 CREATE TABLE IF NOT EXISTS sale (
     sale_id INTEGER PRIMARY KEY,
     customer_id INTEGER,
     product_id INTEGER,
-    store_id INTEGER,
-    campaign_id INTEGER,
+    store_key INTEGER,
+    campaign_key INTEGER,
+    payment_type_key INTEGER,
+    date_key INTEGER,
     sale_amount REAL,
-    sale_date TEXT,
     discount_percent REAL,
-    payment_type TEXT,
     FOREIGN KEY (customer_id) REFERENCES customer (customer_id),
-    FOREIGN KEY (product_id) REFERENCES product (product_id)
-);
\ No newline at end of file
+    FOREIGN KEY (product_id) REFERENCES product (product_id),
+    FOREIGN KEY (store_key) REFERENCES store_dim (store_key),
+    FOREIGN KEY (campaign_key) REFERENCES campaign_dim (campaign_key),
+    FOREIGN KEY (payment_type_key) REFERENCES payment_type_dim (payment_type_key),
+    FOREIGN KEY (date_key) REFERENCES date_dim (date_key)
+);
+
+-- Calendar dimension: one row per day, keyed by YYYYMMDD
+CREATE TABLE IF NOT EXISTS date_dim (
+    date_key INTEGER PRIMARY KEY,
+    full_date TEXT,
+    year INTEGER,
+    quarter INTEGER,
+    month INTEGER,
+    day INTEGER,
+    day_of_week TEXT,
+    day_of_week_number INTEGER
+);
+
+-- Label dimensions: a surrogate key per distinct label
+CREATE TABLE IF NOT EXISTS region_dim (
+    region_key INTEGER PRIMARY KEY,
+    region_name TEXT UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS store_dim (
+    store_key INTEGER PRIMARY KEY,
+    store_id INTEGER UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS campaign_dim (
+    campaign_key INTEGER PRIMARY KEY,
+    campaign_id INTEGER UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS payment_type_dim (
+    payment_type_key INTEGER PRIMARY KEY,
+    payment_type_name TEXT UNIQUE
+);
+
+-- Covering index for the OLAP cube join: sale -> customer, sale -> product, plus the measures
+CREATE INDEX IF NOT EXISTS idx_sale_cube ON sale (customer_id, product_id, date_key, sale_amount);
+CREATE INDEX IF NOT EXISTS idx_sale_product_id ON sale (product_id);
+
+-- Covering index for date-range scans (date_key is YYYYMMDD, so ranges compare correctly)
+CREATE INDEX IF NOT EXISTS idx_sale_date ON sale (date_key, sale_amount, customer_id, product_id);
+
+-- Dimension lookups (also cover the customer_id / product_id join keys)
+CREATE INDEX IF NOT EXISTS idx_customer_region ON customer (region_key);
+CREATE INDEX IF NOT EXISTS idx_product_name ON product (product_name);
@@ -14,11 +14,13 @@ if str(PROJECT_ROOT) not in sys.path:
 
 # Now we can import local modules
 from utils.logger import logger
+from utils.metrics import instrument
 
 # Constants
 DATA_DIR: pathlib.Path = PROJECT_ROOT.joinpath("data")
 RAW_DATA_DIR: pathlib.Path = DATA_DIR.joinpath("raw")
 
+@instrument()
 def read_raw_data(file_name: str) -> pd.DataFrame:
     """Read raw data from CSV."""
     file_path: pathlib.Path = RAW_DATA_DIR.joinpath(file_name)
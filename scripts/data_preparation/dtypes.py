@@ -0,0 +1,164 @@
+"""
+scripts/data_preparation/dtypes.py
+
+Memory-lean dtypes for prepared tables.
+
+optimize_dtypes() shrinks each column to the smallest dtype that holds its values
+exactly:
+
+- integers (IDs, years, counts) become int8/int16/int32 when their range allows,
+- floats become float32 only when every value survives the round trip unchanged
+  (so money amounts like 19.99 stay float64),
+- strings with few distinct values (regions, payment types, categories) become
+  pandas categoricals, stored as small integer codes plus one copy of each label.
+
+Booleans, dates and high-cardinality strings are left alone. pandas aggregates float32
+columns in float32, so exclude float metrics that will be summed over many rows.
+
+The prep scripts pass a fixed target dtype per column instead (dtypes=...), so the
+in-memory run and every chunk of a streamed run write the same dtypes. A chunk whose
+values don't fit a target exactly keeps its dtype, and the chunk writer widens the
+column (see utils/storage.py).
+
+Do not run this script directly. The prep scripts, DataScrubber and olap_cubing.py use it.
+"""
+
+import pathlib
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import sampled  # noqa: E402
+
+# A string column becomes categorical when distinct values are at most this share of its rows
+CATEGORY_MAX_RATIO: float = 0.5
+
+
+def memory_usage(df: pd.DataFrame) -> int:
+    """Return the bytes used by a DataFrame, counting the contents of string columns."""
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def _exact_in_float32(values: pd.Series) -> bool:
+    """Return True if every value of a numeric column survives a round trip through float32."""
+    as_float64 = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(over="ignore", invalid="ignore"):
+        round_trip = as_float64.astype(np.float32).astype(np.float64)
+    return bool(((round_trip == as_float64) | np.isnan(as_float64)).all())
+
+
+def fits_dtype(values: pd.Series, dtype: str) -> bool:
+    """Return True if a column can be cast to dtype without changing or losing any value."""
+    target = pd.api.types.pandas_dtype(dtype)
+    if values.dtype == target:
+        return True
+    if isinstance(target, pd.CategoricalDtype):
+        return ((pd.api.types.is_object_dtype(values.dtype) or pd.api.types.is_string_dtype(values.dtype))
+                and pd.api.types.infer_dtype(values, skipna=True) in ("string", "empty"))
+    if pd.api.types.is_bool_dtype(values.dtype) or not pd.api.types.is_numeric_dtype(values.dtype):
+        return False
+    if values.empty:
+        return True
+
+    if target.kind in "iu":
+        if values.isna().any():
+            return False
+        if pd.api.types.is_float_dtype(values.dtype):
+            numbers = values.to_numpy(dtype=np.float64)
+            if not np.array_equal(numbers, np.floor(numbers)):
+                return False
+        limits = np.iinfo(target)
+        return bool(limits.min <= values.min() and values.max() <= limits.max)
+    if target == np.float32:
+        return _exact_in_float32(values)
+    return target.kind == "f" and target.itemsize >= 8
+
+
+def smallest_dtype(values: pd.Series, category_max_ratio: float = CATEGORY_MAX_RATIO) -> Optional[str]:
+    """Return the smallest exact dtype for a column, or None to keep the current one."""
+    dtype = values.dtype
+    if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return None
+
+    if pd.api.types.is_integer_dtype(dtype):
+        if values.isna().all():
+            return None
+        minimum, maximum = values.min(), values.max()
+        nullable = isinstance(dtype, pd.api.extensions.ExtensionDtype)
+        for candidate in (np.int8, np.int16, np.int32):
+            limits = np.iinfo(candidate)
+            if limits.min <= minimum and maximum <= limits.max:
+                name = np.dtype(candidate).name
+                name = name.capitalize() if nullable else name
+                return name if name != str(dtype) else None
+        return None
+
+    if pd.api.types.is_float_dtype(dtype):
+        if dtype == np.float32 or dtype == "Float32":
+            return None
+        return "float32" if _exact_in_float32(values) else None
+
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        if pd.api.types.infer_dtype(values, skipna=True) != "string":
+            return None  # empty, or mixed Python objects
+        return "category" if values.nunique() <= category_max_ratio * len(values) else None
+
+    return None
+
+
+def optimize_dtypes(
+    df: pd.DataFrame,
+    category_max_ratio: float = CATEGORY_MAX_RATIO,
+    exclude: Optional[List[str]] = None,
+    dtypes: Optional[Dict[str, str]] = None,
+) -> Tuple[pd.DataFrame, Dict[str, object]]:
+    """
+    Downcast numeric columns and turn low-cardinality strings into categoricals.
+
+    Args:
+        df (pd.DataFrame): The table to shrink.
+        category_max_ratio (float): Largest distinct/rows ratio for a string column to become categorical.
+        exclude (list, optional): Columns to leave unchanged.
+        dtypes (dict, optional): Fixed target dtype per column, used instead of inferring one
+            from the values, so every chunk of a table gets the same dtypes. Other columns are
+            left unchanged, and so is a column whose values don't fit its target exactly.
+
+    Returns:
+        tuple: (optimized DataFrame, report) where report holds before_bytes, after_bytes,
+        saved_bytes and changed_columns ({column: (old dtype, new dtype)}).
+    """
+    before = memory_usage(df)
+    conversions = {}
+    for column in df.columns:
+        if exclude and column in exclude:
+            continue
+        if dtypes is not None:
+            new_dtype = dtypes.get(column)
+            if new_dtype is None or df[column].dtype == new_dtype:
+                continue
+            if not fits_dtype(df[column], new_dtype):
+                sampled().warning("Column {} does not fit {} exactly, keeping {}", column, new_dtype, df[column].dtype)
+                continue
+        else:
+            new_dtype = smallest_dtype(df[column], category_max_ratio)
+        if new_dtype is not None:
+            conversions[column] = new_dtype
+
+    optimized = df.astype(conversions) if conversions else df
+    after = memory_usage(optimized)
+    report = {
+        "before_bytes": before,
+        "after_bytes": after,
+        "saved_bytes": before - after,
+        "changed_columns": {column: (str(df[column].dtype), new_dtype) for column, new_dtype in conversions.items()},
+    }
+    sampled().info("Optimized dtypes of {} columns: {:.2f} MB -> {:.2f} MB (saved {:.2f} MB, {:.0%})",
+                   len(conversions), before / 1e6, after / 1e6, report["saved_bytes"] / 1e6,
+                   report["saved_bytes"] / max(before, 1))
+    return optimized, report
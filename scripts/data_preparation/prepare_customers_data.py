@@ -24,10 +24,16 @@ Example (Mac/Linux) - do NOT include the $ prompt:
 $ source .venv/bin/activate
 $ python3 scripts/data_preparation/prepare_customers_data.py
 
+Add --chunksize [ROWS] to stream large raw files in bounded chunks instead of
+loading the whole file into memory.
+
 """
 
+import argparse
 import pathlib
 import sys
+from typing import Iterator, Optional
+
 import pandas as pd
 
 # For local imports, temporarily add project root to Python sys.path
@@ -36,17 +42,37 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
 # Now we can import local modules
-from utils.logger import logger  # noqa: E402
+from utils.logger import logger, sampled  # noqa: E402
+from utils.metrics import instrument  # noqa: E402
+from utils.storage import DEFAULT_FORMAT, SUPPORTED_FORMATS, with_format, write_table  # noqa: E402
+from scripts.data_preparation.dtypes import optimize_dtypes  # noqa: E402
+from scripts.data_preparation.streaming import (  # noqa: E402
+    DEFAULT_CHUNKSIZE,
+    SeenKeys,
+    collect_median,
+    drop_seen_keys,
+    iter_raw_chunks,
+    write_chunks,
+)
 
 # Constants
 DATA_DIR: pathlib.Path = PROJECT_ROOT.joinpath("data")
 RAW_DATA_DIR: pathlib.Path = DATA_DIR.joinpath("raw")
 PREPARED_DATA_DIR: pathlib.Path = DATA_DIR.joinpath("prepared")
 
+# Prepared dtypes, fixed so an in-memory run and every streamed chunk agree (see dtypes.py)
+PREPARED_DTYPES: dict = {
+    "CustomerID": "int32",
+    "Region": "category",
+    "LastActiveYear": "float32",
+    "PreferredContactMethod": "category",
+}
+
 # -------------------
 # Reusable Functions
 # -------------------
 
+@instrument()
 def read_raw_data(file_name: str) -> pd.DataFrame:
     logger.info(f"FUNCTION START: read_raw_data with file_name={file_name}")
     file_path = RAW_DATA_DIR.joinpath(file_name)
@@ -55,50 +81,81 @@ def read_raw_data(file_name: str) -> pd.DataFrame:
     logger.info(f"Loaded dataframe with {len(df)} rows and {len(df.columns)} columns")
     return df
 
-def save_prepared_data(df: pd.DataFrame, file_name: str) -> None:
+@instrument()
+def save_prepared_data(df: pd.DataFrame, file_name: str, fmt: Optional[str] = None) -> None:
     logger.info(f"FUNCTION START: save_prepared_data with file_name={file_name}, dataframe shape={df.shape}")
-    file_path = PREPARED_DATA_DIR.joinpath(file_name)
-    df.to_csv(file_path, index=False)
+    # Written as Parquet or CSV depending on fmt (DEFAULT_FORMAT if None)
+    file_path = write_table(df, with_format(PREPARED_DATA_DIR.joinpath(file_name), fmt))
     logger.info(f"Data saved to {file_path}")
 
 def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
-    logger.info(f"FUNCTION START: remove_duplicates with dataframe shape={df.shape}")
+    # Called once per chunk when streaming, so only 1 in SMART_LOG_SAMPLE_EVERY calls is logged
+    log = sampled()
+    log.info("FUNCTION START: remove_duplicates with dataframe shape={}", df.shape)
     initial_count = len(df)
     df = df.drop_duplicates(subset=['CustomerID'], keep='first')
     removed_count = initial_count - len(df)
-    logger.info(f"Removed {removed_count} duplicate rows")
-    logger.info(f"{len(df)} records remaining after removing duplicates.")
+    log.info("Removed {} duplicate rows", removed_count)
+    log.info("{} records remaining after removing duplicates.", len(df))
     return df
 
-def handle_missing_values(df: pd.DataFrame) -> pd.DataFrame:
-    logger.info(f"FUNCTION START: handle_missing_values with dataframe shape={df.shape}")
+def handle_missing_values(df: pd.DataFrame, median: Optional[float] = None) -> pd.DataFrame:
+    log = sampled()
+    log.info("FUNCTION START: handle_missing_values with dataframe shape={}", df.shape)
     
-    # Log missing values count before handling
-    missing_before = df.isna().sum().sum()
-    logger.info(f"Total missing values before handling: {missing_before}")
+    # Log missing values count before handling (counted only when the message is written)
+    log.opt(lazy=True).info("Total missing values before handling: {}", lambda: df.isna().sum().sum())
 
-    df['LastActiveYear'] = df['LastActiveYear'].fillna(df['LastActiveYear'].median())
+    # In streaming mode the median comes from the whole file, not just this chunk
+    if median is None:
+        median = df['LastActiveYear'].median()
+    df['LastActiveYear'] = df['LastActiveYear'].fillna(median)
     df['PreferredContactMethod'] = df['PreferredContactMethod'].fillna('Unknown')
     
     # Log missing values count after handling
-    missing_after = df.isna().sum().sum()
-    logger.info(f"Total missing values after handling: {missing_after}")
-    logger.info(f"{len(df)} records remaining after handling missing values.")
+    log.opt(lazy=True).info("Total missing values after handling: {}", lambda: df.isna().sum().sum())
+    log.info("{} records remaining after handling missing values.", len(df))
     return df
 
 def remove_outliers(df: pd.DataFrame) -> pd.DataFrame:
-    logger.info(f"FUNCTION START: remove_outliers with dataframe shape={df.shape}")
+    log = sampled()
+    log.info("FUNCTION START: remove_outliers with dataframe shape={}", df.shape)
     initial_count = len(df)
 
     df = df[(df['LastActiveYear'] >= 2020) & (df['LastActiveYear'] <= 2025)]
     
     removed_count = initial_count - len(df)
-    logger.info(f"Removed {removed_count} outlier rows")
-    logger.info(f"{len(df)} records remaining after removing outliers.")
+    log.info("Removed {} outlier rows", removed_count)
+    log.info("{} records remaining after removing outliers.", len(df))
     return df
 
+def clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
+    original_columns = df.columns.tolist()
+    df.columns = df.columns.str.strip()
+    
+    # Log if any column names changed
+    changed_columns = [f"{old} -> {new}" for old, new in zip(original_columns, df.columns) if old != new]
+    if changed_columns:
+        sampled().info("Cleaned column names: {}", ", ".join(changed_columns))
+    return df
 
-def main() -> None:
+def clean_chunks(chunksize: int) -> Iterator[pd.DataFrame]:
+    """Yield cleaned chunks of the raw customers file, filling with the whole-file median."""
+    file_path = RAW_DATA_DIR.joinpath("customers_data.csv")
+    median = collect_median(file_path, chunksize, 'CustomerID', 'LastActiveYear', prepare=clean_column_names)
+    seen = SeenKeys()
+    for chunk in iter_raw_chunks(file_path, chunksize):
+        chunk = clean_column_names(chunk)
+        chunk = remove_duplicates(chunk)
+        chunk = drop_seen_keys(chunk, 'CustomerID', seen)
+        chunk = handle_missing_values(chunk, median=median)
+        chunk = remove_outliers(chunk)
+        chunk, _ = optimize_dtypes(chunk, dtypes=PREPARED_DTYPES)
+        yield chunk
+
+
+@instrument()
+def main(chunksize: Optional[int] = None, fmt: Optional[str] = None) -> None:
     logger.info("==================================")
     logger.info("STARTING prepare_customers_data.py")
     logger.info("==================================")
@@ -107,6 +164,15 @@ def main() -> None:
     logger.info(f"data / raw folder: {RAW_DATA_DIR}")
     logger.info(f"data / prepared folder: {PREPARED_DATA_DIR}")
     logger.info(f"scripts folder: {PROJECT_ROOT.joinpath('scripts')}")
+    PREPARED_DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+    if chunksize:
+        # Stream the raw file instead of loading it whole
+        write_chunks(clean_chunks(chunksize), with_format(PREPARED_DATA_DIR.joinpath("customers_data_prepared"), fmt))
+        logger.info("==================================")
+        logger.info("FINISHED prepare_customers_data.py (streaming mode)")
+        logger.info("==================================")
+        return
     
     # Read raw data
     df = read_raw_data("customers_data.csv")
@@ -116,13 +182,7 @@ def main() -> None:
     logger.info(f"Initial dataframe shape: {df.shape}")
     
     # Clean column names
-    original_columns = df.columns.tolist()
-    df.columns = df.columns.str.strip()
-    
-    # Log if any column names changed
-    changed_columns = [f"{old} -> {new}" for old, new in zip(original_columns, df.columns) if old != new]
-    if changed_columns:
-        logger.info(f"Cleaned column names: {', '.join(changed_columns)}")
+    df = clean_column_names(df)
 
     # Remove duplicates
     df = remove_duplicates(df)
@@ -134,7 +194,8 @@ def main() -> None:
     df = remove_outliers(df)
 
     # Save prepared data
-    save_prepared_data(df, "customers_data_prepared.csv")
+    df, _ = optimize_dtypes(df, dtypes=PREPARED_DTYPES)
+    save_prepared_data(df, "customers_data_prepared", fmt)
 
     logger.info("==================================")
     logger.info("FINISHED prepare_customers_data.py")
@@ -145,4 +206,10 @@ def main() -> None:
 # -------------------
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Prepare the raw customers data.")
+    parser.add_argument("--chunksize", type=int, nargs="?", const=DEFAULT_CHUNKSIZE, default=None,
+                        help=f"stream the raw file in chunks of this many rows (default {DEFAULT_CHUNKSIZE})")
+    parser.add_argument("--format", choices=SUPPORTED_FORMATS, default=DEFAULT_FORMAT,
+                        help=f"file format of the prepared data (default {DEFAULT_FORMAT})")
+    args = parser.parse_args()
+    main(args.chunksize, args.format)
\ No newline at end of file
@@ -1,22 +1,43 @@
+import argparse
 import pathlib
 import sys
+from typing import Iterator, Optional
+
 import pandas as pd
 
 PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
-try:
-    from utils.logger import logger
-except ImportError:
-    import logging
-    logger = logging.getLogger(__name__)
-    logging.basicConfig(level=logging.INFO)
+from utils.logger import logger, sampled  # noqa: E402
+from utils.dates import parse_dates  # noqa: E402
+from utils.metrics import instrument  # noqa: E402
+from utils.storage import DEFAULT_FORMAT, SUPPORTED_FORMATS, with_format, write_table  # noqa: E402
+from scripts.data_preparation.dtypes import optimize_dtypes  # noqa: E402
+from scripts.data_preparation.streaming import (  # noqa: E402
+    DEFAULT_CHUNKSIZE,
+    SeenKeys,
+    drop_seen_keys,
+    iter_raw_chunks,
+    write_chunks,
+)
 
 DATA_DIR = PROJECT_ROOT.joinpath("data")
 RAW_DATA_DIR = DATA_DIR.joinpath("raw")
 PREPARED_DATA_DIR = DATA_DIR.joinpath("prepared")
 
+# Prepared dtypes, fixed so an in-memory run and every streamed chunk agree (see dtypes.py)
+PREPARED_DTYPES = {
+    "TransactionID": "int32",
+    "CustomerID": "int32",
+    "ProductID": "int32",
+    "StoreID": "int16",
+    "CampaignID": "int16",
+    "DiscountPercent": "float32",
+    "PaymentType": "category",
+}
+
+@instrument()
 def read_raw_data(file_name: str) -> pd.DataFrame:
     file_path = RAW_DATA_DIR.joinpath(file_name)
     logger.info(f"Reading data from {file_path}")
@@ -24,37 +45,56 @@ def read_raw_data(file_name: str) -> pd.DataFrame:
     logger.info(f"Loaded {len(df)} rows, {len(df.columns)} columns")
     return df
 
-def save_prepared_data(df: pd.DataFrame, file_name: str) -> None:
-    file_path = PREPARED_DATA_DIR.joinpath(file_name)
-    df.to_csv(file_path, index=False)
+@instrument()
+def save_prepared_data(df: pd.DataFrame, file_name: str, fmt: Optional[str] = None) -> None:
+    # Written as Parquet or CSV depending on fmt (DEFAULT_FORMAT if None)
+    file_path = write_table(df, with_format(PREPARED_DATA_DIR.joinpath(file_name), fmt))
     logger.info(f"Saved to {file_path}")
 
 def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
     initial_count = len(df)
     df = df.drop_duplicates(subset=['TransactionID'], keep='first')
-    logger.info(f"Removed {initial_count - len(df)} duplicates")
+    sampled().info("Removed {} duplicates", initial_count - len(df))
     return df
 
 def handle_missing_values(df: pd.DataFrame) -> pd.DataFrame:
     df['DiscountPercent'] = df['DiscountPercent'].fillna(0)
-    logger.info(f"Handled missing values: {df.isna().sum().sum()} remaining")
+    sampled().opt(lazy=True).info("Handled missing values: {} remaining", lambda: df.isna().sum().sum())
     return df
 
 def remove_outliers(df: pd.DataFrame) -> pd.DataFrame:
     initial_count = len(df)
     df = df[(df['DiscountPercent'] >= 0) & (df['DiscountPercent'] <= 50)]  # Assuming 0-50% range
-    logger.info(f"Removed {initial_count - len(df)} outliers in DiscountPercent")
+    sampled().info("Removed {} outliers in DiscountPercent", initial_count - len(df))
     return df
 
 def standardize_formats(df: pd.DataFrame) -> pd.DataFrame:
     df['PaymentType'] = df['PaymentType'].str.title().str.strip()
-    df['SaleDate'] = pd.to_datetime(df['SaleDate'], errors='coerce')
-    logger.info("Standardized formats")
+    df['SaleDate'] = parse_dates(df['SaleDate'], errors='coerce')  # M/D/YYYY, each distinct date parsed once
+    sampled().info("Standardized formats")
     return df
 
-def main() -> None:
+def clean_chunks(chunksize: int) -> Iterator[pd.DataFrame]:
+    """Yield cleaned chunks of the raw sales file, deduplicated across chunk boundaries."""
+    seen = SeenKeys()
+    for chunk in iter_raw_chunks(RAW_DATA_DIR.joinpath("sales_data.csv"), chunksize):
+        chunk = remove_duplicates(chunk)
+        chunk = drop_seen_keys(chunk, 'TransactionID', seen)
+        chunk = handle_missing_values(chunk)
+        chunk = remove_outliers(chunk)
+        chunk = standardize_formats(chunk)
+        chunk, _ = optimize_dtypes(chunk, dtypes=PREPARED_DTYPES)
+        yield chunk
+
+@instrument()
+def main(chunksize: Optional[int] = None, fmt: Optional[str] = None) -> None:
     logger.info("Starting prepare_sales_data.py")
     PREPARED_DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+    if chunksize:
+        write_chunks(clean_chunks(chunksize), with_format(PREPARED_DATA_DIR.joinpath("sales_data_prepared"), fmt))
+        logger.info("Finished prepare_sales_data.py (streaming mode)")
+        return
     
     df = read_raw_data("sales_data.csv")
     df = remove_duplicates(df)
@@ -62,8 +102,15 @@ def main() -> None:
     df = remove_outliers(df)
     df = standardize_formats(df)
     
-    save_prepared_data(df, "sales_data_prepared.csv")
+    df, _ = optimize_dtypes(df, dtypes=PREPARED_DTYPES)
+    save_prepared_data(df, "sales_data_prepared", fmt)
     logger.info("Finished prepare_sales_data.py")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Prepare the raw sales data.")
+    parser.add_argument("--chunksize", type=int, nargs="?", const=DEFAULT_CHUNKSIZE, default=None,
+                        help=f"stream the raw file in chunks of this many rows (default {DEFAULT_CHUNKSIZE})")
+    parser.add_argument("--format", choices=SUPPORTED_FORMATS, default=DEFAULT_FORMAT,
+                        help=f"file format of the prepared data (default {DEFAULT_FORMAT})")
+    args = parser.parse_args()
+    main(args.chunksize, args.format)
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""
+scripts/data_preparation/streaming.py
+
+Shared helpers for running the data preparation scripts in chunked streaming mode.
+
+Raw files are read in bounded chunks with pd.read_csv(chunksize=...), each chunk is
+cleaned with the same functions the in-memory path uses, and the cleaned chunks are
+appended to the prepared file. Two pieces of state have to survive chunk boundaries:
+
+- SeenKeys remembers every ID already written, so drop_duplicates(keep='first')
+  stays correct across the whole file and not just within one chunk.
+- StreamingMedian keeps a value histogram, so median fills use the median of the
+  whole (deduplicated) column instead of the median of the current chunk.
+
+Do not run this script directly. Import the helpers from the prepare_*_data.py scripts.
+"""
+
+import pathlib
+import sys
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.storage import write_table_chunks  # noqa: E402
+
+# Rows per chunk when no chunksize is given on the command line
+DEFAULT_CHUNKSIZE: int = 250_000
+
+
+def _whole_numbers(keys: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return a mask of the non-null keys that are whole numbers, and those keys as int64.
+
+    Keys are normalized whatever the chunk's dtype, so 1001, 1001.0 and "1001" are one key.
+    A key column read as int in one chunk and as float (a missing value) or object (a
+    malformed value) in another still matches across chunks.
+    """
+    if pd.api.types.is_integer_dtype(keys.dtype):
+        return np.ones(len(keys), dtype=bool), keys.to_numpy(dtype=np.int64)
+    if pd.api.types.is_float_dtype(keys.dtype):
+        numbers = keys
+    elif pd.api.types.is_bool_dtype(keys.dtype):
+        return np.zeros(len(keys), dtype=bool), np.empty(0, dtype=np.int64)
+    else:
+        numbers = pd.to_numeric(keys, errors="coerce")
+    values = numbers.to_numpy(dtype=np.float64, na_value=np.nan)
+    whole = np.isfinite(values) & (values == np.floor(values))
+    return whole, values[whole].astype(np.int64)
+
+
+def _merge_runs(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Merge two sorted, duplicate-free runs into one (a stable sort merges the two runs in linear time)."""
+    merged = np.sort(np.concatenate([first, second]), kind="stable")
+    keep = np.ones(len(merged), dtype=bool)
+    keep[1:] = merged[1:] != merged[:-1]
+    return merged[keep]
+
+
+class SeenKeys:
+    """
+    Set of key values seen so far across chunks.
+
+    Whole-number keys (whatever the chunk's dtype) are stored as a few sorted int64 runs
+    (about 8 bytes per key) instead of a Python set. Runs are merged geometrically, so lookups
+    stay logarithmic and the total merge cost over the whole file stays O(n log n).
+    Any other key value falls back to a plain Python set.
+    """
+
+    def __init__(self):
+        self._runs: List[np.ndarray] = []
+        self._objects: set = set()
+        self._seen_null: bool = False
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self._runs) + len(self._objects) + int(self._seen_null)
+
+    def _contains_integers(self, integers: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(integers), dtype=bool)
+        for run in self._runs:
+            positions = np.searchsorted(run, integers).clip(max=len(run) - 1)
+            found |= run[positions] == integers
+        return found
+
+    def contains(self, keys: pd.Series) -> np.ndarray:
+        """Return a boolean mask marking the keys that were already seen."""
+        nulls = keys.isna().to_numpy()
+        mask = nulls & self._seen_null
+        present = keys[~nulls]
+        whole, integers = _whole_numbers(present)
+        found = np.zeros(len(present), dtype=bool)
+        if self._runs and len(integers):
+            found[whole] = self._contains_integers(integers)
+        if self._objects and not whole.all():
+            found[~whole] = present[~whole].isin(self._objects).to_numpy()
+        mask[~nulls] = found
+        return mask
+
+    def add(self, keys: pd.Series) -> None:
+        """Remember the given keys."""
+        nulls = keys.isna()
+        if nulls.any():
+            self._seen_null = True
+            keys = keys[~nulls]
+        if keys.empty:
+            return
+        whole, integers = _whole_numbers(keys)
+        if not whole.all():
+            self._objects.update(keys[~whole].tolist())
+        if not len(integers):
+            return
+        # pd.unique (hash table) then a sort is much faster than np.unique on large arrays
+        self._runs.append(np.sort(pd.unique(integers)))
+        while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+            newest = self._runs.pop()
+            self._runs[-1] = _merge_runs(self._runs[-1], newest)
+
+
+class StreamingMedian:
+    """
+    Exact running median for discrete-valued columns (years, quantities).
+
+    Keeps a value -> count histogram, so memory depends on the number of distinct
+    values and not on the number of rows. Missing values are ignored, like Series.median().
+    """
+
+    def __init__(self):
+        self._counts: pd.Series = pd.Series(dtype="int64")
+
+    def update(self, values: pd.Series) -> None:
+        counts = values.dropna().value_counts()
+        self._counts = self._counts.add(counts, fill_value=0).astype("int64")
+
+    def median(self) -> float:
+        total = int(self._counts.sum())
+        if total == 0:
+            return float("nan")
+        counts = self._counts.sort_index()
+        cumulative = counts.cumsum().to_numpy()
+        values = counts.index.to_numpy(dtype=float)
+        lower = values[np.searchsorted(cumulative, (total - 1) // 2 + 1)]
+        upper = values[np.searchsorted(cumulative, total // 2 + 1)]
+        return (lower + upper) / 2
+
+
+def iter_raw_chunks(file_path: pathlib.Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Yield the raw CSV file in chunks of at most chunksize rows."""
+    logger.info(f"Streaming data from {file_path} in chunks of {chunksize} rows")
+    with pd.read_csv(file_path, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+def drop_seen_keys(df: pd.DataFrame, key: str, seen: SeenKeys) -> pd.DataFrame:
+    """
+    Remove rows whose key appeared in an earlier chunk, then remember this chunk's keys.
+
+    Call this after the per-chunk remove_duplicates() so the chunk itself holds unique keys.
+    """
+    already_seen = seen.contains(df[key])
+    if already_seen.any():
+        df = df[~already_seen]
+    seen.add(df[key])
+    return df
+
+
+def write_chunks(chunks: Iterator[pd.DataFrame], file_path: pathlib.Path) -> int:
+    """
+    Append cleaned chunks to a prepared file and return the number of rows written.
+
+    The format follows the file suffix (CSV or Parquet row groups). Rows go to a temporary
+    file first, so a failed run never leaves a half-written prepared file behind.
+    """
+    row_count = write_table_chunks(chunks, file_path)
+    logger.info(f"Streamed {row_count} rows to {file_path}")
+    return row_count
+
+
+def collect_median(
+    file_path: pathlib.Path,
+    chunksize: int,
+    key: str,
+    column: str,
+    prepare: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+) -> float:
+    """
+    First streaming pass: return the median of `column` over the rows that survive
+    deduplication on `key`, matching what the in-memory path sees when it fills.
+
+    `prepare` is applied to each raw chunk first (e.g. to clean column names).
+    """
+    seen = SeenKeys()
+    running_median = StreamingMedian()
+    for chunk in iter_raw_chunks(file_path, chunksize):
+        if prepare is not None:
+            chunk = prepare(chunk)
+        chunk = chunk.drop_duplicates(subset=[key], keep="first")
+        chunk = drop_seen_keys(chunk, key, seen)
+        running_median.update(chunk[column])
+    median = running_median.median()
+    logger.info(f"Median of {column} across all chunks: {median}")
+    return median
@@ -0,0 +1,276 @@
+r"""
+scripts/data_profiler.py
+
+Single-pass data quality profile of a table: row count, duplicate rows, and per column
+the dtype, null count, distinct count, min, max and mean.
+
+Each column is hashed once per chunk. The same hashes feed the distinct counts and are
+combined into row hashes for the duplicate check, so no statistic needs its own scan.
+
+Two modes:
+
+- exact (default): distinct values and row hashes are kept in SeenKeys (sorted int64
+  runs, about 8 bytes per distinct value). Counts are exact up to 64-bit hash collisions.
+- sketch: distinct counts come from HyperLogLog (16 KB per column, about 1% error) and
+  duplicates from a Bloom filter of row hashes with fixed memory. A false positive can
+  count a new row as a duplicate, so the duplicate count is an upper estimate.
+
+Either mode accepts the table in chunks (DataProfiler.update), so files larger than
+memory can be profiled while streaming.
+
+How to Run (from the root project folder, with the .venv active):
+
+    py scripts\data_profiler.py data\raw\sales_data.csv
+    python3 scripts/data_profiler.py data/raw/sales_data.csv --chunksize 500000 --sketch
+"""
+
+import argparse
+import pathlib
+import sys
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.data_preparation.streaming import DEFAULT_CHUNKSIZE, SeenKeys, iter_raw_chunks  # noqa: E402
+
+# Multiplier used to fold column hashes into one row hash (64-bit FNV prime)
+ROW_HASH_PRIME = np.uint64(0x100000001B3)
+
+# Sketch sizes: 2**14 HyperLogLog registers per column, Bloom filter for this many rows
+HLL_PRECISION: int = 14
+BLOOM_CAPACITY: int = 10_000_000
+BLOOM_ERROR_RATE: float = 0.001
+
+
+def hash_values(values: pd.Series) -> np.ndarray:
+    """
+    Return a uint64 hash per value.
+
+    Numbers are hashed as float64, so chunks of one column hash alike even when
+    pd.read_csv gives one chunk int64 and another float64 (because of missing values).
+    """
+    if is_numeric(values.dtype):
+        values = values.astype("float64")
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def is_numeric(dtype) -> bool:
+    """Return True for number dtypes (not booleans)."""
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def common_dtype(previous: Optional[str], dtype) -> str:
+    """Return the name of a dtype that holds both a column's previous chunks and this one."""
+    if previous is None or previous == str(dtype):
+        return str(dtype)
+    try:
+        return str(np.promote_types(previous, dtype))
+    except TypeError:
+        return "object"
+
+
+class HyperLogLog:
+    """HyperLogLog distinct-count sketch over 64-bit hashes (2**precision one-byte registers)."""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def add(self, hashes: np.ndarray) -> None:
+        """Add uint64 hashes."""
+        width = 64 - self.precision
+        buckets = (hashes >> np.uint64(width)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << width) - 1)
+        # Rank = position of the first 1 bit in the remainder; frexp gives its bit length.
+        # The float conversion can round values just below 2**53 and above up by one bit,
+        # which is negligible for an estimate.
+        bit_length = np.frexp(remainder.astype(np.float64))[1]
+        ranks = (width - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def count(self) -> int:
+        """Return the estimated number of distinct hashes added."""
+        registers = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / registers)
+        estimate = alpha * registers ** 2 / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * registers and empty:
+            estimate = registers * np.log(registers / empty)  # linear counting for small sets
+        return int(round(estimate))
+
+
+class BloomFilter:
+    """
+    Fixed-memory set of 64-bit hashes that may report false positives but never false negatives.
+
+    A blocked Bloom filter: each hash selects one 64-bit word and sets hash_count bits
+    inside it, so adding or looking up a hash touches a single word. Sized for capacity
+    items at the given false positive rate (about 2 MB per million items at 0.1%); the
+    blocking makes the real rate a few times higher (about 0.5% at that setting).
+    """
+
+    def __init__(self, capacity: int = BLOOM_CAPACITY, error_rate: float = BLOOM_ERROR_RATE):
+        bits = -capacity * np.log(error_rate) / np.log(2) ** 2
+        words = 1 << max(0, int(np.ceil(np.log2(bits / 64))))
+        self.mask = np.uint64(words - 1)
+        self.hash_count = min(10, max(1, int(round(bits / capacity * np.log(2)))))
+        self.words = np.zeros(words, dtype=np.uint64)
+
+    def _blocks(self, hashes: np.ndarray) -> tuple:
+        """Return the word index and the bit pattern of each hash."""
+        indexes = (hashes & self.mask).astype(np.int64)
+        mixed = (hashes ^ (hashes >> np.uint64(31))) * np.uint64(0x9E3779B97F4A7C15)
+        patterns = np.zeros(len(hashes), dtype=np.uint64)
+        for slot in range(self.hash_count):
+            patterns |= np.uint64(1) << ((mixed >> np.uint64(6 * slot)) & np.uint64(63))
+        return indexes, patterns
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Return a boolean mask marking hashes that were (probably) added before."""
+        indexes, patterns = self._blocks(hashes)
+        return (self.words[indexes] & patterns) == patterns
+
+    def add(self, hashes: np.ndarray) -> None:
+        indexes, patterns = self._blocks(hashes)
+        np.bitwise_or.at(self.words, indexes, patterns)
+
+
+class DataProfiler:
+    """
+    Accumulates a data quality profile over one or more chunks of the same table.
+
+    Call update() for every chunk, in order, then profile().
+    """
+
+    def __init__(self, sketch: bool = False, capacity: int = BLOOM_CAPACITY):
+        self.sketch = sketch
+        self.rows = 0
+        self.duplicate_count = 0
+        self.dtypes: Dict[str, str] = {}
+        self.null_counts: Dict[str, int] = {}
+        self.sums: Dict[str, float] = {}
+        self.minimums: Dict[str, object] = {}
+        self.maximums: Dict[str, object] = {}
+        self.distinct: Dict[str, object] = {}
+        self.seen_rows = BloomFilter(capacity) if sketch else SeenKeys()
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Fold one chunk into the profile."""
+        row_hashes = np.zeros(len(chunk), dtype=np.uint64)
+        for column in chunk.columns:
+            values = chunk[column]
+            hashes = hash_values(values)
+            row_hashes = (row_hashes ^ hashes) * ROW_HASH_PRIME
+            self._update_column(column, values, hashes)
+        self._update_duplicates(row_hashes)
+        self.rows += len(chunk)
+
+    def _update_column(self, column: str, values: pd.Series, hashes: np.ndarray) -> None:
+        nulls = values.isna().to_numpy()
+        self.dtypes[column] = common_dtype(self.dtypes.get(column), values.dtype)
+        self.null_counts[column] = self.null_counts.get(column, 0) + int(nulls.sum())
+
+        if column not in self.distinct:
+            self.distinct[column] = HyperLogLog() if self.sketch else SeenKeys()
+        present = hashes[~nulls]
+        if self.sketch:
+            self.distinct[column].add(present)
+        else:
+            self.distinct[column].add(pd.Series(present.view(np.int64)))
+
+        numeric = is_numeric(values.dtype)
+        if numeric or pd.api.types.is_datetime64_any_dtype(values.dtype):
+            if nulls.all():
+                return
+            minimum, maximum = values.min(), values.max()
+            if column in self.minimums:
+                minimum = min(minimum, self.minimums[column])
+                maximum = max(maximum, self.maximums[column])
+            self.minimums[column], self.maximums[column] = minimum, maximum
+            if numeric:
+                self.sums[column] = self.sums.get(column, 0.0) + float(values.sum())
+
+    def _update_duplicates(self, row_hashes: np.ndarray) -> None:
+        # Repeats within the chunk, then first occurrences that an earlier chunk already had
+        in_chunk = pd.Series(row_hashes).duplicated().to_numpy()
+        first = row_hashes[~in_chunk]
+        if self.sketch:
+            seen = self.seen_rows.contains(first)
+        else:
+            first = pd.Series(first.view(np.int64))
+            seen = self.seen_rows.contains(first)
+        self.duplicate_count += int(in_chunk.sum()) + int(seen.sum())
+        self.seen_rows.add(first)
+
+    def profile(self) -> Dict[str, object]:
+        """
+        Return the profile gathered so far.
+
+        Returns:
+            dict: {"rows": int, "duplicate_count": int, "approximate": bool, "columns": DataFrame}
+            where "columns" has one row per column with dtype, null_count, distinct_count,
+            min, max and mean (min/max for numeric and datetime columns, mean for numeric ones).
+        """
+        columns = pd.DataFrame(index=pd.Index(list(self.dtypes), name="column"))
+        columns["dtype"] = pd.Series(self.dtypes)
+        columns["null_count"] = pd.Series(self.null_counts, dtype="int64")
+        columns["distinct_count"] = pd.Series(
+            {column: (sketch.count() if self.sketch else len(sketch)) for column, sketch in self.distinct.items()},
+            dtype="int64")
+        columns["min"] = pd.Series(self.minimums, dtype=object)
+        columns["max"] = pd.Series(self.maximums, dtype=object)
+        present = columns["null_count"].rsub(self.rows)
+        columns["mean"] = pd.Series(self.sums, dtype="float64") / present
+        return {"rows": self.rows, "duplicate_count": self.duplicate_count,
+                "approximate": self.sketch, "columns": columns}
+
+
+def profile_data(df: pd.DataFrame, sketch: bool = False, chunksize: Optional[int] = None) -> Dict[str, object]:
+    """
+    Profile an in-memory DataFrame in one pass (see DataProfiler.profile for the result).
+
+    Args:
+        df (pd.DataFrame): The table to profile.
+        sketch (bool): Use HyperLogLog and a Bloom filter instead of exact sets.
+        chunksize (int, optional): Process this many rows at a time to bound temporary memory.
+    """
+    profiler = DataProfiler(sketch=sketch, capacity=max(len(df), 1000))
+    step = chunksize or max(len(df), 1)
+    for start in range(0, len(df), step):
+        profiler.update(df.iloc[start:start + step])
+    return profiler.profile()
+
+
+def profile_csv(file_path: pathlib.Path, chunksize: int = DEFAULT_CHUNKSIZE, sketch: bool = False,
+                capacity: int = BLOOM_CAPACITY) -> Dict[str, object]:
+    """Profile a CSV file while streaming it in chunks (capacity sizes the sketch-mode Bloom filter in rows)."""
+    profiler = DataProfiler(sketch=sketch, capacity=capacity)
+    for chunk in iter_raw_chunks(file_path, chunksize):
+        profiler.update(chunk)
+    return profiler.profile()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Profile a CSV file in a single streaming pass.")
+    parser.add_argument("file", type=pathlib.Path, help="CSV file to profile")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk")
+    parser.add_argument("--sketch", action="store_true",
+                        help="approximate distinct counts and duplicates in bounded memory")
+    parser.add_argument("--capacity", type=int, default=BLOOM_CAPACITY,
+                        help="expected row count, sizes the duplicate filter in --sketch mode")
+    args = parser.parse_args()
+
+    profile = profile_csv(args.file, args.chunksize, args.sketch, args.capacity)
+    label = "approximate" if profile["approximate"] else "exact"
+    print(f"{profile['rows']:,} rows, {profile['duplicate_count']:,} duplicate rows ({label})")
+    print(profile["columns"].to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -10,23 +10,117 @@ Use it to create a DataScrubber object by passing in a DataFrame with your data.
 Then, call the methods, providing arguments as needed to enjoy common, 
 re-usable cleaning and preparation methods. 
 
+Pass lazy=True to only record the cleaning calls (they return the scrubber, so they
+can be chained) and run them all at once with execute(). The recorded plan is
+optimized first (see scripts/scrubber_plan.py) and gives the same result with fewer
+passes and copies.
+
 See the associated test script in the tests folder. 
 
+Importing the class has no logging side effects: the dtype and profiling helpers, which
+log through the project logger (utils/logger.py), are imported when first used.
+
 """
 
-import io
 import pandas as pd
-from typing import Dict, Tuple, Union, List
+from typing import Dict, List, Tuple, Union
+
+from scripts.scrubber_plan import PlanStep, optimize_plan
+from utils.dates import parse_dates
+
 
 class DataScrubber:
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, lazy: bool = False):
         """
         Initialize the DataScrubber with a DataFrame.
         
         Parameters:
             df (pd.DataFrame): The DataFrame to be scrubbed.
+            lazy (bool, optional): If True, cleaning methods only record a plan step until execute().
         """
         self.df = df
+        self.lazy = lazy
+        self.plan: List[PlanStep] = []
+        self.dtype_report: Dict[str, object] = {}
+
+    def _record(self, op: str, **args) -> "DataScrubber":
+        """Record one cleaning call in the lazy plan and return the scrubber for chaining."""
+        self.plan.append(PlanStep(op, args))
+        return self
+
+    def explain(self) -> List[str]:
+        """
+        Describe the optimized plan that execute() would run.
+        
+        Returns:
+            list: One line per step, e.g. "filter_rows(conditions=[('between', 'Score', 0, 100)])".
+        """
+        return [f"{step.op}({', '.join(f'{key}={value!r}' for key, value in step.args.items())})"
+                for step in optimize_plan(self.plan)]
+
+    def execute(self) -> pd.DataFrame:
+        """
+        Run the recorded plan (lazy mode) and clear it.
+        
+        Returns:
+            pd.DataFrame: The cleaned DataFrame (also kept in self.df).
+        """
+        steps, self.plan = optimize_plan(self.plan), []
+        lazy, self.lazy = self.lazy, False
+        try:
+            for step in steps:
+                if step.op == "filter_rows":
+                    self._filter_rows(step.args["conditions"])
+                elif step.op == "format_strings":
+                    self._format_strings(step.args["column"], step.args["cases"])
+                else:
+                    getattr(self, step.op)(**step.args)
+        finally:
+            self.lazy = lazy
+        return self.df
+
+    def _filter_rows(self, conditions: List[tuple]) -> pd.DataFrame:
+        """Apply several row filters with one combined mask and a single copy."""
+        mask = pd.Series(True, index=self.df.index)
+        for condition in conditions:
+            if condition[0] == "notna":
+                mask &= self.df.notna().all(axis=1)
+                continue
+            _, column, lower_bound, upper_bound = condition
+            if column not in self.df.columns:
+                raise ValueError(f"Column name '{column}' not found in the DataFrame.")
+            mask &= (self.df[column] >= lower_bound) & (self.df[column] <= upper_bound)
+        self.df = self.df[mask]
+        return self.df
+
+    def _format_strings(self, column: str, cases: List[str]) -> pd.DataFrame:
+        """Apply a chain of case changes to a string column, trimming once at the end."""
+        try:
+            values = self.df[column]
+        except KeyError:
+            raise ValueError(f"Column name '{column}' not found in the DataFrame.")
+        for case in cases:
+            values = values.str.lower() if case == "lower" else values.str.upper()
+        self.df[column] = values.str.strip()
+        return self.df
+
+    def profile_data(self, sketch: bool = False, chunksize: Union[None, int] = None) -> Dict[str, object]:
+        """
+        Profile the data in one pass: duplicate rows, and per column the dtype, null count,
+        distinct count, min, max and mean (see scripts/data_profiler.py).
+        
+        Parameters:
+            sketch (bool, optional): Estimate distinct counts and duplicates in bounded memory.
+            chunksize (int, optional): Profile this many rows at a time.
+        
+        Returns:
+            dict: {'rows', 'duplicate_count', 'approximate', 'columns'}, where 'columns' is a DataFrame.
+        """
+        from scripts.data_profiler import profile_data
+
+        if self.plan:
+            self.execute()
+        return profile_data(self.df, sketch=sketch, chunksize=chunksize)
 
     def check_data_consistency_before_cleaning(self) -> Dict[str, Union[pd.Series, int]]:
         """
@@ -35,6 +129,8 @@ class DataScrubber:
         Returns:
             dict: Dictionary with counts of null values and duplicate rows.
         """
+        if self.plan:
+            self.execute()
         null_counts = self.df.isnull().sum()
         duplicate_count = self.df.duplicated().sum()
         return {'null_counts': null_counts, 'duplicate_count': duplicate_count}
@@ -46,6 +142,8 @@ class DataScrubber:
         Returns:
             dict: Dictionary with counts of null values and duplicate rows, expected to be zero for each.
         """
+        if self.plan:
+            self.execute()
         null_counts = self.df.isnull().sum()
         duplicate_count = self.df.duplicated().sum()
         assert null_counts.sum() == 0, "Data still contains null values after cleaning."
@@ -66,6 +164,8 @@ class DataScrubber:
         Raises:
             ValueError: If the specified column not found in the DataFrame.
         """
+        if self.lazy:
+            return self._record("convert_column_to_new_data_type", column=column, new_type=new_type)
         try:
             self.df[column] = self.df[column].astype(new_type)
             return self.df
@@ -85,6 +185,8 @@ class DataScrubber:
         Raises:
             ValueError: If a specified column is not found in the DataFrame.
         """
+        if self.lazy:
+            return self._record("drop_columns", columns=list(columns))
         for column in columns:
             if column not in self.df.columns:
                 raise ValueError(f"Column name '{column}' not found in the DataFrame.")
@@ -106,6 +208,8 @@ class DataScrubber:
         Raises:
             ValueError: If the specified column not found in the DataFrame.
         """
+        if self.lazy:
+            return self._record("filter_column_outliers", column=column, lower_bound=lower_bound, upper_bound=upper_bound)
         try:
             self.df = self.df[(self.df[column] >= lower_bound) & (self.df[column] <= upper_bound)]
             return self.df
@@ -125,6 +229,8 @@ class DataScrubber:
         Raises:
             ValueError: If the specified column not found in the DataFrame.
         """
+        if self.lazy:
+            return self._record("format_column_strings_to_lower_and_trim", column=column)
         try:
             self.df[column] = self.df[column].str.lower().str.strip()
             return self.df
@@ -144,6 +250,8 @@ class DataScrubber:
         Raises:
             ValueError: If the specified column not found in the DataFrame.
         """
+        if self.lazy:
+            return self._record("format_column_strings_to_upper_and_trim", column=column)
         try:
             # TODO: Fix the following logic to call str.upper() and str.strip() on the given column 
             # HINT: See previous function for an example
@@ -163,6 +271,8 @@ class DataScrubber:
         Returns:
             pd.DataFrame: Updated DataFrame with missing data handled.
         """
+        if self.lazy:
+            return self._record("handle_missing_data", drop=drop, fill_value=fill_value)
         if drop:
             self.df = self.df.dropna()
         elif fill_value is not None:
@@ -171,23 +281,53 @@ class DataScrubber:
 
     def inspect_data(self) -> Tuple[str, str]:
         """
-        Inspect the data by providing DataFrame information and summary statistics.
+        Inspect the data by providing DataFrame information and summary statistics,
+        all taken from one profiling pass (see profile_data()).
         
         Returns:
-            tuple: (info_str, describe_str), where `info_str` is a string representation of DataFrame.info()
-                   and `describe_str` is a string representation of DataFrame.describe().
+            tuple: (info_str, describe_str), where `info_str` gives the row, column and duplicate counts,
+                   memory use, and each column's dtype and non-null count (like DataFrame.info()), and
+                   `describe_str` gives each column's null and distinct counts, min, max and mean.
         """
-        buffer = io.StringIO()
-        self.df.info(buf=buffer)
-        info_str = buffer.getvalue()  # Retrieve the string content of the buffer
-
-        # Capture the describe output as a string
-        describe_str = self.df.describe().to_string()  # Convert DataFrame.describe() output to a string
+        profile = self.profile_data()
+        columns = profile['columns']
+        non_null = columns.assign(non_null_count=profile['rows'] - columns['null_count'])
+        info_str = (
+            f"{profile['rows']} rows, {len(columns)} columns, {profile['duplicate_count']} duplicate rows, "
+            f"memory usage: {self.df.memory_usage().sum() / 1024:.1f} KB\n"
+            f"{non_null[['dtype', 'non_null_count']].to_string()}\n"
+        )
+        describe_str = columns.drop(columns='dtype').to_string()
         return info_str, describe_str
 
+    def optimize_dtypes(self, category_max_ratio: Union[None, float] = None,
+                        exclude: Union[None, List[str]] = None) -> pd.DataFrame:
+        """
+        Shrink the DataFrame's memory: downcast numbers to the smallest exact dtype and turn
+        low-cardinality string columns into categoricals (see scripts/data_preparation/dtypes.py).
+        
+        Parameters:
+            category_max_ratio (float, optional): Largest distinct/rows ratio for a string column to become
+                categorical; defaults to CATEGORY_MAX_RATIO in dtypes.py.
+            exclude (list, optional): Columns to leave unchanged.
+        
+        Returns:
+            pd.DataFrame: Updated DataFrame; the memory saved is reported in self.dtype_report.
+        """
+        if self.lazy:
+            return self._record("optimize_dtypes", category_max_ratio=category_max_ratio,
+                                exclude=list(exclude) if exclude else None)
+        from scripts.data_preparation.dtypes import CATEGORY_MAX_RATIO, optimize_dtypes
+
+        if category_max_ratio is None:
+            category_max_ratio = CATEGORY_MAX_RATIO
+        self.df, self.dtype_report = optimize_dtypes(self.df, category_max_ratio, exclude)
+        return self.df
+
     def parse_dates_to_add_standard_datetime(self, column: str) -> pd.DataFrame:
         """
         Parse a specified column as datetime format and add it as a new column named 'StandardDateTime'.
+        Each distinct date string is parsed once, with the explicit formats of utils/dates.py.
         
         Parameters:
             column (str): Name of the column to parse as datetime.
@@ -198,8 +338,10 @@ class DataScrubber:
         Raises:
             ValueError: If the specified column not found in the DataFrame.
         """
+        if self.lazy:
+            return self._record("parse_dates_to_add_standard_datetime", column=column)
         try:
-            self.df['StandardDateTime'] = pd.to_datetime(self.df[column])
+            self.df['StandardDateTime'] = parse_dates(self.df[column])
             return self.df
         except KeyError:
             raise ValueError(f"Column name '{column}' not found in the DataFrame.")
@@ -212,6 +354,8 @@ class DataScrubber:
             pd.DataFrame: Updated DataFrame with duplicates removed.
 
         """
+        if self.lazy:
+            return self._record("remove_duplicate_records")
         self.df = self.df.drop_duplicates()
         return self.df
 
@@ -228,6 +372,8 @@ class DataScrubber:
         Raises:
             ValueError: If a specified column is not found in the DataFrame.
         """
+        if self.lazy:
+            return self._record("rename_columns", column_mapping=dict(column_mapping))
 
         for old_name, new_name in column_mapping.items():
             if old_name not in self.df.columns:
@@ -249,6 +395,8 @@ class DataScrubber:
         Raises:
             ValueError: If a specified column is not found in the DataFrame.
         """
+        if self.lazy:
+            return self._record("reorder_columns", columns=list(columns))
         for column in columns:
             if column not in self.df.columns:
                 raise ValueError(f"Column name '{column}' not found in the DataFrame.")
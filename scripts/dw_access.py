@@ -0,0 +1,170 @@
+"""
+scripts/dw_access.py
+
+Shared, pooled access to the SQLite data warehouse.
+
+Opening a connection per function call, in the default rollback-journal mode, means a
+load in progress locks out every reader until it commits. This module keeps a small
+pool of connections per warehouse file instead:
+
+- the warehouse is switched to WAL journaling, so readers keep reading the last
+  committed state while a load writes, and a load never waits for readers
+- readers get read-only connections (a file: URI with mode=ro, plus PRAGMA query_only),
+  several at a time, handed out to one thread at a time
+- writers share a single read-write connection per file, so writes from this process
+  queue up in the pool instead of failing with "database is locked"
+- connections live as long as the process, so sqlite3's per-connection statement
+  cache (CACHED_STATEMENTS) keeps repeated queries prepared between calls
+
+Do not run this script directly. etl_to_dw.py and olap_cubing.py use it, and
+benchmarks/bench_concurrent_reads.py measures readers during a load.
+"""
+
+import atexit
+import contextlib
+import pathlib
+import queue
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Tuple
+
+# Read-only connections kept per warehouse file
+READER_POOL_SIZE: int = 4
+
+# Seconds a connection waits for a lock held by another process before raising
+BUSY_TIMEOUT: float = 30.0
+
+# Prepared statements kept per connection (sqlite3 reuses them by SQL text)
+CACHED_STATEMENTS: int = 256
+
+
+def connect(db_path: pathlib.Path, read_only: bool = False) -> sqlite3.Connection:
+    """
+    Open a warehouse connection that may be handed between threads.
+
+    Writers create the warehouse folder if needed and switch the file to WAL (a persistent
+    setting); readers open it through a read-only URI, so a reader can never take the write lock.
+    """
+    if read_only:
+        conn = sqlite3.connect(f"{pathlib.Path(db_path).resolve().as_uri()}?mode=ro", uri=True,
+                               timeout=BUSY_TIMEOUT, cached_statements=CACHED_STATEMENTS, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        pathlib.Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, cached_statements=CACHED_STATEMENTS,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")  # durable under WAL
+    return conn
+
+
+class ConnectionPool:
+    """
+    A fixed number of connections to one warehouse file, each used by one thread at a time.
+
+    Connections are opened on first use. A thread asking when all of them are busy
+    waits until one is returned.
+    """
+
+    def __init__(self, db_path: pathlib.Path, size: int, read_only: bool):
+        self.db_path = pathlib.Path(db_path)
+        self.size = size
+        self.read_only = read_only
+        self.idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self.opened: List[sqlite3.Connection] = []
+        self.lock = threading.Lock()
+
+    def acquire(self) -> sqlite3.Connection:
+        """Return an idle connection, opening a new one while the pool is below its size."""
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if len(self.opened) < self.size:
+                conn = connect(self.db_path, self.read_only)
+                self.opened.append(conn)
+                return conn
+        return self.idle.get()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection to the pool, ending any transaction left open."""
+        if conn.in_transaction:
+            conn.rollback()
+        self.idle.put(conn)
+
+    @contextlib.contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """Close every connection of the pool (busy ones included)."""
+        with self.lock:
+            for conn in self.opened:
+                conn.close()
+            self.opened.clear()
+            self.idle = queue.LifoQueue()
+
+
+_pools: Dict[Tuple[pathlib.Path, bool], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: pathlib.Path, read_only: bool) -> ConnectionPool:
+    """Return the reader or writer pool of a warehouse file, creating it on first use."""
+    key = (pathlib.Path(db_path).resolve(), read_only)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(key[0], READER_POOL_SIZE if read_only else 1, read_only)
+        return _pools[key]
+
+
+@contextlib.contextmanager
+def reader(db_path: pathlib.Path) -> Iterator[sqlite3.Connection]:
+    """Borrow a pooled read-only connection to the warehouse."""
+    with get_pool(db_path, read_only=True).connection() as conn:
+        yield conn
+
+
+@contextlib.contextmanager
+def writer(db_path: pathlib.Path) -> Iterator[sqlite3.Connection]:
+    """
+    Borrow the warehouse's read-write connection (one per file, so writers take turns).
+
+    Commits when the block finishes and rolls back if it raises.
+    """
+    with get_pool(db_path, read_only=False).connection() as conn:
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+
+def checkpoint(db_path: pathlib.Path) -> None:
+    """
+    Copy every committed change from the -wal file into the main warehouse file and empty the -wal.
+
+    Called after loads and cube refreshes, so the main file alone holds the current data
+    (and hashes the same as it will once the process exits).
+    """
+    with writer(db_path) as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def close_pools(db_path: pathlib.Path = None) -> None:
+    """Close the pooled connections of one warehouse file, or of every file."""
+    with _pools_lock:
+        for key in list(_pools):
+            if db_path is None or key[0] == pathlib.Path(db_path).resolve():
+                _pools.pop(key).close()
+
+
+atexit.register(close_pools)
@@ -0,0 +1,159 @@
+"""
+scripts/dw_bulk_loader.py
+
+Bulk-insert fast path for loading the SQLite data warehouse.
+
+pandas DataFrame.to_sql runs with default journaling and keeps every index up to date
+while rows arrive. This module loads the same DataFrames with:
+
+- executemany() over batches of plain Python tuples, all inside one transaction
+- tunable PRAGMAs for the load (journal_mode, synchronous, cache_size, temp_store)
+- secondary indexes dropped before the load and rebuilt once the data is in
+
+Do not run this script directly. etl_to_dw.py uses it, and
+benchmarks/bench_bulk_load.py compares it with the to_sql path.
+"""
+
+import contextlib
+import sqlite3
+import pathlib
+import sys
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+# For local imports, temporarily add project root to sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+
+# Rows per executemany() call
+DEFAULT_BATCH_SIZE: int = 50_000
+
+# PRAGMAs applied for the duration of a load.
+# WAL lets readers keep reading during the load, synchronous=NORMAL is durable under WAL,
+# and a negative cache_size is in KiB (-262144 = 256 MB of page cache).
+DEFAULT_LOAD_PRAGMAS: Dict[str, object] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -262144,
+    "temp_store": "MEMORY",
+}
+
+
+def apply_load_pragmas(conn: sqlite3.Connection, pragmas: Optional[Dict[str, object]] = None) -> Dict[str, object]:
+    """
+    Apply load PRAGMAs and return their previous values so they can be restored.
+
+    Must be called outside of a transaction, because journal_mode cannot change inside one.
+    """
+    pragmas = DEFAULT_LOAD_PRAGMAS if pragmas is None else pragmas
+    previous = {}
+    for name, value in pragmas.items():
+        previous[name] = conn.execute(f"PRAGMA {name}").fetchone()[0]
+        conn.execute(f"PRAGMA {name} = {value}")
+    logger.info(f"Applied load PRAGMAs: {pragmas}")
+    return previous
+
+
+def restore_pragmas(conn: sqlite3.Connection, previous: Dict[str, object]) -> None:
+    """
+    Restore the PRAGMAs changed by apply_load_pragmas to their previous values.
+
+    Must be called outside of a transaction, like apply_load_pragmas. journal_mode is
+    stored in the database file, so it is only set back when the load changed it.
+    """
+    for name, value in previous.items():
+        if name == "journal_mode" and str(conn.execute("PRAGMA journal_mode").fetchone()[0]).lower() == str(value).lower():
+            continue
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def to_records(df: pd.DataFrame) -> List[tuple]:
+    """
+    Convert a DataFrame to a list of tuples of plain Python values for executemany().
+
+    Missing values become None and datetimes become the same text to_sql would write.
+    """
+    columns = []
+    for _, column in df.items():
+        if pd.api.types.is_datetime64_any_dtype(column.dtype):
+            column = column.dt.strftime("%Y-%m-%d %H:%M:%S")
+        if column.isna().any():
+            column = column.astype(object).where(column.notna(), None)
+        columns.append(column.tolist())
+    return list(zip(*columns))
+
+
+def iter_batches(df: pd.DataFrame, batch_size: int) -> Iterator[List[tuple]]:
+    """Yield the rows of a DataFrame as lists of at most batch_size tuples."""
+    for start in range(0, len(df), batch_size):
+        yield to_records(df.iloc[start:start + batch_size])
+
+
+def bulk_insert(df: pd.DataFrame, table: str, cursor: sqlite3.Cursor, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Append a DataFrame to a table with batched executemany() and return the row count.
+
+    Does not commit; the caller owns the transaction.
+    """
+    columns = df.columns.tolist()
+    statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    for batch in iter_batches(df, batch_size):
+        cursor.executemany(statement, batch)
+    logger.info(f"Bulk inserted {len(df)} rows into {table}")
+    return len(df)
+
+
+@contextlib.contextmanager
+def deferred_indexes(cursor: sqlite3.Cursor, tables: List[str]) -> Iterator[List[str]]:
+    """
+    Drop the secondary indexes of the given tables and rebuild them on exit.
+
+    Indexes created implicitly by PRIMARY KEY or UNIQUE constraints have no SQL and are kept.
+    The indexes are rebuilt even if the body raises, so a caller without a transaction to
+    roll back never loses them.
+    """
+    placeholders = ", ".join("?" for _ in tables)
+    cursor.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})",
+        tables,
+    )
+    indexes = cursor.fetchall()
+    for name, _ in indexes:
+        cursor.execute(f"DROP INDEX {name}")
+    try:
+        yield [name for name, _ in indexes]
+    finally:
+        for _, sql in indexes:
+            cursor.execute(sql)
+        if indexes:
+            logger.info(f"Rebuilt {len(indexes)} secondary indexes after the load")
+
+
+def bulk_load(
+    conn: sqlite3.Connection,
+    frames: Dict[str, pd.DataFrame],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    defer_indexes: bool = True,
+) -> None:
+    """
+    Append several DataFrames (table name -> DataFrame) in a single transaction and commit.
+
+    An already open transaction (e.g. one that just deleted the old rows) is joined and committed.
+    Call apply_load_pragmas first if the load should run with the tuned PRAGMAs.
+    """
+    cursor = conn.cursor()
+    if not conn.in_transaction:
+        # Open the transaction explicitly so dropping indexes is part of it too
+        cursor.execute("BEGIN")
+    try:
+        with deferred_indexes(cursor, list(frames)) if defer_indexes else contextlib.nullcontext():
+            for table, df in frames.items():
+                bulk_insert(df, table, cursor, batch_size)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
@@ -3,10 +3,17 @@ Module 4: Data Warehouse Creation Script
 File: scripts/dw_create.py
 
 This script handles the creation of the SQLite data warehouse. It creates tables
-for customer, product, and sale in the 'data/smart_sale.db' database.
+for customer, product, and sale in the 'data/smart_sale.db' database, plus the date,
+region, store, campaign and payment type dimensions whose integer keys the sales store.
 Each table creation is handled in a separate function for easier testing and error handling.
+
+Run with --incremental to upsert only the new or changed rows of the prepared files,
+and delete the rows that were removed from them, instead of deleting and reloading
+every table.
 """
 
+import argparse
+import numpy as np
 import pandas as pd
 import sqlite3
 import pathlib
@@ -17,21 +24,103 @@ PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
+from utils.logger import logger  # noqa: E402
+from utils.dates import build_date_dimension, date_keys, parse_dates  # noqa: E402
+from utils.metrics import instrument, record_rows  # noqa: E402
+from utils.storage import find_table, hash_file, read_table  # noqa: E402
+from scripts.dw_access import checkpoint, writer  # noqa: E402
+from scripts.dw_bulk_loader import apply_load_pragmas, bulk_insert, bulk_load, restore_pragmas, to_records  # noqa: E402
+from scripts.olap.cube_store import clear_cube_state, lowest_watermark  # noqa: E402
+
 # Constants
 DW_DIR = pathlib.Path("data").joinpath("dw")
 DB_PATH = DW_DIR.joinpath("smart_sales.db")
 PREPARED_DATA_DIR = pathlib.Path("data").joinpath("prepared")
 
+# Warehouse table -> (prepared table name, primary key), in load order.
+# Prepared tables may be Parquet or CSV; find_table() prefers SMART_STORE_FORMAT.
+WAREHOUSE_TABLES = {
+    "customer": ("customers_data_prepared", "customer_id"),
+    "product": ("products_data_prepared", "product_id"),
+    "sale": ("sales_data_prepared", "sale_id"),
+}
+
+# The prep scripts keep the raw files' column names; the warehouse uses snake_case ones.
+# Prepared files already written with the warehouse names load unchanged.
+PREPARED_COLUMNS = {
+    "CustomerID": "customer_id", "Name": "name", "Region": "region", "JoinDate": "join_date",
+    "LastActiveYear": "last_active_year", "PreferredContactMethod": "preferred_contact_method",
+    "ProductID": "product_id", "ProductName": "product_name", "Category": "category", "UnitPrice": "unit_price",
+    "StockQuantity": "stock_quantity", "StoreSection": "store_section",
+    "TransactionID": "sale_id", "SaleDate": "sale_date", "StoreID": "store_id", "CampaignID": "campaign_id",
+    "SaleAmount": "sale_amount", "DiscountPercent": "discount_percent", "PaymentType": "payment_type",
+}
+
+# Star schema: labels live in dimension tables with integer surrogate keys, and the warehouse
+# rows store only the keys. Prepared column -> (dimension table, key column, label column).
+# The load replaces each label with its key, adding labels the dimension has not seen yet.
+DIMENSION_COLUMNS = {
+    "customer": {"region": ("region_dim", "region_key", "region_name")},
+    "sale": {
+        "store_id": ("store_dim", "store_key", "store_id"),
+        "campaign_id": ("campaign_dim", "campaign_key", "campaign_id"),
+        "payment_type": ("payment_type_dim", "payment_type_key", "payment_type_name"),
+    },
+}
+
+# Warehouse columns of the joined tables that the stored OLAP cubes group sales by (see
+# SALES_CUBE_QUERY in olap/olap_cubing.py). Changing one moves sales that are already folded
+# into a cube cell to another cell. Products join the cube on product_id alone, so a product
+# change never moves a sale; add its columns here if the cube starts grouping on them.
+CUBE_GROUPING_COLUMNS = {
+    "customer": ["region_key"],
+    "product": [],
+}
+
+# Tables the stored OLAP cubes inner-join sales to, with the sale column that references them
+# (see SALES_CUBE_QUERY). Deleting one of their rows drops that row's sales from the cubes.
+CUBE_JOINED_TABLES = {
+    "customer": "customer_id",
+}
+
+# Keys per IN (...) lookup, below SQLite's default limit on query parameters
+LOOKUP_BATCH_ROWS = 500
+
+# Stored in PRAGMA user_version; migrate_schema() upgrades warehouses created with an older one.
+# 1: sale.date_key and the date_dim calendar table.
+# 2: region, store, campaign and payment type dimensions; sales hold only keys and measures.
+SCHEMA_VERSION = 2
+
+# Secondary indexes managed as part of the schema (index name -> table and columns).
+# INTEGER PRIMARY KEY columns are the rowid, so every index already carries them.
+WAREHOUSE_INDEXES = {
+    # Covering index for the OLAP cube join: sale -> customer, sale -> product, plus the measures
+    "idx_sale_cube": "sale (customer_id, product_id, date_key, sale_amount)",
+    "idx_sale_product_id": "sale (product_id)",
+    # Covering index for date-range scans (date_key is YYYYMMDD, so ranges compare correctly)
+    "idx_sale_date": "sale (date_key, sale_amount, customer_id, product_id)",
+    # Dimension lookups (also cover the customer_id / product_id join keys)
+    "idx_customer_region": "customer (region_key)",
+    "idx_product_name": "product (product_name)",
+}
+
 def create_schema(cursor: sqlite3.Cursor) -> None:
-    """Create tables in the data warehouse if they don't exist."""
+    """Create tables in the data warehouse if they don't exist, upgrading older warehouses."""
+    create_tables(cursor)
+    migrate_schema(cursor)
+    create_indexes(cursor)
+
+def create_tables(cursor: sqlite3.Cursor) -> None:
+    """Create the fact and dimension tables if they don't exist."""
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS customer (
             customer_id INTEGER PRIMARY KEY,
             name TEXT,
-            region TEXT,
+            region_key INTEGER,
             join_date TEXT,
             last_active_year INTEGER,
-            preferred_contact_method TEXT
+            preferred_contact_method TEXT,
+            FOREIGN KEY (region_key) REFERENCES region_dim (region_key)
         )
     """)
     
@@ -46,28 +135,188 @@ def create_schema(cursor: sqlite3.Cursor) -> None:
         )
     """)
     
+    # Fact table: integer keys and measures only
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS sale (
             sale_id INTEGER PRIMARY KEY,
             customer_id INTEGER,
             product_id INTEGER,
-            store_id INTEGER,
-            campaign_id INTEGER,
+            store_key INTEGER,
+            campaign_key INTEGER,
+            payment_type_key INTEGER,
+            date_key INTEGER,
             sale_amount REAL,
-            sale_date TEXT,
             discount_percent REAL,
-            payment_type TEXT,
             FOREIGN KEY (customer_id) REFERENCES customer (customer_id),
-            FOREIGN KEY (product_id) REFERENCES product (product_id)
+            FOREIGN KEY (product_id) REFERENCES product (product_id),
+            FOREIGN KEY (store_key) REFERENCES store_dim (store_key),
+            FOREIGN KEY (campaign_key) REFERENCES campaign_dim (campaign_key),
+            FOREIGN KEY (payment_type_key) REFERENCES payment_type_dim (payment_type_key),
+            FOREIGN KEY (date_key) REFERENCES date_dim (date_key)
+        )
+    """)
+
+    # Calendar dimension: one row per day, keyed by YYYYMMDD
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS date_dim (
+            date_key INTEGER PRIMARY KEY,
+            full_date TEXT,
+            year INTEGER,
+            quarter INTEGER,
+            month INTEGER,
+            day INTEGER,
+            day_of_week TEXT,
+            day_of_week_number INTEGER
+        )
+    """)
+
+    # Label dimensions: a surrogate key per distinct label (see DIMENSION_COLUMNS)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS region_dim (
+            region_key INTEGER PRIMARY KEY,
+            region_name TEXT UNIQUE
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS store_dim (
+            store_key INTEGER PRIMARY KEY,
+            store_id INTEGER UNIQUE
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS campaign_dim (
+            campaign_key INTEGER PRIMARY KEY,
+            campaign_id INTEGER UNIQUE
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS payment_type_dim (
+            payment_type_key INTEGER PRIMARY KEY,
+            payment_type_name TEXT UNIQUE
+        )
+    """)
+
+def migrate_schema(cursor: sqlite3.Cursor) -> None:
+    """Upgrade a warehouse created with an older schema version to SCHEMA_VERSION."""
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    if version < 2:
+        # Versions 0 and 1 kept the labels (and sale_date) in the rows. Both tables are
+        # read back, recreated and reloaded through to_warehouse_rows(), which also
+        # fills in the date keys and calendar that version 0 did not have.
+        frames = {}
+        for table, dimensions in DIMENSION_COLUMNS.items():
+            columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+            if set(dimensions).issubset(columns):
+                frames[table] = pd.read_sql_query(f"SELECT * FROM {table}", cursor.connection)
+        for table in frames:
+            cursor.execute(f"DROP TABLE {table}")
+        create_tables(cursor)
+        for table, df in frames.items():
+            bulk_insert(to_warehouse_rows(table, df, cursor), table, cursor)
+        if frames:
+            clear_cube_state(cursor)
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+def create_indexes(cursor: sqlite3.Cursor) -> None:
+    """Create the managed secondary indexes if they don't exist."""
+    for name, target in WAREHOUSE_INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+
+def create_load_state(cursor: sqlite3.Cursor) -> None:
+    """Create the bookkeeping tables used by incremental loads if they don't exist."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS etl_file_state (
+            table_name TEXT PRIMARY KEY,
+            file_hash TEXT
         )
     """)
 
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS etl_row_hash (
+            table_name TEXT,
+            row_key INTEGER,
+            row_hash INTEGER,
+            PRIMARY KEY (table_name, row_key)
+        ) WITHOUT ROWID
+    """)
+
 def delete_existing_records(cursor: sqlite3.Cursor) -> None:
-    """Delete all existing records from the customer, product, and sale tables."""
+    """
+    Delete all existing records from the customer, product, and sale tables.
+
+    Dimension tables are kept, so labels keep their surrogate keys across reloads.
+    """
     cursor.execute("DELETE FROM customer")
     cursor.execute("DELETE FROM product")
     cursor.execute("DELETE FROM sale")
 
+    # A full reload invalidates whatever the incremental loader remembered
+    create_load_state(cursor)
+    cursor.execute("DELETE FROM etl_file_state")
+    cursor.execute("DELETE FROM etl_row_hash")
+    clear_cube_state(cursor)
+
+def add_date_keys(sales_df: pd.DataFrame) -> pd.DataFrame:
+    """Return the sales with a date_key column (YYYYMMDD) parsed from sale_date."""
+    return sales_df.assign(date_key=date_keys(parse_dates(sales_df["sale_date"], errors="coerce")))
+
+def insert_date_dimension(keys: pd.Series, cursor: sqlite3.Cursor) -> int:
+    """Add the calendar days from the earliest to the latest date key to date_dim; return the days added."""
+    keys = keys.dropna()
+    if keys.empty:
+        return 0
+    start, end = (pd.to_datetime(str(int(key)), format="%Y%m%d") for key in (keys.min(), keys.max()))
+    days = build_date_dimension(start, end)
+    before = cursor.connection.total_changes
+    columns = ", ".join(days.columns)
+    cursor.executemany(
+        f"INSERT OR IGNORE INTO date_dim ({columns}) VALUES ({', '.join('?' for _ in days.columns)})",
+        to_records(days),
+    )
+    return cursor.connection.total_changes - before
+
+def lookup_dimension_keys(values: pd.Series, dimension: tuple, cursor: sqlite3.Cursor) -> pd.Series:
+    """
+    Return the surrogate key of each label, adding the labels not yet in the dimension table.
+
+    New labels are added in sorted order, so the same data gets the same keys however it is loaded.
+
+    Args:
+        values (pd.Series): Labels (missing values get a missing key).
+        dimension (tuple): (dimension table, key column, label column) from DIMENSION_COLUMNS.
+        cursor (sqlite3.Cursor): Cursor of the warehouse connection.
+
+    Returns:
+        pd.Series: Int64 keys with the index of values.
+    """
+    table, key_column, label_column = dimension
+    labels = sorted(values.dropna().unique().tolist())
+    cursor.executemany(f"INSERT OR IGNORE INTO {table} ({label_column}) VALUES (?)", [(label,) for label in labels])
+    keys = dict(cursor.execute(f"SELECT {label_column}, {key_column} FROM {table}").fetchall())
+    return values.map(keys).astype("Int64")
+
+def read_prepared_table(file_path: pathlib.Path) -> pd.DataFrame:
+    """Read a prepared file with its columns renamed to the warehouse column names."""
+    return read_table(file_path).rename(columns=PREPARED_COLUMNS)
+
+def to_warehouse_rows(table: str, df: pd.DataFrame, cursor: sqlite3.Cursor) -> pd.DataFrame:
+    """
+    Turn prepared rows into warehouse rows: labels become dimension keys, and sales get
+    their date_key (with the calendar days it needs) in place of sale_date.
+    """
+    df = df.copy()
+    for column, dimension in DIMENSION_COLUMNS.get(table, {}).items():
+        df[column] = lookup_dimension_keys(df[column], dimension, cursor)
+        df = df.rename(columns={column: dimension[1]})
+    if table == "sale":
+        df = add_date_keys(df).drop(columns=["sale_date"])
+        insert_date_dimension(df["date_key"], cursor)
+    return df
+
 def insert_customers(customers_df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
     """Insert customer data into the customer table."""
     customers_df.to_sql("customer", cursor.connection, if_exists="append", index=False)
@@ -80,30 +329,229 @@ def insert_sales(sales_df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
     """Insert sales data into the sales table."""
     sales_df.to_sql("sale", cursor.connection, if_exists="append", index=False)
 
-def load_data_to_db() -> None:
-    try:
-        # Connect to SQLite – will create the file if it doesn't exist
-        conn = sqlite3.connect(DB_PATH)
+def hash_rows(df: pd.DataFrame) -> pd.Series:
+    """
+    Return one signed 64-bit hash per row, suitable for an SQLite INTEGER column.
+
+    Numbers are widened to 64 bits first, so a row hashes the same whether its prepared
+    file kept the downcast dtypes (Parquet) or was re-read with the defaults (CSV).
+    """
+    widened = {
+        column: "float64" if pd.api.types.is_float_dtype(dtype) else "int64"
+        for column, dtype in df.dtypes.items()
+        if isinstance(dtype, np.dtype) and dtype.kind in "iuf" and dtype.itemsize < 8
+    }
+    return pd.util.hash_pandas_object(df.astype(widened) if widened else df, index=False).astype("int64")
+
+def find_changed_rows(df: pd.DataFrame, table: str, key: str, cursor: sqlite3.Cursor) -> tuple:
+    """
+    Return the rows of df that are new or differ from the last incremental load,
+    how many of them update a row that was loaded before, and the keys of the rows
+    that were loaded before but are no longer in df.
+
+    Rows are compared by hash against etl_row_hash, so the warehouse table itself is never scanned.
+    """
+    cursor.execute("SELECT row_key, row_hash FROM etl_row_hash WHERE table_name = ?", (table,))
+    stored = cursor.fetchall()
+    stored_hashes = pd.Series([row_hash for _, row_hash in stored],
+                              index=[row_key for row_key, _ in stored], dtype="Int64")
+    previous = stored_hashes.reindex(df[key].to_numpy())
+    changed = previous.ne(hash_rows(df).to_numpy()).fillna(True).to_numpy(dtype=bool)
+    updated_count = int((changed & previous.notna().to_numpy()).sum())
+    removed_keys = stored_hashes.index[~stored_hashes.index.isin(df[key].to_numpy())].tolist()
+    return df[changed], updated_count, removed_keys
+
+def upsert_rows(df: pd.DataFrame, table: str, key: str, cursor: sqlite3.Cursor) -> None:
+    """Insert warehouse rows, replacing the non-key columns of rows whose key already exists."""
+    columns = df.columns.tolist()
+    updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != key)
+    cursor.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT ({key}) DO UPDATE SET {updates}",
+        to_records(df),
+    )
+
+def delete_rows(keys: list, table: str, key: str, cursor: sqlite3.Cursor) -> None:
+    """Delete warehouse rows by key, together with their stored hashes."""
+    cursor.executemany(f"DELETE FROM {table} WHERE {key} = ?", [(int(row_key),) for row_key in keys])
+    cursor.executemany(
+        "DELETE FROM etl_row_hash WHERE table_name = ? AND row_key = ?",
+        [(table, int(row_key)) for row_key in keys],
+    )
+
+def store_row_hashes(df: pd.DataFrame, table: str, key: str, cursor: sqlite3.Cursor) -> None:
+    """Remember the hashes of prepared rows so the next incremental load can skip them."""
+    cursor.executemany(
+        "INSERT OR REPLACE INTO etl_row_hash (table_name, row_key, row_hash) VALUES (?, ?, ?)",
+        [(table, int(row_key), int(row_hash)) for row_key, row_hash in zip(df[key], hash_rows(df))],
+    )
+
+def read_stored_rows(rows: pd.DataFrame, table: str, key: str, columns: list, cursor: sqlite3.Cursor) -> pd.DataFrame:
+    """Read the stored values of some columns for the rows of df that already exist in the warehouse."""
+    keys = [int(value) for value in rows[key]]
+    stored = []
+    for start in range(0, len(keys), LOOKUP_BATCH_ROWS):
+        batch = keys[start:start + LOOKUP_BATCH_ROWS]
+        cursor.execute(
+            f"SELECT {', '.join([key] + columns)} FROM {table} WHERE {key} IN ({', '.join('?' for _ in batch)})",
+            batch,
+        )
+        stored.extend(cursor.fetchall())
+    return pd.DataFrame(stored, columns=[key] + columns)
+
+def invalidates_cubes(rows: pd.DataFrame, table: str, key: str, cursor: sqlite3.Cursor) -> bool:
+    """
+    Return True if upserting warehouse rows would leave the stored OLAP cubes stale.
+
+    Cubes fold in only sales above their sale_id watermark, so any sale written at or
+    below it (new or updated) would be missed, and a changed customer region would leave
+    the customer's sales in their old region's cells.
+    """
+    watermark = lowest_watermark(cursor)
+    if watermark is None or rows.empty:
+        return False
+    if table == "sale":
+        return bool((rows[key] <= watermark).any())
+
+    columns = CUBE_GROUPING_COLUMNS.get(table, [])
+    if not columns:
+        return False
+    stored = read_stored_rows(rows, table, key, columns, cursor)
+    compared = rows[[key] + columns].merge(stored, on=key, suffixes=("", "_stored"))
+    for column in columns:
+        new, old = compared[column].astype("float64"), compared[f"{column}_stored"].astype("float64")
+        if (new.ne(old) & ~(new.isna() & old.isna())).any():
+            return True
+    return False
+
+def deletion_invalidates_cubes(keys: list, table: str, cursor: sqlite3.Cursor) -> bool:
+    """
+    Return True if deleting warehouse rows would leave the stored OLAP cubes stale.
+
+    A deleted sale at or below the watermark is already folded into a cube, and so are
+    the sales at or below it that reference a deleted row of a table in CUBE_JOINED_TABLES.
+    """
+    watermark = lowest_watermark(cursor)
+    if watermark is None or not keys:
+        return False
+    if table == "sale":
+        return min(keys) <= watermark
+
+    column = CUBE_JOINED_TABLES.get(table)
+    if column is None:
+        return False
+    for start in range(0, len(keys), LOOKUP_BATCH_ROWS):
+        batch = [int(row_key) for row_key in keys[start:start + LOOKUP_BATCH_ROWS]]
+        cursor.execute(
+            f"SELECT 1 FROM sale WHERE sale_id <= ? AND {column} IN ({', '.join('?' for _ in batch)}) LIMIT 1",
+            [watermark] + batch,
+        )
+        if cursor.fetchone() is not None:
+            return True
+    return False
+
+def load_table_incrementally(table: str, prepared_dir: pathlib.Path, cursor: sqlite3.Cursor) -> int:
+    """
+    Upsert the new or changed rows of one prepared file, delete the rows that were
+    removed from it, and return how many rows were written or deleted.
+
+    Unchanged files are detected by content hash and skipped without being parsed.
+    """
+    table_name, key = WAREHOUSE_TABLES[table]
+    file_path = find_table(prepared_dir, table_name)
+    file_hash = hash_file(file_path)
+    cursor.execute("SELECT file_hash FROM etl_file_state WHERE table_name = ?", (table,))
+    stored = cursor.fetchone()
+    if stored is not None and stored[0] == file_hash:
+        logger.info(f"{file_path.name} unchanged since the last load, skipping {table}")
+        return 0
+
+    df = read_prepared_table(file_path)
+    changed_df, updated_count, removed_keys = find_changed_rows(df, table, key, cursor)
+    warehouse_rows = to_warehouse_rows(table, changed_df, cursor)
+    if (invalidates_cubes(warehouse_rows, table, key, cursor)
+            or deletion_invalidates_cubes(removed_keys, table, cursor)):
+        logger.info(f"Changed {table} rows are already folded into the OLAP cubes; they will rebuild")
+        clear_cube_state(cursor)
+    delete_rows(removed_keys, table, key, cursor)
+    upsert_rows(warehouse_rows, table, key, cursor)
+    store_row_hashes(changed_df, table, key, cursor)
+    cursor.execute(
+        "INSERT OR REPLACE INTO etl_file_state (table_name, file_hash) VALUES (?, ?)",
+        (table, file_hash),
+    )
+    record_rows(rows_in=len(df), rows_out=len(changed_df))
+    logger.info(f"Upserted {len(changed_df)} of {len(df)} rows into {table} ({updated_count} updated), "
+                f"deleted {len(removed_keys)}")
+    return len(changed_df) + len(removed_keys)
+
+@instrument()
+def load_data_incrementally(db_path: pathlib.Path = DB_PATH, prepared_dir: pathlib.Path = PREPARED_DATA_DIR) -> None:
+    """
+    Upsert only new or changed prepared rows into the warehouse, and delete the rows
+    that were removed from the prepared files.
+
+    Everything happens in one transaction on the pooled writer connection (see
+    dw_access.py), so readers see either the previous state or the new one and the
+    tables are never empty partway through.
+    """
+    with writer(db_path) as conn:
         cursor = conn.cursor()
+        create_schema(cursor)
+        create_load_state(cursor)
+        for table in WAREHOUSE_TABLES:
+            load_table_incrementally(table, prepared_dir, cursor)
+    checkpoint(db_path)
+
+@instrument()
+def load_data_to_db(
+    db_path: pathlib.Path = DB_PATH,
+    prepared_dir: pathlib.Path = PREPARED_DATA_DIR,
+    method: str = "bulk",
+) -> None:
+    """
+    Reload every warehouse table from the prepared files.
+
+    method="bulk" uses the batched executemany() loader with tuned PRAGMAs and deferred
+    indexes, all in one transaction; method="to_sql" uses pandas DataFrame.to_sql.
+    """
+    # The pooled read-write connection; SQLite creates the file if it doesn't exist
+    with writer(db_path) as conn:
+        cursor = conn.cursor()
+        previous_pragmas = apply_load_pragmas(conn) if method == "bulk" else {}
 
         # Create schema and clear existing records
         create_schema(cursor)
         delete_existing_records(cursor)
 
-        # Load prepared data using pandas
-        customers_df = pd.read_csv(PREPARED_DATA_DIR.joinpath("customers_data_prepared.csv"))
-        products_df = pd.read_csv(PREPARED_DATA_DIR.joinpath("products_data_prepared.csv"))
-        sales_df = pd.read_csv(PREPARED_DATA_DIR.joinpath("sales_data_prepared.csv"))
+        # Load prepared data using pandas, with labels replaced by dimension keys
+        customers_df = to_warehouse_rows(
+            "customer", read_prepared_table(find_table(prepared_dir, "customers_data_prepared")), cursor)
+        products_df = to_warehouse_rows(
+            "product", read_prepared_table(find_table(prepared_dir, "products_data_prepared")), cursor)
+        sales_df = to_warehouse_rows(
+            "sale", read_prepared_table(find_table(prepared_dir, "sales_data_prepared")), cursor)
+        record_rows(rows_in=len(customers_df) + len(products_df) + len(sales_df))
 
         # Insert data into the database
-        insert_customers(customers_df, cursor)
-        insert_products(products_df, cursor)
-        insert_sales(sales_df, cursor)
-
-        conn.commit()
-    finally:
-        if conn:
-            conn.close()
+        if method == "bulk":
+            try:
+                bulk_load(conn, {"customer": customers_df, "product": products_df, "sale": sales_df})
+            finally:
+                restore_pragmas(conn, previous_pragmas)
+        else:
+            insert_customers(customers_df, cursor)
+            insert_products(products_df, cursor)
+            insert_sales(sales_df, cursor)
+            conn.commit()
+        record_rows(rows_out=len(customers_df) + len(products_df) + len(sales_df))
+    checkpoint(db_path)
 
 if __name__ == "__main__":
-    load_data_to_db()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Load the prepared data into the SQLite data warehouse.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="upsert only new or changed rows instead of reloading every table")
+    if parser.parse_args().incremental:
+        load_data_incrementally()
+    else:
+        load_data_to_db()
\ No newline at end of file
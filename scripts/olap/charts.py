@@ -0,0 +1,211 @@
+"""
+scripts/olap/charts.py
+
+Chart rendering for the OLAP goal scripts: headless, in parallel, and only when the
+data behind a chart changed.
+
+Each chart is a ChartJob: the kind of chart (a draw function in CHARTS), the slice of
+the cube results it shows, and the PNG file to write. render_charts():
+
+- hashes every job (its data, title, options and the source of its draw function)
+  and skips charts whose PNG already carries that hash in its metadata, so a rerun on
+  an unchanged cube renders nothing
+- renders the rest straight to files, in a pool of processes on the non-interactive
+  Agg backend when there are several (matplotlib is single-threaded, so processes,
+  not threads)
+- closes every figure as soon as it is saved, so memory stays flat across hundreds of
+  charts
+
+Rendering is headless when SMART_HEADLESS=1, when a goal script runs with --headless
+(it switches to Agg before drawing), or when matplotlib already runs a non-interactive
+backend (e.g. MPLBACKEND=Agg, set by run_pipeline.py, or a Linux host without a
+display). Otherwise the goal scripts still show their main charts in a window with
+show_charts().
+
+Do not run this script directly. Import the functions from the OLAP goal scripts.
+"""
+
+import functools
+import hashlib
+import inspect
+import os
+import pathlib
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import matplotlib
+
+if os.environ.get("SMART_HEADLESS") == "1":
+    matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import pandas as pd  # noqa: E402
+import seaborn as sns  # noqa: E402
+from PIL import Image  # noqa: E402  (installed with matplotlib)
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.metrics import instrument  # noqa: E402
+
+# Constants
+NON_INTERACTIVE_BACKENDS = {"agg", "cairo", "pdf", "pgf", "ps", "svg", "template"}
+HEADLESS: bool = os.environ.get("SMART_HEADLESS") == "1" or matplotlib.get_backend().lower() in NON_INTERACTIVE_BACKENDS
+HASH_KEY: str = "SourceHash"  # PNG text field holding the hash a chart was rendered from
+FIGURE_SIZE = (10, 6)
+
+
+class ChartJob(NamedTuple):
+    """One chart to render: a kind from CHARTS, the rows it shows, its PNG path, title and draw options."""
+    kind: str
+    data: pd.DataFrame
+    output_path: pathlib.Path
+    title: str
+    options: Optional[dict] = None
+
+
+def draw_top_products_by_region(data: pd.DataFrame, ax, title: str, x: str = "region") -> None:
+    """Grouped bars of the top products' total sales per region (or per month for x="Month")."""
+    sns.barplot(data=data, x=x, y="total_sales", hue="product_name", palette="viridis", ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel("Region" if x == "region" else x)
+    ax.set_ylabel("Total Sales")
+    ax.tick_params(axis="x", labelrotation=45)
+
+
+def draw_top_products_by_sales_count(data: pd.DataFrame, ax, title: str) -> None:
+    """Grouped bars of the top products' sale counts per month."""
+    sns.barplot(data=data, x="Month", y="sale_id_count", hue="product_name", palette="Set2", errorbar=None, ax=ax)
+    ax.set_title(title, fontsize=16)
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Sales Count")
+    ax.tick_params(axis="x", labelrotation=45)
+
+
+def draw_sale_counts_heatmap(data: pd.DataFrame, ax, title: str) -> None:
+    """Heatmap of sale counts by region (rows) and year and month (columns, in ascending order)."""
+    heatmap_data = data.set_index(["region", "Year", "Month"])["sale_id_count"].unstack(level=["Year", "Month"])
+    heatmap_data = heatmap_data[sorted(heatmap_data.columns)]
+    sns.heatmap(heatmap_data, annot=True, fmt=".0f", cmap="YlOrBr", linewidths=0.5, vmin=0, ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel("Year")
+    ax.set_ylabel("Region")
+
+
+# Chart kind -> draw function (module-level, so worker processes can look it up by name)
+CHARTS: Dict[str, Callable] = {
+    "top_products_by_region": draw_top_products_by_region,
+    "top_products_by_sales_count": draw_top_products_by_sales_count,
+    "sale_counts_heatmap": draw_sale_counts_heatmap,
+}
+
+
+def chart_file_name(value: object) -> str:
+    """Turn a dimension value (e.g. a region) into a safe file name stem."""
+    return re.sub(r"[^\w-]+", "_", str(value)).strip("_") or "blank"
+
+
+@functools.lru_cache(maxsize=None)
+def _draw_source(kind: str) -> str:
+    return inspect.getsource(CHARTS[kind])
+
+
+def chart_hash(job: ChartJob) -> str:
+    """
+    Hash everything a chart is drawn from: its rows and columns, title, options and draw code.
+
+    Raises:
+        ValueError: If the job's kind is not in CHARTS.
+    """
+    if job.kind not in CHARTS:
+        raise ValueError(f"Unknown chart kind '{job.kind}'; use one of {sorted(CHARTS)}.")
+    digest = hashlib.sha256()
+    digest.update(_draw_source(job.kind).encode("utf-8"))
+    digest.update(repr((job.title, sorted((job.options or {}).items()), list(job.data.columns),
+                        [str(dtype) for dtype in job.data.dtypes], matplotlib.__version__, sns.__version__)).encode())
+    digest.update(pd.util.hash_pandas_object(job.data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def rendered_hash(output_path: pathlib.Path) -> Optional[str]:
+    """Return the hash stored in a rendered chart, or None if the file is missing or unreadable."""
+    try:
+        with Image.open(output_path) as image:
+            return image.text.get(HASH_KEY)
+    except (OSError, AttributeError):
+        return None
+
+
+def draw_chart(job: ChartJob):
+    """Draw a chart on a new figure and return the figure (the caller closes it)."""
+    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    CHARTS[job.kind](job.data, ax, job.title, **(job.options or {}))
+    fig.tight_layout()
+    return fig
+
+
+def render_chart(job: ChartJob, digest: str) -> str:
+    """Render one chart to its PNG file, with its hash in the file's metadata, and free the figure."""
+    fig = draw_chart(job)
+    try:
+        job.output_path.parent.mkdir(parents=True, exist_ok=True)
+        fig.savefig(job.output_path, metadata={HASH_KEY: digest})
+    finally:
+        plt.close(fig)
+    return str(job.output_path)
+
+
+def use_headless_backend() -> None:
+    """Switch this process to the Agg backend (the worker processes, and headless goal script runs, start with it)."""
+    plt.switch_backend("Agg")
+
+
+@instrument()
+def render_charts(jobs: List[ChartJob], workers: Optional[int] = None) -> Dict[str, str]:
+    """
+    Render the charts whose data changed since they were last rendered.
+
+    Args:
+        jobs (list): Charts to render.
+        workers (int, optional): Processes to render in; defaults to one per CPU. With a
+            single worker, or a single chart to render, it runs in this process.
+
+    Returns:
+        dict: PNG path -> "rendered" or "unchanged".
+    """
+    statuses: Dict[str, str] = {}
+    pending = []
+    for job in jobs:
+        digest = chart_hash(job)
+        if rendered_hash(job.output_path) == digest:
+            statuses[str(job.output_path)] = "unchanged"
+        else:
+            pending.append((job, digest))
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending)))
+    if workers == 1:
+        rendered = [render_chart(job, digest) for job, digest in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=use_headless_backend) as executor:
+            rendered = list(executor.map(render_chart, *zip(*pending)))
+    statuses.update((path, "rendered") for path in rendered)
+
+    logger.info(f"Rendered {len(rendered)} charts ({len(jobs) - len(pending)} unchanged) with {workers} worker(s)")
+    return statuses
+
+
+def show_charts(jobs: List[ChartJob]) -> None:
+    """Show charts in windows (interactive backends only), then close their figures."""
+    if HEADLESS:
+        return
+    figures = [draw_chart(job) for job in jobs]
+    try:
+        plt.show()
+    finally:
+        for fig in figures:
+            plt.close(fig)
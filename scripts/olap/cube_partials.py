@@ -0,0 +1,123 @@
+"""
+scripts/olap/cube_partials.py
+
+Additive (mergeable) aggregation for OLAP cubes.
+
+A metrics dict like {"sale_amount": ["sum", "mean"], "sale_id": "count"} is split into
+partial aggregates that can be added together: sums, counts, mins and maxes. A mean is
+kept as its sum and count and only divided out at the end. Partial cubes computed over
+different slices of the sales (new days, chunks, partitions) can then be merged exactly
+and finalized into the usual cube columns.
+
+Do not run this script directly. Import the functions from the OLAP scripts.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# Partial aggregates needed for each supported metric function
+PARTIALS_FOR_FUNC: Dict[str, List[str]] = {
+    "sum": ["sum"],
+    "count": ["count"],
+    "mean": ["sum", "count"],
+    "min": ["min"],
+    "max": ["max"],
+}
+
+# How two partial aggregates of the same cell are combined
+MERGE_FOR_PARTIAL: Dict[str, str] = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+
+def metric_funcs(metrics: Dict[str, Union[str, List[str]]]) -> Dict[str, List[str]]:
+    """Normalize a metrics dict so every value is a list of function names."""
+    return {column: funcs if isinstance(funcs, list) else [funcs] for column, funcs in metrics.items()}
+
+
+def partial_spec(metrics: Dict[str, Union[str, List[str]]]) -> Dict[str, List[str]]:
+    """
+    Return {column: [partial funcs]} needed to compute the given metrics.
+
+    Raises:
+        ValueError: If a metric uses a function that cannot be merged exactly.
+    """
+    spec = {}
+    for column, funcs in metric_funcs(metrics).items():
+        partials = []
+        for func in funcs:
+            if func not in PARTIALS_FOR_FUNC:
+                raise ValueError(f"Aggregation '{func}' on '{column}' cannot be computed incrementally.")
+            partials.extend(partial for partial in PARTIALS_FOR_FUNC[func] if partial not in partials)
+        spec[column] = partials
+    return spec
+
+
+def partial_columns(metrics: Dict[str, Union[str, List[str]]]) -> List[str]:
+    """Return the partial aggregate column names, e.g. ['sale_amount_sum', 'sale_amount_count']."""
+    return [f"{column}_{partial}" for column, partials in partial_spec(metrics).items() for partial in partials]
+
+
+def partial_aggregate(df: pd.DataFrame, dimensions: List[str], metrics: Dict[str, Union[str, List[str]]]) -> pd.DataFrame:
+    """Aggregate rows into one partial cell per combination of dimension values."""
+    spec = partial_spec(metrics)
+    partial = df.groupby(dimensions, observed=True).agg(spec)
+    partial.columns = [f"{column}_{func}" for column, func in partial.columns]
+    return partial.reset_index()
+
+
+def merge_partials(partials: pd.DataFrame, dimensions: List[str], metrics: Dict[str, Union[str, List[str]]]) -> pd.DataFrame:
+    """Combine partial cells that share the same dimension values (e.g. a concat of several partial cubes)."""
+    merge_funcs = {
+        f"{column}_{partial}": MERGE_FOR_PARTIAL[partial]
+        for column, column_partials in partial_spec(metrics).items()
+        for partial in column_partials
+    }
+    return partials.groupby(dimensions, observed=True).agg(merge_funcs).reset_index()
+
+
+def aggregate_chunks(
+    chunks: Iterable[pd.DataFrame],
+    dimensions: List[str],
+    metrics: Dict[str, Union[str, List[str]]],
+    prepare: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+) -> pd.DataFrame:
+    """
+    Fold batches of rows into partial cells as each batch arrives.
+
+    Only the merged partials are kept between batches, so memory is bounded by the
+    number of cells plus one batch, however many rows the batches add up to.
+
+    Args:
+        chunks (iterable): Batches of rows, e.g. pd.read_sql_query(..., chunksize=n).
+        dimensions (list): Columns to group by.
+        metrics (dict): Mergeable metrics, as passed to create_olap_cube.
+        prepare (callable, optional): Applied to each batch first (e.g. to add derived dimensions).
+
+    Returns:
+        pd.DataFrame: The partial cells of all batches, ordered by their dimensions.
+    """
+    partials = pd.DataFrame(columns=dimensions + partial_columns(metrics))
+    for chunk in chunks:
+        if prepare is not None:
+            chunk = prepare(chunk)
+        chunk_partials = partial_aggregate(chunk, dimensions, metrics)
+        if partials.empty:
+            partials = chunk_partials
+        else:
+            partials = merge_partials(pd.concat([partials, chunk_partials], ignore_index=True), dimensions, metrics)
+    return partials
+
+
+def finalize_cube(partials: pd.DataFrame, dimensions: List[str], metrics: Dict[str, Union[str, List[str]]]) -> pd.DataFrame:
+    """Turn partial cells into cube columns named like generate_column_names() (means = sum / count)."""
+    cube = partials[dimensions].copy()
+    for column, funcs in metric_funcs(metrics).items():
+        for func in funcs:
+            if func == "mean":
+                counts = partials[f"{column}_count"].to_numpy(dtype=float)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    cube[f"{column}_mean"] = partials[f"{column}_sum"].to_numpy(dtype=float) / counts
+            else:
+                cube[f"{column}_{func}"] = partials[f"{column}_{func}"]
+    return cube
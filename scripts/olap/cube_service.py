@@ -0,0 +1,442 @@
+"""
+scripts/olap/cube_service.py
+
+Query service over the multi-level OLAP cube, for dashboards.
+
+The grouping sets cube (every subset of Year, Month, region, product_name, see
+grouping_sets.py) is loaded once and split into one table per grouping set. Each
+table gets an inverted index: for every dimension, the row positions of each of its
+values. A query is then answered from the one precomputed level it needs:
+
+- group_by picks the level (sale counts by region x year = group_by ["region", "Year"])
+- filters slice and dice it: each filtered dimension is added to the level, and its
+  rows are found through the index instead of a scan
+- drill_down() adds the next dimension (Year > Month > region > product_name) below a cell
+- top and per keep the top N rows by a metric, overall or per group
+
+Answers of repeated queries come from an LRU cache. The service checks the cube's
+source at most every check_interval seconds and reloads it when it changed (the cube
+file rewritten by olap_cubing.py, or the warehouse database for source="warehouse",
+which rolls the stored cube up itself); the cache is dropped with the old cube.
+
+Use it in-process:
+
+    service = CubeService()
+    service.query(["Month", "region", "product_name"], top=3, per=["region", "Month"], by="sale_amount_sum")
+    service.query(["region", "Year"], metrics=["sale_id_count"])
+    service.drill_down(["Year"], {"Year": 2023})
+
+or run it as a local HTTP service (JSON answers; a dimension repeated in the query
+string matches any of its values):
+
+    py scripts\\olap\\cube_service.py --port 8765
+    python3 scripts/olap/cube_service.py --source warehouse
+
+    GET /query?group_by=region,Year&metrics=sale_id_count
+    GET /query?group_by=Month,region,product_name&top=3&per=region,Month&by=sale_amount_sum
+    GET /query?group_by=region&Year=2023&Year=2024
+    GET /drill_down?group_by=Year&Year=2023
+    GET /dimensions
+    GET /status
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.metrics import instrument  # noqa: E402
+from utils.storage import find_table, read_table  # noqa: E402
+from scripts.dw_access import reader  # noqa: E402
+from scripts.olap import olap_cubing  # noqa: E402
+from scripts.olap.cube_partials import finalize_cube  # noqa: E402
+from scripts.olap.cube_store import read_cube_partials  # noqa: E402
+from scripts.olap.grouping_sets import GROUPING_ID_COLUMN, grouping_id, rollup_partials  # noqa: E402
+from scripts.olap.top_k import top_k_per_group  # noqa: E402
+
+# Constants
+OLAP_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("olap_cubing_outputs")
+CUBE_NAME: str = "multidimensional_olap_cube_grouping_sets"
+# Cube dimensions as written, with labels in place of the warehouse keys, coarsest first
+CUBE_DIMENSIONS: List[str] = [olap_cubing.CUBE_LABELS.get(dimension, (dimension,))[0]
+                              for dimension in olap_cubing.CUBE_DIMENSIONS]
+SOURCES: List[str] = ["file", "warehouse"]
+QUERY_CACHE_SIZE: int = 256  # Answers kept per loaded cube
+CHECK_INTERVAL: float = 1.0  # Seconds between checks of the source for changes
+DEFAULT_PORT: int = 8765
+
+
+class CubeLevel(NamedTuple):
+    """One grouping set of the cube: its rows, and the row positions of each dimension value."""
+    dimensions: List[str]
+    rows: pd.DataFrame
+    index: Dict[str, Dict[object, np.ndarray]]
+
+
+class CubeState(NamedTuple):
+    """A loaded cube with its answer cache; replaced as a whole on reload."""
+    levels: Dict[int, CubeLevel]
+    metrics: List[str]
+    signature: Tuple
+    loaded_at: float
+    cache: "OrderedDict[str, pd.DataFrame]"
+
+
+def build_levels(cube: pd.DataFrame, dimensions: List[str]) -> Dict[int, CubeLevel]:
+    """
+    Split a multi-level cube into its grouping sets and index each one.
+
+    Args:
+        cube (pd.DataFrame): Cube with a grouping_id column (see grouping_sets.py).
+        dimensions (list): All cube dimensions, finest grain, in order.
+
+    Returns:
+        dict: grouping_id -> CubeLevel, rows sorted by the level's dimensions.
+    """
+    levels = {}
+    for level_id, rows in cube.groupby(GROUPING_ID_COLUMN, sort=False):
+        level_id = int(level_id)
+        kept = [dimension for position, dimension in enumerate(dimensions)
+                if not level_id >> (len(dimensions) - 1 - position) & 1]
+        rolled_up = [dimension for dimension in dimensions if dimension not in kept]
+        rows = rows.drop(columns=rolled_up + [GROUPING_ID_COLUMN])
+        if kept:
+            rows = rows.sort_values(kept, kind="stable")
+        rows = rows.reset_index(drop=True)
+        index = {dimension: rows.groupby(dimension, sort=False, observed=True).indices for dimension in kept}
+        levels[level_id] = CubeLevel(kept, rows, index)
+    return levels
+
+
+class CubeService:
+    """
+    Answers slice, dice, drill-down and top-N queries from an in-memory, indexed cube.
+
+    Safe to share between threads: a reload builds a new cube state and swaps it in, so a
+    query always sees one whole cube.
+    """
+
+    def __init__(self, source: str = "file", cube_dir: pathlib.Path = OLAP_OUTPUT_DIR,
+                 db_path: pathlib.Path = olap_cubing.DB_PATH, check_interval: float = CHECK_INTERVAL,
+                 cache_size: int = QUERY_CACHE_SIZE):
+        if source not in SOURCES:
+            raise ValueError(f"Unknown cube source '{source}'; use one of {SOURCES}.")
+        self.source = source
+        self.cube_dir = pathlib.Path(cube_dir)
+        self.db_path = pathlib.Path(db_path)
+        self.check_interval = check_interval
+        self.cache_size = cache_size
+        self.dimensions = CUBE_DIMENSIONS
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._state: Optional[CubeState] = None
+        self.refresh()
+        if self._state is None:
+            raise FileNotFoundError(f"No OLAP cube to serve from {self._source_name()}; run olap_cubing.py first.")
+
+    def _source_name(self) -> str:
+        return str(self.db_path if self.source == "warehouse" else self.cube_dir.joinpath(CUBE_NAME))
+
+    def _watched_files(self) -> List[pathlib.Path]:
+        if self.source == "warehouse":
+            return [self.db_path, self.db_path.with_name(f"{self.db_path.name}-wal")]
+        return [find_table(self.cube_dir, CUBE_NAME)]
+
+    def _signature(self) -> Tuple:
+        """Path, size and modification time of each source file; changes whenever the source is rewritten."""
+        signature = []
+        for path in self._watched_files():
+            if path.exists():
+                stat = path.stat()
+                signature.append((str(path), stat.st_size, stat.st_mtime_ns))
+        return tuple(signature)
+
+    @instrument()
+    def load_cube(self) -> pd.DataFrame:
+        """Read the multi-level cube from the cube file, or roll it up from the cube stored in the warehouse."""
+        if self.source == "file":
+            return read_table(find_table(self.cube_dir, CUBE_NAME))
+        with reader(self.db_path) as conn:
+            partials = read_cube_partials(conn, olap_cubing.CUBE_DIMENSIONS)
+            levels = rollup_partials(partials, olap_cubing.CUBE_DIMENSIONS, olap_cubing.CUBE_METRICS,
+                                     olap_cubing.CUBE_GROUPING_SETS)
+            cube = finalize_cube(levels, olap_cubing.CUBE_DIMENSIONS + [GROUPING_ID_COLUMN], olap_cubing.CUBE_METRICS)
+            return olap_cubing.decode_dimensions(cube, conn)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Reload the cube if its source changed since it was loaded.
+
+        The source is checked at most every check_interval seconds unless force is True.
+        A failed reload (e.g. a cube file caught half-written) keeps the current cube.
+
+        Returns:
+            bool: True if a new cube was loaded.
+        """
+        now = time.monotonic()
+        if not force and self._state is not None and now - self._checked_at < self.check_interval:
+            return False
+        with self._lock:
+            if not force and self._state is not None and now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+            try:
+                signature = self._signature()
+                if self._state is not None and signature == self._state.signature:
+                    return False
+                cube = self.load_cube()
+            except Exception as e:
+                if self._state is None:
+                    raise
+                logger.warning(f"Could not reload the OLAP cube from {self._source_name()}, still serving the last one: {e}")
+                return False
+            metrics = [column for column in cube.columns if column not in self.dimensions + [GROUPING_ID_COLUMN]]
+            self._state = CubeState(build_levels(cube, self.dimensions), metrics, signature, time.time(), OrderedDict())
+            logger.info(f"Loaded OLAP cube with {len(cube)} cells in {len(self._state.levels)} grouping sets "
+                        f"from {self._source_name()}")
+            return True
+
+    def _coerce(self, level: CubeLevel, dimension: str, value: object) -> object:
+        """Convert a filter value (e.g. "2023" from a URL) to the type of the dimension's column."""
+        if pd.api.types.is_integer_dtype(level.rows[dimension].dtype):
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Dimension '{dimension}' takes whole numbers, got {value!r}.") from None
+        return str(value)
+
+    def _answer(self, state: CubeState, group_by: List[str], filters: Dict[str, List[object]], metrics: List[str],
+                top: Optional[int], per: List[str], by: str, largest: bool) -> pd.DataFrame:
+        wanted = set(group_by) | set(filters)
+        level_id = grouping_id(self.dimensions, [dimension for dimension in self.dimensions if dimension in wanted])
+        if level_id not in state.levels:
+            raise KeyError(f"The cube has no grouping set for {sorted(wanted)}.")
+        level = state.levels[level_id]
+
+        # Dice: rows matching any value of each filtered dimension, found through the index
+        positions = None
+        for dimension, values in filters.items():
+            postings = [level.index[dimension].get(self._coerce(level, dimension, value)) for value in values]
+            postings = [found for found in postings if found is not None]
+            matches = np.unique(np.concatenate(postings)) if postings else np.array([], dtype=np.intp)
+            positions = matches if positions is None else np.intersect1d(positions, matches, assume_unique=True)
+        rows = level.rows if positions is None else level.rows.iloc[positions]
+        rows = rows[level.dimensions + metrics]
+
+        if top is not None:
+            if per:
+                rows = top_k_per_group(rows, per, by, top, largest=largest)
+            else:
+                rows = rows.nlargest(top, by) if largest else rows.nsmallest(top, by)
+        return rows.reset_index(drop=True)
+
+    def query(self, group_by: List[str], filters: Optional[Dict[str, object]] = None,
+              metrics: Optional[List[str]] = None, top: Optional[int] = None, per: Optional[List[str]] = None,
+              by: Optional[str] = None, largest: bool = True) -> pd.DataFrame:
+        """
+        Answer a query from the precomputed level of the cube.
+
+        Args:
+            group_by (list): Dimensions to break the metrics down by ([] for the grand total).
+            filters (dict, optional): Dimension -> value or list of values to keep. A filtered
+                dimension not in group_by is kept as a column too (a slice of that level).
+            metrics (list, optional): Metric columns to return; all of them by default.
+            top (int, optional): Keep only the top rows by the `by` metric.
+            per (list, optional): With top, keep the top rows within each group of these dimensions.
+            by (str, optional): Metric to rank by; defaults to the first requested metric.
+            largest (bool): Rank by highest metric if True, lowest if False.
+
+        Returns:
+            pd.DataFrame: The matching cells, ordered by their dimensions (or by rank with top).
+
+        Raises:
+            ValueError: If the query names an unknown dimension or metric, or a bad filter value.
+            KeyError: If the cube was built without the needed grouping set.
+        """
+        self.refresh()
+        state = self._state
+        filters = {dimension: values if isinstance(values, (list, tuple, set)) else [values]
+                   for dimension, values in (filters or {}).items()}
+        metrics = list(metrics or state.metrics)
+        per = list(per or [])
+        by = by or metrics[0]
+
+        unknown = (set(group_by) | set(filters) | set(per)) - set(self.dimensions)
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions {sorted(unknown)}; use {self.dimensions}.")
+        unknown = (set(metrics) | {by}) - set(state.metrics)
+        if unknown:
+            raise ValueError(f"Unknown cube metrics {sorted(unknown)}; use {state.metrics}.")
+        if not set(per) <= set(group_by):
+            raise ValueError(f"per {per} must be part of group_by {group_by}.")
+        if top is not None and top < 0:
+            raise ValueError(f"top must be zero or more, got {top}.")
+        if top is not None and by not in metrics:
+            metrics.append(by)
+
+        key = json.dumps({"group_by": sorted(group_by), "filters": {d: sorted(map(str, v)) for d, v in filters.items()},
+                          "metrics": metrics, "top": top, "per": sorted(per), "by": by, "largest": largest},
+                         sort_keys=True)
+        with self._lock:
+            answer = state.cache.get(key)
+            if answer is not None:
+                state.cache.move_to_end(key)
+                self.hits += 1
+                return answer.copy()
+            self.misses += 1
+
+        answer = self._answer(state, group_by, filters, metrics, top, per, by, largest)
+        with self._lock:
+            state.cache[key] = answer
+            while len(state.cache) > self.cache_size:
+                state.cache.popitem(last=False)
+        return answer.copy()
+
+    def drill_down(self, group_by: List[str], filters: Optional[Dict[str, object]] = None, **options) -> pd.DataFrame:
+        """
+        Break a cell down by the next dimension (Year > Month > region > product_name).
+
+        E.g. drill_down(["Year"], {"Year": 2023}) gives the months of 2023. Takes the same
+        options as query().
+
+        Raises:
+            ValueError: If group_by already holds every dimension.
+        """
+        below = [dimension for dimension in self.dimensions if dimension not in group_by]
+        if not below:
+            raise ValueError(f"Cannot drill down below {group_by}: it holds every dimension.")
+        return self.query(list(group_by) + below[:1], filters, **options)
+
+    def members(self) -> Dict[str, list]:
+        """Return the values of each dimension, sorted, e.g. to fill dashboard filters."""
+        self.refresh()
+        state = self._state
+        finest = state.levels.get(0) or next(iter(state.levels.values()))
+        return {dimension: sorted(finest.rows[dimension].dropna().unique().tolist()) for dimension in finest.dimensions}
+
+    def status(self) -> Dict[str, object]:
+        """Return what is loaded and how well the answer cache is doing."""
+        state = self._state
+        return {
+            "source": self._source_name(), "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(state.loaded_at)),
+            "cells": sum(len(level.rows) for level in state.levels.values()), "grouping_sets": len(state.levels),
+            "metrics": state.metrics, "cached_answers": len(state.cache), "hits": self.hits, "misses": self.misses,
+        }
+
+
+def parse_query(params: Dict[str, List[str]]) -> Dict[str, object]:
+    """
+    Turn URL query parameters into query() arguments.
+
+    group_by, metrics and per are comma-separated lists; top is a number; by names a metric;
+    order=asc ranks the lowest first. Any other parameter filters a dimension, and can be
+    repeated to keep several values.
+    """
+    def names(name: str) -> List[str]:
+        return [item for value in params.get(name, []) for item in value.split(",") if item]
+
+    options = {"group_by": names("group_by"), "metrics": names("metrics") or None, "per": names("per") or None}
+    if "top" in params:
+        try:
+            options["top"] = int(params["top"][-1])
+        except ValueError:
+            raise ValueError(f"top must be a whole number, got {params['top'][-1]!r}.") from None
+    if "by" in params:
+        options["by"] = params["by"][-1]
+    if "order" in params:
+        options["largest"] = params["order"][-1] != "asc"
+    reserved = {"group_by", "metrics", "per", "top", "by", "order"}
+    options["filters"] = {name: values for name, values in params.items() if name not in reserved}
+    return options
+
+
+def make_handler(service: CubeService) -> type:
+    """Return an HTTP request handler class answering JSON queries from the given service."""
+
+    class CubeRequestHandler(BaseHTTPRequestHandler):
+
+        def send_json(self, status: int, body: str) -> None:
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            started = time.perf_counter()
+            try:
+                if url.path in ("/query", "/drill_down"):
+                    options = parse_query(params)
+                    ask = service.query if url.path == "/query" else service.drill_down
+                    answer = ask(options.pop("group_by"), options.pop("filters"), **options)
+                    elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+                    self.send_json(200, f'{{"elapsed_ms": {elapsed_ms}, "count": {len(answer)}, '
+                                        f'"rows": {answer.to_json(orient="records")}}}')
+                elif url.path == "/dimensions":
+                    self.send_json(200, json.dumps(service.members(), default=str))
+                elif url.path == "/status":
+                    self.send_json(200, json.dumps(service.status()))
+                else:
+                    self.send_json(404, json.dumps({"error": f"Unknown path {url.path}"}))
+            except (KeyError, ValueError) as e:
+                self.send_json(400, json.dumps({"error": str(e).strip("'\"")}))
+            except Exception as e:
+                logger.error(f"Error answering {self.path}: {e}")
+                self.send_json(500, json.dumps({"error": str(e)}))
+
+        def log_message(self, format: str, *args) -> None:
+            logger.debug("{} - {}", self.address_string(), format % args)
+
+    return CubeRequestHandler
+
+
+def serve(service: CubeService, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Create an HTTP server for the service (one thread per request); call serve_forever() on it."""
+    return ThreadingHTTPServer((host, port), make_handler(service))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve OLAP cube queries over HTTP.")
+    parser.add_argument("--source", choices=SOURCES, default="file",
+                        help="load the written grouping sets cube, or roll up the cube stored in the warehouse")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SMART_CUBE_PORT", DEFAULT_PORT)),
+                        help=f"port to listen on (default {DEFAULT_PORT})")
+    parser.add_argument("--check-interval", type=float, default=CHECK_INTERVAL,
+                        help="seconds between checks of the source for a new cube")
+    args = parser.parse_args()
+
+    service = CubeService(args.source, check_interval=args.check_interval)
+    server = serve(service, args.host, args.port)
+    logger.info(f"Serving OLAP cube queries on http://{args.host}:{server.server_port}/query")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Cube service stopped")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+scripts/olap/cube_store.py
+
+Persistent OLAP cube kept as an aggregate table in the SQLite data warehouse.
+
+The cube table holds one row per cell (one combination of dimension values) with the
+partial aggregates from cube_partials.py: sums, counts, mins and maxes. A bridge table
+(<cube table>_sale) maps each cell_id to the sale_ids aggregated into it, for
+traceability without storing lists in the cube itself. A state table
+remembers the highest sale_id already folded in. A refresh reads only the sales above
+that watermark, aggregates them, and adds them into the existing cells with an upsert,
+so its cost depends on the size of the delta and not on the size of the history.
+The delta is read in batches of CHUNK_ROWS sales, each upserted before the next is
+read, so even a full rebuild needs memory for one batch plus the cube, not every sale.
+
+The watermark assumes new sales get higher sale_ids than the ones already loaded.
+Changing historical sales requires a full rebuild; etl_to_dw.py clears the state when
+it reloads the warehouse, writes a sale at or below a watermark, or changes a customer
+column the cube groups on, so the next refresh rebuilds automatically.
+
+Do not run this script directly. olap_cubing.py uses it.
+"""
+
+import contextlib
+import json
+import pathlib
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Union
+
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.metrics import instrument, record_rows  # noqa: E402
+from scripts.dw_bulk_loader import to_records  # noqa: E402
+from scripts.olap.cube_partials import finalize_cube, partial_spec  # noqa: E402
+from scripts.olap.parallel_cube import parallel_partial_aggregate  # noqa: E402
+
+# Constants
+CUBE_TABLE: str = "olap_cube"
+CUBE_STATE_TABLE: str = "olap_cube_state"
+
+# Sales read from the warehouse per batch during a refresh
+CHUNK_ROWS: int = 100_000
+
+# Lowest possible sale_id watermark, used to fold in every sale on a rebuild
+NO_WATERMARK: int = -(2 ** 63)
+
+# How each partial aggregate is combined with the stored value on upsert
+UPSERT_EXPRESSIONS: Dict[str, str] = {
+    "sum": "{column} + excluded.{column}",
+    "count": "{column} + excluded.{column}",
+    "min": "COALESCE(MIN({column}, excluded.{column}), {column}, excluded.{column})",
+    "max": "COALESCE(MAX({column}, excluded.{column}), {column}, excluded.{column})",
+}
+
+
+def quote(name: str) -> str:
+    """Quote an SQL identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def bridge_table(table: str) -> str:
+    """Return the name of the cell -> sale bridge table of a cube table."""
+    return f"{table}_sale"
+
+
+def cube_spec(dimensions: List[str], metrics: Dict[str, Union[str, List[str]]]) -> str:
+    """Return the JSON description of a cube definition stored alongside its watermark."""
+    return json.dumps({"dimensions": dimensions, "partials": partial_spec(metrics), "bridge": True}, sort_keys=True)
+
+
+def create_cube_store(cursor: sqlite3.Cursor, dimensions: List[str], metrics: Dict[str, Union[str, List[str]]],
+                      table: str = CUBE_TABLE) -> None:
+    """Create the cube, bridge and state tables if they don't exist."""
+    columns = [f"{quote(dimension)}" for dimension in dimensions]
+    for column, partials in partial_spec(metrics).items():
+        for partial in partials:
+            columns.append(f"{quote(f'{column}_{partial}')} {'INTEGER' if partial == 'count' else 'REAL'}")
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {quote(table)} (
+            cell_id INTEGER PRIMARY KEY,
+            {', '.join(columns)},
+            UNIQUE ({', '.join(quote(dimension) for dimension in dimensions)})
+        )
+    """)
+
+    # Clustered on (cell_id, sale_id), so a cell's sales are one sorted range read
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {quote(bridge_table(table))} (
+            cell_id INTEGER,
+            sale_id INTEGER,
+            PRIMARY KEY (cell_id, sale_id)
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CUBE_STATE_TABLE} (
+            cube_table TEXT PRIMARY KEY,
+            last_sale_id INTEGER,
+            spec TEXT
+        )
+    """)
+
+
+def upsert_partials(cursor: sqlite3.Cursor, partials: pd.DataFrame, dimensions: List[str],
+                    metrics: Dict[str, Union[str, List[str]]], table: str = CUBE_TABLE) -> None:
+    """Add partial cells into the stored cube, creating cells that don't exist yet."""
+    updates = [
+        f"{quote(f'{column}_{partial}')} = " + UPSERT_EXPRESSIONS[partial].format(column=quote(f"{column}_{partial}"))
+        for column, column_partials in partial_spec(metrics).items()
+        for partial in column_partials
+    ]
+    columns = partials.columns.tolist()
+    cursor.executemany(
+        f"INSERT INTO {quote(table)} ({', '.join(quote(column) for column in columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT ({', '.join(quote(dimension) for dimension in dimensions)}) DO UPDATE SET {', '.join(updates)}",
+        to_records(partials),
+    )
+
+
+def read_cells(cursor: sqlite3.Cursor, dimensions: List[str], table: str = CUBE_TABLE,
+               after: int = NO_WATERMARK) -> pd.DataFrame:
+    """
+    Read the cell_id and dimensions of the stored cells with a cell_id above after.
+
+    cell_id is the rowid, so cells created by an upsert get ids above every existing one
+    and a refresh can fetch just those instead of rereading the whole cube.
+    """
+    columns = ", ".join(quote(dimension) for dimension in dimensions)
+    return pd.DataFrame(
+        cursor.execute(f"SELECT cell_id, {columns} FROM {quote(table)} WHERE cell_id > ? ORDER BY cell_id",
+                       (after,)).fetchall(),
+        columns=["cell_id"] + dimensions,
+    )
+
+
+def add_new_cells(cursor: sqlite3.Cursor, cells: pd.DataFrame, dimensions: List[str],
+                  table: str = CUBE_TABLE) -> pd.DataFrame:
+    """Return the cell map with the cells created since it was read appended."""
+    new_cells = read_cells(cursor, dimensions, table, int(cells["cell_id"].max()) if len(cells) else NO_WATERMARK)
+    if new_cells.empty:
+        return cells
+    return new_cells if cells.empty else pd.concat([cells, new_cells], ignore_index=True)
+
+
+def insert_cell_sales(cursor: sqlite3.Cursor, delta_df: pd.DataFrame, cells: pd.DataFrame, dimensions: List[str],
+                      table: str = CUBE_TABLE) -> None:
+    """Record which cell each new sale was folded into, using a cell_id -> dimensions map of the cube."""
+    cell_sales = delta_df[dimensions + ["sale_id"]].dropna(subset=dimensions).merge(cells, on=dimensions)
+    cursor.executemany(
+        f"INSERT OR IGNORE INTO {quote(bridge_table(table))} (cell_id, sale_id) VALUES (?, ?)",
+        to_records(cell_sales[["cell_id", "sale_id"]]),
+    )
+
+
+@instrument()
+def refresh_cube_store(
+    conn: sqlite3.Connection,
+    dimensions: List[str],
+    metrics: Dict[str, Union[str, List[str]]],
+    delta_query: str,
+    prepare: Callable[[pd.DataFrame], pd.DataFrame],
+    full: bool = False,
+    table: str = CUBE_TABLE,
+    workers: int = 1,
+    chunk_rows: int = CHUNK_ROWS,
+) -> int:
+    """
+    Fold the sales added since the last refresh into the stored cube and return how many were added.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the data warehouse.
+        dimensions (list): Cube dimension columns.
+        metrics (dict): Cube metrics, as passed to create_olap_cube.
+        delta_query (str): Query returning the sales with sale_id greater than its one parameter.
+        prepare (callable): Adds derived dimension columns (e.g. Year, Month) to the delta rows.
+        full (bool): Rebuild the cube from all sales instead of the delta.
+        table (str): Name of the cube table.
+        workers (int): Processes used to aggregate the delta (useful for full rebuilds).
+        chunk_rows (int): Sales read and folded in per batch.
+
+    Returns:
+        int: Number of sales folded into the cube.
+    """
+    cursor = conn.cursor()
+    create_cube_store(cursor, dimensions, metrics, table)
+    spec = cube_spec(dimensions, metrics)
+
+    cursor.execute(f"SELECT last_sale_id, spec FROM {CUBE_STATE_TABLE} WHERE cube_table = ?", (table,))
+    state = cursor.fetchone()
+    max_sale_id = cursor.execute("SELECT MAX(sale_id) FROM sale").fetchone()[0]
+    rebuild = full or state is None or state[1] != spec or (max_sale_id is not None and max_sale_id < state[0])
+
+    try:
+        if rebuild:
+            logger.info(f"Rebuilding OLAP cube table {table} from all sales")
+            if state is not None and state[1] != spec:
+                # The cube definition changed, so the stored columns may not match anymore
+                cursor.execute(f"DROP TABLE {quote(table)}")
+                cursor.execute(f"DROP TABLE {quote(bridge_table(table))}")
+                create_cube_store(cursor, dimensions, metrics, table)
+            cursor.execute(f"DELETE FROM {quote(table)}")
+            cursor.execute(f"DELETE FROM {quote(bridge_table(table))}")
+            watermark = NO_WATERMARK
+        else:
+            watermark = state[0]
+
+        # Fold the delta in batch by batch, so memory holds one batch and not every new sale.
+        # The cell map is read once and extended with the cells each batch creates, and with
+        # several workers one process pool serves every batch.
+        folded = 0
+        cells = read_cells(cursor, dimensions, table)
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else contextlib.nullcontext()
+        with pool as executor:
+            for delta_df in pd.read_sql_query(delta_query, conn, params=(watermark,), chunksize=chunk_rows):
+                if delta_df.empty:
+                    continue
+                delta_df = prepare(delta_df)
+                partials = parallel_partial_aggregate(delta_df, dimensions, metrics, workers, executor=executor)
+                upsert_partials(cursor, partials, dimensions, metrics, table)
+                cells = add_new_cells(cursor, cells, dimensions, table)
+                insert_cell_sales(cursor, delta_df, cells, dimensions, table)
+                watermark = max(watermark, int(delta_df["sale_id"].max()))
+                folded += len(delta_df)
+
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {CUBE_STATE_TABLE} (cube_table, last_sale_id, spec) VALUES (?, ?, ?)",
+            (table, watermark, spec),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    record_rows(rows_in=folded)
+    logger.info(f"Folded {folded} new sales into OLAP cube table {table}")
+    return folded
+
+
+def read_cube_partials(conn: sqlite3.Connection, dimensions: List[str], table: str = CUBE_TABLE) -> pd.DataFrame:
+    """Read the stored partial cells, ordered by their dimensions, with their cell_id column."""
+    ordering = ", ".join(quote(dimension) for dimension in dimensions)
+    return pd.read_sql_query(f"SELECT * FROM {quote(table)} ORDER BY {ordering}", conn)
+
+
+def read_cube_store(conn: sqlite3.Connection, dimensions: List[str], metrics: Dict[str, Union[str, List[str]]],
+                    table: str = CUBE_TABLE) -> pd.DataFrame:
+    """Read the stored cube as a finished cube DataFrame, ordered by its dimensions, with its cell_id column."""
+    partials = read_cube_partials(conn, dimensions, table)
+    cube = finalize_cube(partials, dimensions, metrics)
+    cube["cell_id"] = partials["cell_id"]
+    return cube
+
+
+def lookup_stored_cell_sales(conn: sqlite3.Connection, cell_id: int, table: str = CUBE_TABLE) -> List[int]:
+    """Return the sorted sale_ids aggregated into one stored cube cell."""
+    rows = conn.execute(
+        f"SELECT sale_id FROM {quote(bridge_table(table))} WHERE cell_id = ? ORDER BY sale_id", (cell_id,)
+    ).fetchall()
+    return [sale_id for (sale_id,) in rows]
+
+
+def has_cube_state(cursor: sqlite3.Cursor) -> bool:
+    """Return True if the warehouse has a cube state table."""
+    cursor.execute(f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{CUBE_STATE_TABLE}'")
+    return cursor.fetchone() is not None
+
+
+def lowest_watermark(cursor: sqlite3.Cursor) -> Optional[int]:
+    """Return the lowest sale_id watermark of the stored cubes, or None if no cube is stored."""
+    if not has_cube_state(cursor):
+        return None
+    return cursor.execute(f"SELECT MIN(last_sale_id) FROM {CUBE_STATE_TABLE}").fetchone()[0]
+
+
+def clear_cube_state(cursor: sqlite3.Cursor) -> None:
+    """Forget every cube watermark so the next refresh rebuilds from all sales."""
+    if has_cube_state(cursor):
+        cursor.execute(f"DELETE FROM {CUBE_STATE_TABLE}")
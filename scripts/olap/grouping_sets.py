@@ -0,0 +1,141 @@
+"""
+scripts/olap/grouping_sets.py
+
+Multi-level OLAP cubes: every grouping set (ROLLUP / CUBE subtotals) in one table.
+
+The rows are aggregated once, at the finest grain, into the additive partials of
+cube_partials.py. Every coarser grouping set is then merged from those partial cells
+instead of from the rows, so the source data is read a single time no matter how many
+levels are requested. Each output row carries a grouping_id telling which dimensions
+were rolled up, like SQL's GROUPING_ID(): bit i (counting from the last dimension) is
+1 when that dimension is aggregated away and its value left empty.
+
+    dimensions = ["Year", "Month", "region", "product_name"]
+    grouping_id 0  -> one row per Year, Month, region, product_name (finest grain)
+    grouping_id 1  -> one row per Year, Month, region (all products)
+    grouping_id 15 -> one grand-total row
+
+Do not run this script directly. Import the functions from the OLAP scripts.
+"""
+
+import itertools
+from typing import Dict, List, Union
+
+import pandas as pd
+
+from scripts.olap.cube_partials import MERGE_FOR_PARTIAL, partial_spec
+
+# Name of the column telling which dimensions a row aggregates over
+GROUPING_ID_COLUMN: str = "grouping_id"
+
+GroupingSets = Union[str, List[List[str]]]
+
+
+def resolve_grouping_sets(dimensions: List[str], grouping_sets: GroupingSets) -> List[List[str]]:
+    """
+    Expand a grouping sets argument into an explicit list of dimension lists.
+
+    Args:
+        dimensions (list): Cube dimensions, finest grain, in order.
+        grouping_sets (str or list): "cube" for every subset of the dimensions, "rollup"
+            for the prefixes (Year > Month > region > product_name), or a list of dimension lists.
+
+    Returns:
+        list: Grouping sets, each with its dimensions in cube order, without duplicates.
+
+    Raises:
+        ValueError: If the mode is unknown or a set uses a column that is not a dimension.
+    """
+    if grouping_sets == "cube":
+        return [list(subset) for size in range(len(dimensions), -1, -1)
+                for subset in itertools.combinations(dimensions, size)]
+    if grouping_sets == "rollup":
+        return [dimensions[:size] for size in range(len(dimensions), -1, -1)]
+    if isinstance(grouping_sets, str):
+        raise ValueError(f"Unknown grouping sets mode '{grouping_sets}'; use 'cube', 'rollup' or a list of sets.")
+
+    resolved = []
+    for grouping_set in grouping_sets:
+        unknown = set(grouping_set) - set(dimensions)
+        if unknown:
+            raise ValueError(f"Grouping set {grouping_set} uses columns that are not cube dimensions: {sorted(unknown)}")
+        ordered = [dimension for dimension in dimensions if dimension in grouping_set]
+        if ordered not in resolved:
+            resolved.append(ordered)
+    return resolved
+
+
+def grouping_id(dimensions: List[str], grouping_set: List[str]) -> int:
+    """Return the GROUPING_ID of a grouping set: a bit per dimension, 1 when it is rolled up."""
+    value = 0
+    for dimension in dimensions:
+        value = (value << 1) | (dimension not in grouping_set)
+    return value
+
+
+def rollup_partials(
+    partials: pd.DataFrame,
+    dimensions: List[str],
+    metrics: Dict[str, Union[str, List[str]]],
+    grouping_sets: GroupingSets = "cube",
+) -> pd.DataFrame:
+    """
+    Merge finest-grain partial cells into the partial cells of every grouping set.
+
+    Args:
+        partials (pd.DataFrame): Output of partial_aggregate() over all the dimensions.
+        dimensions (list): Cube dimensions, finest grain, in order.
+        metrics (dict): Cube metrics, as passed to create_olap_cube.
+        grouping_sets (str or list): See resolve_grouping_sets().
+
+    Returns:
+        pd.DataFrame: Partial cells of all grouping sets stacked, finest first, with a grouping_id
+        column. Rolled-up dimensions are empty (NA); integer dimensions become nullable Int64.
+    """
+    merge_funcs = {
+        f"{column}_{partial}": MERGE_FOR_PARTIAL[partial]
+        for column, column_partials in partial_spec(metrics).items()
+        for partial in column_partials
+    }
+
+    levels = []
+    for grouping_set in resolve_grouping_sets(dimensions, grouping_sets):
+        if grouping_set == dimensions:
+            level = partials[dimensions + list(merge_funcs)].copy()
+        elif grouping_set:
+            level = partials.groupby(grouping_set, observed=True).agg(merge_funcs).reset_index()
+        else:
+            level = partials.agg(merge_funcs).to_frame().T
+        level.insert(0, GROUPING_ID_COLUMN, grouping_id(dimensions, grouping_set))
+        levels.append(level)
+
+    cube = pd.concat(levels, ignore_index=True)
+    for dimension in dimensions:
+        if pd.api.types.is_integer_dtype(partials[dimension]):
+            cube[dimension] = cube[dimension].astype("Int64")
+    for column in merge_funcs:
+        cube[column] = cube[column].astype(partials[column].dtype)
+    return cube[dimensions + [GROUPING_ID_COLUMN] + list(merge_funcs)]
+
+
+def select_grouping_set(cube: pd.DataFrame, dimensions: List[str], grouping_set: List[str]) -> pd.DataFrame:
+    """
+    Look up the rows of one grouping set in a multi-level cube.
+
+    Args:
+        cube (pd.DataFrame): Multi-level cube with a grouping_id column.
+        dimensions (list): All cube dimensions, finest grain, in order.
+        grouping_set (list): The dimensions to keep; the others are rolled up.
+
+    Returns:
+        pd.DataFrame: The matching rows without the grouping_id and rolled-up dimension columns.
+
+    Raises:
+        KeyError: If the cube does not contain that grouping set.
+    """
+    wanted = grouping_id(dimensions, grouping_set)
+    rows = cube[cube[GROUPING_ID_COLUMN] == wanted]
+    if rows.empty:
+        raise KeyError(f"Grouping set {grouping_set} (grouping_id {wanted}) is not in the cube.")
+    rolled_up = [dimension for dimension in dimensions if dimension not in grouping_set]
+    return rows.drop(columns=rolled_up + [GROUPING_ID_COLUMN]).reset_index(drop=True)
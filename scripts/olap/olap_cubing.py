@@ -1,44 +1,118 @@
+import argparse
+import numpy as np
 import pandas as pd
 import sqlite3
 import pathlib
 import sys
+from typing import Iterator
 
 # For local imports, temporarily add project root to Python sys.path
-PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
 from utils.logger import logger  # noqa: E402
+from utils.metrics import instrument, record_rows  # noqa: E402
+from scripts.data_preparation.dtypes import optimize_dtypes  # noqa: E402
+from scripts.dw_access import checkpoint, reader, writer  # noqa: E402
+from scripts.olap.cube_partials import aggregate_chunks, finalize_cube  # noqa: E402
+from scripts.olap.cube_store import CHUNK_ROWS, read_cube_partials, read_cube_store, refresh_cube_store  # noqa: E402
+from scripts.olap.grouping_sets import GROUPING_ID_COLUMN, rollup_partials  # noqa: E402
+from scripts.olap.parallel_cube import parallel_partial_aggregate  # noqa: E402
+from scripts.olap.sql_cube import sql_partial_aggregate  # noqa: E402
+from utils.stage_cache import StageCache  # noqa: E402
+from utils.storage import DEFAULT_FORMAT, with_format, write_table  # noqa: E402
 
 # Constants
 DW_DIR: pathlib.Path = pathlib.Path("data").joinpath("dw")
 DB_PATH: pathlib.Path = DW_DIR.joinpath("smart_sales.db")
 OLAP_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("olap_cubing_outputs")
+CACHE_DIR: pathlib.Path = pathlib.Path("data").joinpath("cache")
+
+# Only the columns the cube needs, so SQLite can answer from the covering index idx_sale_cube.
+# Year, Month and DayOfWeek (Monday = 1) come precomputed from the date_dim calendar table.
+# Regions and products stay integer keys; their labels are added per cube cell by decode_dimensions().
+SALES_CUBE_QUERY: str = """
+    SELECT s.sale_id, s.date_key, s.sale_amount, s.customer_id, s.product_id, c.region_key,
+           d.year AS Year, d.month AS Month, d.day_of_week_number AS DayOfWeek
+    FROM sale s
+    JOIN customer c ON s.customer_id = c.customer_id
+    LEFT JOIN date_dim d ON s.date_key = d.date_key
+"""
+
+# Sales added after a watermark; sale_id is the rowid, so this is a range search
+SALES_DELTA_QUERY: str = SALES_CUBE_QUERY + """
+    WHERE s.sale_id > ?
+"""
+
+# Dimensions and metrics of the cube written by main(). The cube groups on integer keys.
+CUBE_DIMENSIONS: list = ["Year", "Month", "region_key", "product_id"]
+CUBE_METRICS: dict = {
+    "sale_amount": ["sum", "mean"],
+    "sale_id": "count"
+}
+
+# Subtotal levels written next to the finest-grain cube: every subset of CUBE_DIMENSIONS
+CUBE_GROUPING_SETS: str = "cube"
+
+# Key column -> (label column in the written cubes, query returning each key and its label)
+CUBE_LABELS: dict = {
+    "region_key": ("region", "SELECT region_key, region_name FROM region_dim"),
+    "product_id": ("product_name", "SELECT product_id, product_name FROM product"),
+}
 
 # Create output directory if it does not exist
 OLAP_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 
+@instrument()
 def ingest_sales_data_from_dw() -> pd.DataFrame:
     """Ingest sales data from SQLite data warehouse and join with customer and product info."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        sales_df = pd.read_sql_query("""
-            SELECT s.*, c.region, p.product_name
-            FROM sale s
-            JOIN customer c ON s.customer_id = c.customer_id
-            JOIN product p ON s.product_id = p.product_id
-        """, conn)
-        conn.close()
-        logger.info("Sales data (with region and product_name) successfully loaded from SQLite data warehouse.")
+        with reader(DB_PATH) as conn:
+            sales_df = pd.read_sql_query(SALES_CUBE_QUERY, conn)
+        logger.info("Sales data (with region_key and calendar columns) successfully loaded from SQLite data warehouse.")
         return sales_df
     except Exception as e:
         logger.error(f"Error loading sale + customer + product data from data warehouse: {e}")
         raise
 
 
+def iter_sales_data_from_dw(conn: sqlite3.Connection, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Yield the sales of SALES_CUBE_QUERY in batches of at most chunk_rows rows.
+
+    The rows are fetched from the cursor batch by batch (fetchmany), so the whole joined
+    result is never held in memory at once.
+    """
+    for chunk in pd.read_sql_query(SALES_CUBE_QUERY, conn, chunksize=chunk_rows):
+        record_rows(rows_in=len(chunk))
+        yield chunk
+
+
+@instrument()
+def create_olap_cube_chunked(conn: sqlite3.Connection, dimensions: list, metrics: dict,
+                             chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Create the OLAP cube from the warehouse one batch of sales at a time.
+
+    Each batch gets its time dimensions and is folded into the partial cells before the
+    next one is read, so peak memory follows the cube size and not the number of sales.
+    Gives the same cube as create_olap_cube() on all the ingested sales; the metrics
+    must be mergeable (sum, count, mean, min, max).
+    """
+    partials = aggregate_chunks(iter_sales_data_from_dw(conn, chunk_rows), dimensions, metrics,
+                                prepare=add_time_dimensions)
+    cube = finalize_cube(partials, dimensions, metrics)
+    cube["cell_id"] = np.arange(len(cube), dtype=np.int64)
+    logger.info(f"OLAP cube created with dimensions {dimensions} in batches of {chunk_rows} sales")
+    return cube
+
+
+@instrument()
 def create_olap_cube(
-    sales_df: pd.DataFrame, dimensions: list, metrics: dict
+    sales_df: pd.DataFrame, dimensions: list, metrics: dict, grouping_sets=None, workers: int = 1,
+    partition_by: str = None
 ) -> pd.DataFrame:
     """
     Create an OLAP cube by aggregating data across multiple dimensions.
@@ -47,25 +121,43 @@ def create_olap_cube(
         sales_df (pd.DataFrame): The sales data.
         dimensions (list): List of column names to group by.
         metrics (dict): Dictionary of aggregation functions for metrics.
+        grouping_sets (str or list, optional): Also compute subtotals: "cube" (every subset of
+            the dimensions), "rollup" (dimension prefixes) or a list of dimension lists.
+        workers (int): Aggregate in this many processes (see parallel_cube.py); 1 stays serial.
+        partition_by (str, optional): Dimension used to partition the sales across workers.
 
     Returns:
-        pd.DataFrame: The multidimensional OLAP cube.
+        pd.DataFrame: The multidimensional OLAP cube, with a cell_id column for traceability.
+        With grouping_sets, every level is stacked in one table with a grouping_id column
+        instead (see grouping_sets.py). Both grouping_sets and workers > 1 need mergeable
+        metrics (sum, count, mean, min, max).
     """
     try:
 
+        if grouping_sets is not None or workers != 1:
+            # One pass over the sales at the finest grain; coarser levels merge those cells
+            partials = parallel_partial_aggregate(sales_df, dimensions, metrics, workers, partition_by)
+            if grouping_sets is None:
+                cube = finalize_cube(partials, dimensions, metrics)
+                cube["cell_id"] = np.arange(len(cube), dtype=np.int64)
+                logger.info(f"OLAP cube created with dimensions {dimensions} on {workers} workers")
+                return cube
+            levels = rollup_partials(partials, dimensions, metrics, grouping_sets)
+            cube = finalize_cube(levels, dimensions + [GROUPING_ID_COLUMN], metrics)
+            logger.info(f"OLAP cube created with dimensions {dimensions} and grouping sets {grouping_sets}")
+            return cube
+
         # Group by the specified dimensions
-        grouped = sales_df.groupby(dimensions)
+        grouped = sales_df.groupby(dimensions, observed=True)
 
         # Perform the aggregations
         cube = grouped.agg(metrics).reset_index()
 
-        # Add a list of sale IDs for traceability
-        cube["sale_ids"] = grouped["sale_id"].apply(list).reset_index(drop=True)
-
         # Generate explicit column names
-        explicit_columns = generate_column_names(dimensions, metrics)
-        explicit_columns.append("sale_ids")  # Include the traceability column
-        cube.columns = explicit_columns
+        cube.columns = generate_column_names(dimensions, metrics)
+
+        # Number the cells in row order; build_sale_index() maps each cell_id to its sales
+        cube["cell_id"] = np.arange(len(cube), dtype=np.int64)
 
         logger.info(f"OLAP cube created with dimensions: {dimensions}")
         return cube
@@ -73,6 +165,77 @@ def create_olap_cube(
         logger.error(f"Error creating OLAP cube: {e}")
         raise
 
+def decode_dimensions(cube: pd.DataFrame, conn: sqlite3.Connection, labels: dict = CUBE_LABELS) -> pd.DataFrame:
+    """
+    Replace the integer key columns of a cube with their labels, keeping the column order.
+
+    Each dimension table is read once and mapped over the cells, so the labels are looked up
+    per cell instead of being joined to every sale. Rolled-up keys (missing) stay missing.
+
+    Args:
+        cube (pd.DataFrame): Cube with key columns, e.g. from create_olap_cube or read_cube_store.
+        conn (sqlite3.Connection): Connection to the data warehouse.
+        labels (dict): Key column -> (label column, query returning key and label pairs).
+
+    Returns:
+        pd.DataFrame: The cube with label columns in place of the key columns.
+    """
+    cube = cube.copy()
+    for key_column, (label_column, query) in labels.items():
+        if key_column in cube.columns:
+            lookup = dict(conn.execute(query).fetchall())
+            cube[key_column] = cube[key_column].map(lookup)
+            cube = cube.rename(columns={key_column: label_column})
+    return cube
+
+def build_sale_index(sales_df: pd.DataFrame, dimensions: list) -> dict:
+    """
+    Build the traceability index from cube cells to their sales.
+
+    The index is in compressed sparse row form: the sale IDs of cell i are
+    sale_ids[offsets[i]:offsets[i + 1]], sorted ascending. Cell numbers match the
+    cell_id column of create_olap_cube() for the same sales and dimensions.
+
+    Args:
+        sales_df (pd.DataFrame): The sales data.
+        dimensions (list): List of column names the cube groups by.
+
+    Returns:
+        dict: {"sale_ids": int64 array, "offsets": int64 array of length cells + 1}
+    """
+    grouped = sales_df.groupby(dimensions, observed=True)
+    cell_ids = grouped.ngroup().to_numpy()
+    sale_ids = sales_df["sale_id"].to_numpy(dtype=np.int64)
+
+    # Rows with a missing dimension value belong to no cell (ngroup gives -1)
+    in_cube = cell_ids >= 0
+    cell_ids, sale_ids = cell_ids[in_cube], sale_ids[in_cube]
+
+    order = np.lexsort((sale_ids, cell_ids))
+    counts = np.bincount(cell_ids, minlength=grouped.ngroups)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return {"sale_ids": sale_ids[order], "offsets": offsets}
+
+def lookup_cell_sales(sale_index: dict, cell_id: int) -> np.ndarray:
+    """Return the sorted sale IDs aggregated into one cube cell."""
+    offsets = sale_index["offsets"]
+    return sale_index["sale_ids"][offsets[cell_id]:offsets[cell_id + 1]]
+
+def write_sale_index(sale_index: dict, filename: str) -> None:
+    """Write the traceability index to a compressed .npz file next to the cube."""
+    try:
+        output_path = OLAP_OUTPUT_DIR.joinpath(filename)
+        np.savez_compressed(output_path, **sale_index)
+        logger.info(f"OLAP cube sale index saved to {output_path}.")
+    except Exception as e:
+        logger.error(f"Error saving OLAP cube sale index: {e}")
+        raise
+
+def load_sale_index(file_path: pathlib.Path) -> dict:
+    """Load a traceability index written by write_sale_index()."""
+    with np.load(file_path) as data:
+        return {"sale_ids": data["sale_ids"], "offsets": data["offsets"]}
+
 def generate_column_names(dimensions: list, metrics: dict) -> list:
     """
     Generate explicit column names for OLAP cube, ensuring no trailing underscores.
@@ -112,35 +275,118 @@ def write_cube_to_csv(cube: pd.DataFrame, filename: str) -> None:
         raise
 
 
-def main():
-    """Main function for OLAP cubing."""
+@instrument()
+def write_cube(cube: pd.DataFrame, name: str, fmt: str = DEFAULT_FORMAT) -> pathlib.Path:
+    """Write the OLAP cube in the given storage format (Parquet by default) and return its path."""
+    try:
+        output_path = write_table(cube, with_format(OLAP_OUTPUT_DIR.joinpath(name), fmt))
+        logger.info(f"OLAP cube saved to {output_path}.")
+        return output_path
+    except Exception as e:
+        logger.error(f"Error saving OLAP cube: {e}")
+        raise
+
+
+def add_time_dimensions(sales_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Make sure the DayOfWeek, Month and Year columns are filled in.
+
+    Sales read with SALES_CUBE_QUERY already carry them from the date_dim calendar table.
+    Sales without a calendar row get them from their YYYYMMDD date_key.
+
+    The columns are then shrunk to the smallest integer types, so the cube groupbys hash
+    compact codes. sale_amount keeps float64 because pandas sums float32 columns in float32.
+    """
+    if "Year" not in sales_df.columns:
+        sales_df = sales_df.assign(Year=np.nan, Month=np.nan, DayOfWeek=np.nan)
+    missing = sales_df["Year"].isna() & sales_df["date_key"].notna()
+    if missing.any():
+        dates = pd.to_datetime(sales_df.loc[missing, "date_key"].astype("int64").astype(str), format="%Y%m%d")
+        sales_df.loc[missing, "Year"] = dates.dt.year
+        sales_df.loc[missing, "Month"] = dates.dt.month
+        sales_df.loc[missing, "DayOfWeek"] = dates.dt.dayofweek + 1
+    sales_df = sales_df.astype({"Year": "Int64", "Month": "Int64", "DayOfWeek": "Int64"})
+    sales_df, _ = optimize_dtypes(sales_df, exclude=["sale_amount"])  # float32 sums would lose cents
+    return sales_df
+
+
+@instrument()
+def main(full: bool = False, workers: int = 1, engine: str = "store", chunk_rows: int = CHUNK_ROWS):
+    """
+    Main function for OLAP cubing.
+
+    With engine="store" (the default) the cube is kept as an aggregate table in the data
+    warehouse. Each run folds in only the sales added since the previous run; pass
+    full=True (--full) to rebuild it from all sales. workers (--workers) aggregates the
+    new sales in that many processes, and chunk_rows (--chunk-rows) sets how many sales
+    are read and folded in per batch.
+
+    With engine="sql" (--engine sql) SQLite aggregates all sales with one GROUP BY query
+    (see sql_cube.py) and nothing is stored in the warehouse; cell_id is then a row number
+    with no bridge table behind it.
+
+    The cube groups on integer keys (region_key, product_id); the written cubes carry the
+    region and product_name labels instead, looked up once per cell.
+
+    The finished cubes are also cached (see utils/stage_cache.py) under a fingerprint of
+    the warehouse file, the cube definition and the cubing code, so a rerun on an
+    unchanged warehouse reloads them without touching the database. full=True always recomputes.
+    """
     logger.info("Starting OLAP Cubing process...")
 
-    # Step 1: Ingest sales data
-    sales_df = ingest_sales_data_from_dw()
+    cache = StageCache(CACHE_DIR)
+    cache_params = {"dimensions": CUBE_DIMENSIONS, "metrics": CUBE_METRICS, "grouping_sets": CUBE_GROUPING_SETS,
+                    "labels": CUBE_LABELS, "engine": engine}
+    cubes = None if full else cache.get(cache.key("olap_cubing", cache_params, [DB_PATH], code=pathlib.Path(__file__)))
+    if cubes is not None:
+        logger.info("Warehouse unchanged since the last run, using the cached OLAP cubes")
+        olap_cube, grouping_sets_cube = cubes
+    else:
+        # The SQL engine only reads; the stored cube is written into the warehouse
+        with (reader(DB_PATH) if engine == "sql" else writer(DB_PATH)) as conn:
+            if engine == "sql":
+                # Steps 1-2: Aggregate every sale inside SQLite; only the cells are returned
+                partials = sql_partial_aggregate(conn, CUBE_DIMENSIONS, CUBE_METRICS)
+                olap_cube = finalize_cube(partials, CUBE_DIMENSIONS, CUBE_METRICS)
+                olap_cube["cell_id"] = np.arange(len(olap_cube), dtype=np.int64)
+                olap_cube = decode_dimensions(olap_cube, conn)
+            else:
+                # Step 1: Fold new sales into the stored cube (time-based dimensions are added per delta)
+                refresh_cube_store(conn, CUBE_DIMENSIONS, CUBE_METRICS, SALES_DELTA_QUERY, add_time_dimensions,
+                                   full=full, workers=workers, chunk_rows=chunk_rows)
 
-    # Step 2: Add additional columns for time-based dimensions
-    sales_df["sale_date"] = pd.to_datetime(sales_df["sale_date"])
-    sales_df["DayOfWeek"] = sales_df["sale_date"].dt.day_name()
-    sales_df["Month"] = sales_df["sale_date"].dt.month
-    sales_df["Year"] = sales_df["sale_date"].dt.year
+                # Step 2: Read the finished cube; means are derived from the stored sums and counts
+                olap_cube = decode_dimensions(read_cube_store(conn, CUBE_DIMENSIONS, CUBE_METRICS), conn)
+                partials = read_cube_partials(conn, CUBE_DIMENSIONS)
 
-    # Step 3: Define dimensions and metrics for the cube
-    dimensions = ["Year", "Month", "region", "product_name"]
-    metrics = {
-        "sale_amount": ["sum", "mean"],
-        "sale_id": "count"
-    }
+            # Step 3: Derive every subtotal level from the finest-grain cells instead of the sales
+            levels = rollup_partials(partials, CUBE_DIMENSIONS, CUBE_METRICS, CUBE_GROUPING_SETS)
+            grouping_sets_cube = decode_dimensions(
+                finalize_cube(levels, CUBE_DIMENSIONS + [GROUPING_ID_COLUMN], CUBE_METRICS), conn)
+        if engine != "sql":
+            checkpoint(DB_PATH)
 
-    # Step 4: Create the cube
-    olap_cube = create_olap_cube(sales_df, dimensions, metrics)
+        # Keyed on the warehouse as the refresh left it, which is what the next run will see
+        cache.put(cache.key("olap_cubing", cache_params, [DB_PATH], code=pathlib.Path(__file__)), (olap_cube, grouping_sets_cube))
 
-    # Step 5: Save the cube to a CSV file
-    write_cube_to_csv(olap_cube, "multidimensional_olap_cube.csv")
+    # Step 4: Save the cubes for the analysis scripts, plus a CSV export when the main format is not CSV
+    write_cube(olap_cube, "multidimensional_olap_cube")
+    write_cube(grouping_sets_cube, "multidimensional_olap_cube_grouping_sets")
+    if DEFAULT_FORMAT != "csv":
+        write_cube_to_csv(olap_cube, "multidimensional_olap_cube.csv")
 
     logger.info("OLAP Cubing process completed successfully.")
     logger.info(f"Please see outputs in {OLAP_OUTPUT_DIR}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build or refresh the multidimensional OLAP cube.")
+    parser.add_argument("--full", action="store_true", help="rebuild the cube from all sales")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="aggregate in this many processes (0 = one per CPU)")
+    parser.add_argument("--engine", choices=["store", "sql"], default="store",
+                        help="fold new sales into the stored cube, or aggregate all sales inside SQLite")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help="sales read from the warehouse and folded into the cube per batch")
+    args = parser.parse_args()
+    main(full=args.full, workers=args.workers, engine=args.engine, chunk_rows=args.chunk_rows)
\ No newline at end of file
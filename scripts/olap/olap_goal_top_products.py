@@ -1,28 +1,41 @@
+import argparse
 import pandas as pd
-import matplotlib.pyplot as plt
 import pathlib
 import sys
-import seaborn as sns
+from typing import Optional
 
 # For local imports, temporarily add project root to Python sys.path
-PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
 from utils.logger import logger  # noqa: E402
+from utils.metrics import instrument  # noqa: E402
+from utils.stage_cache import StageCache  # noqa: E402
+from utils.storage import find_table, read_table  # noqa: E402
+from scripts.olap.charts import (  # noqa: E402
+    HEADLESS, ChartJob, chart_file_name, render_charts, show_charts, use_headless_backend,
+)
+from scripts.olap.grouping_sets import GROUPING_ID_COLUMN, select_grouping_set  # noqa: E402
+from scripts.olap.top_k import top_k_per_group  # noqa: E402
 
 # Constants
 OLAP_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("olap_cubing_outputs")
-CUBED_FILE: pathlib.Path = OLAP_OUTPUT_DIR.joinpath("multidimensional_olap_cube.csv")
+CUBE_NAME: str = "multidimensional_olap_cube_grouping_sets"
+CUBE_DIMENSIONS: list = ["Year", "Month", "region", "product_name"]
+TOP_K: int = 3
+CUBE_COLUMNS: list = CUBE_DIMENSIONS + [GROUPING_ID_COLUMN, "sale_amount_sum"]
 RESULTS_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("results")
+CHARTS_OUTPUT_DIR: pathlib.Path = RESULTS_OUTPUT_DIR.joinpath("charts", "top_products_by_region")
+CACHE_DIR: pathlib.Path = pathlib.Path("data").joinpath("cache")
 
 # Create output directory for results if it doesn't exist
 RESULTS_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-def load_olap_cube(file_path: pathlib.Path) -> pd.DataFrame:
-    """Load the precomputed OLAP cube data."""
+def load_olap_cube(file_path: pathlib.Path, columns: list = None) -> pd.DataFrame:
+    """Load the precomputed OLAP cube data, optionally only the given columns."""
     try:
-        cube_df = pd.read_csv(file_path)
+        cube_df = read_table(file_path, columns=columns)
         logger.info(f"OLAP cube data successfully loaded from {file_path}.")
         return cube_df
     except Exception as e:
@@ -33,16 +46,17 @@ def load_olap_cube(file_path: pathlib.Path) -> pd.DataFrame:
 def analyze_top_products_by_region(cube_df: pd.DataFrame) -> pd.DataFrame:
     """
     Identify the top-selling products by region and month, based on total sales.
+
+    Product totals per region and month (summed over years) are looked up from the
+    precomputed (Month, region, product_name) grouping set instead of re-aggregated.
     """
     try:
-        # Rename for clarity
+        # Look up the subtotal level and rename for clarity
+        cube_df = select_grouping_set(cube_df, CUBE_DIMENSIONS, ["Month", "region", "product_name"])
         cube_df = cube_df.rename(columns={"sale_amount_sum": "total_sales"})
 
-        # Sort descending by total sales
-        sorted_df = cube_df.sort_values(by=["region", "Month", "total_sales"], ascending=[True, True, False])
-
-        # Group by region and month ONLY, then take top 3
-        top_products = sorted_df.groupby(["region", "Month"]).head(3).reset_index(drop=True)
+        # Group by region and month ONLY, then take the top 3 by total sales (no full sort)
+        top_products = top_k_per_group(cube_df, ["region", "Month"], "total_sales", TOP_K)
 
         logger.info("Top-selling products by region and month identified successfully.")
         return top_products
@@ -51,38 +65,56 @@ def analyze_top_products_by_region(cube_df: pd.DataFrame) -> pd.DataFrame:
         raise
 
 
-def visualize_top_products_by_region(top_products: pd.DataFrame) -> None:
-    """Visualize the top-selling product by region and month."""
+def visualize_top_products_by_region(top_products: pd.DataFrame, headless: bool = HEADLESS,
+                                     workers: Optional[int] = None) -> None:
+    """
+    Visualize the top-selling product by region and month: one chart of all regions, plus
+    one chart per region (by month) in data/results/charts/top_products_by_region.
+
+    Charts whose data did not change since the last run are not rendered again (see charts.py).
+    Unless headless, the chart of all regions is also shown in a window.
+    """
     try:
-        # Plot: grouped bar by region + month
-        plt.figure(figsize=(10, 6))
-        sns.barplot(data=top_products, x="region", y="total_sales", hue="product_name", palette="viridis")
-
-        plt.title("Top-Selling Products by Region and Month")
-        plt.xlabel("Region")
-        plt.ylabel("Total Sales")
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-
-        # Save the visualization
-        output_path = RESULTS_OUTPUT_DIR.joinpath("top_products_by_region_month.png")
-        plt.savefig(output_path)
-        logger.info(f"Visualization saved to {output_path}.")
-        plt.show()
+        # Plot: grouped bar by region + month, then one grouped bar by month per region
+        overall = ChartJob("top_products_by_region", top_products,
+                           RESULTS_OUTPUT_DIR.joinpath("top_products_by_region_month.png"),
+                           "Top-Selling Products by Region and Month")
+        jobs = [overall] + [
+            ChartJob("top_products_by_region", region_products.reset_index(drop=True),
+                     CHARTS_OUTPUT_DIR.joinpath(f"{chart_file_name(region)}.png"),
+                     f"Top-Selling Products in {region} by Month", {"x": "Month"})
+            for region, region_products in top_products.groupby("region", observed=True)
+        ]
+        render_charts(jobs, workers)
+        logger.info(f"Visualization saved to {overall.output_path}, and per region to {CHARTS_OUTPUT_DIR}.")
+        if not headless:
+            show_charts([overall])
     except Exception as e:
         logger.error(f"Error visualizing top products by region: {e}")
         raise
 
 
-def main():
-    """Main function for analyzing and visualizing top-selling products by region and month."""
-    logger.info("Starting TOP_PRODUCTS_BY_REGION analysis...")
+@instrument()
+def main(headless: bool = HEADLESS, workers: Optional[int] = None):
+    """
+    Main function for analyzing and visualizing top-selling products by region and month.
 
-    # Step 1: Load the precomputed OLAP cube
-    cube_df = load_olap_cube(CUBED_FILE)
+    headless (--headless) only writes the charts, without showing them; workers (--workers)
+    renders them in that many processes (default one per CPU).
+    """
+    if headless:
+        # Charts rendered in this process (a single pending one) must not use an interactive backend either
+        use_headless_backend()
+    logger.info("Starting TOP_PRODUCTS_BY_REGION analysis...")
 
-    # Step 2: Analyze top products by region
-    top_products = analyze_top_products_by_region(cube_df)
+    # Steps 1-2: Load the precomputed OLAP cube and analyze top products by region,
+    # or reuse the result of an earlier run on the same cube file
+    cube_path = find_table(OLAP_OUTPUT_DIR, CUBE_NAME)
+    top_products = StageCache(CACHE_DIR).get_or_compute(
+        "goal_top_products", {"columns": CUBE_COLUMNS, "top_k": TOP_K}, [cube_path],
+        lambda: analyze_top_products_by_region(load_olap_cube(cube_path, columns=CUBE_COLUMNS)),
+        code=pathlib.Path(__file__),
+    )
 
     # Step 3: Save top products as CSV
     top_csv = RESULTS_OUTPUT_DIR.joinpath("top_products_by_region_month.csv")
@@ -90,9 +122,14 @@ def main():
     logger.info(f"Top products by region saved to {top_csv}.")
 
     # Step 4: Visualize top products
-    visualize_top_products_by_region(top_products)
+    visualize_top_products_by_region(top_products, headless, workers)
 
     logger.info("Analysis and visualization of top-selling products completed successfully.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Find and chart the top-selling products by region and month.")
+    parser.add_argument("--headless", action="store_true", default=HEADLESS,
+                        help="write the charts without showing them (default when there is no display)")
+    parser.add_argument("--workers", type=int, default=None, help="render the charts in this many processes")
+    args = parser.parse_args()
+    main(args.headless, args.workers)
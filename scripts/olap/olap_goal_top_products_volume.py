@@ -1,28 +1,39 @@
+import argparse
 import pandas as pd
-import matplotlib.pyplot as plt
 import pathlib
 import sys
-import seaborn as sns
+from typing import Optional
 
 # For local imports, temporarily add project root to Python sys.path
-PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
 from utils.logger import logger  # noqa: E402
+from utils.metrics import instrument  # noqa: E402
+from utils.stage_cache import StageCache  # noqa: E402
+from utils.storage import find_table, read_table  # noqa: E402
+from scripts.olap.charts import HEADLESS, ChartJob, render_charts, show_charts, use_headless_backend  # noqa: E402
+from scripts.olap.grouping_sets import GROUPING_ID_COLUMN, select_grouping_set  # noqa: E402
+from scripts.olap.top_k import top_k_per_group  # noqa: E402
 
 # Constants
 OLAP_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("olap_cubing_outputs")
-CUBED_FILE: pathlib.Path = OLAP_OUTPUT_DIR.joinpath("multidimensional_olap_cube.csv")
+CUBE_NAME: str = "multidimensional_olap_cube_grouping_sets"
+CUBE_DIMENSIONS: list = ["Year", "Month", "region", "product_name"]
+TOP_K: int = 3
+CUBE_COLUMNS: list = CUBE_DIMENSIONS + [GROUPING_ID_COLUMN, "sale_id_count"]
 RESULTS_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("results")
+CHARTS_OUTPUT_DIR: pathlib.Path = RESULTS_OUTPUT_DIR.joinpath("charts")
+CACHE_DIR: pathlib.Path = pathlib.Path("data").joinpath("cache")
 
 # Create output directory for results if it doesn't exist
 RESULTS_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-def load_olap_cube(file_path: pathlib.Path) -> pd.DataFrame:
-    """Load the precomputed OLAP cube data."""
+def load_olap_cube(file_path: pathlib.Path, columns: list = None) -> pd.DataFrame:
+    """Load the precomputed OLAP cube data, optionally only the given columns."""
     try:
-        cube_df = pd.read_csv(file_path)
+        cube_df = read_table(file_path, columns=columns)
         logger.info(f"OLAP cube data successfully loaded from {file_path}.")
         return cube_df
     except Exception as e:
@@ -32,11 +43,8 @@ def load_olap_cube(file_path: pathlib.Path) -> pd.DataFrame:
 def analyze_top_products_by_volume(cube_df: pd.DataFrame) -> pd.DataFrame:
     """Identify the most frequently sold products in each region (by sale count), drilled down by year and month."""
     try:
-        # Sort by year, month, region, and sale count descending
-        sorted_df = cube_df.sort_values(by=["Year", "Month", "region", "sale_id_count"], ascending=[True, True, True, False])
-
-        # Get top 3 products per year-region-month by count
-        top_volume = sorted_df.groupby(["Year", "Month", "region", "product_name"]).head(3).reset_index(drop=True)
+        # Get top 3 products per year-region-month by sale count (no full sort)
+        top_volume = top_k_per_group(cube_df, ["Year", "Month", "region"], "sale_id_count", TOP_K)
 
         logger.info("Top products by volume identified successfully.")
         return top_volume
@@ -45,65 +53,88 @@ def analyze_top_products_by_volume(cube_df: pd.DataFrame) -> pd.DataFrame:
         raise
 
 
-def visualize_top_products_by_sales_count(top_volume_products: pd.DataFrame) -> None:
-    """Visualize the top 3 selling products by sales count using a grouped bar chart with a year → month drilldown."""
+def year_charts(kind: str, data: pd.DataFrame, folder: str, title: str) -> list:
+    """Return one chart job per year of the data, written to data/results/charts/<folder>/<year>.png."""
+    return [
+        ChartJob(kind, year_data.reset_index(drop=True), CHARTS_OUTPUT_DIR.joinpath(folder, f"{year}.png"),
+                 f"{title} in {year}")
+        for year, year_data in data.groupby("Year", observed=True)
+    ]
+
+
+def visualize_top_products_by_sales_count(top_volume_products: pd.DataFrame, headless: bool = HEADLESS,
+                                          workers: Optional[int] = None) -> None:
+    """
+    Visualize the top 3 selling products by sales count using a grouped bar chart with a year → month drilldown,
+    plus one chart per year in data/results/charts/top_products_by_sales_count.
+
+    Unless headless, the chart of all years is also shown in a window.
+    """
     try:
-        plt.figure(figsize=(10, 6))
-
-        # Create a grouped bar chart by year and month
-        sns.barplot(data=top_volume_products, x="Month", y="sale_id_count", hue="product_name", palette="Set2", ci=None)
-
-        # Set labels and title
-        plt.title("Top 3 Selling Products by Sales Count (Month-wise within Year)", fontsize=16)
-        plt.xlabel("Month")
-        plt.ylabel("Sales Count")
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-
-        # Save the grouped bar chart
-        output_path = RESULTS_OUTPUT_DIR.joinpath("top_products_by_sales_count_month.png")
-        plt.savefig(output_path)
-        logger.info(f"Top products by sales count grouped bar chart saved to {output_path}.")
-        plt.show()
+        # Grouped bar charts by month: all years, then each year
+        overall = ChartJob("top_products_by_sales_count", top_volume_products,
+                           RESULTS_OUTPUT_DIR.joinpath("top_products_by_sales_count_month.png"),
+                           "Top 3 Selling Products by Sales Count (Month-wise within Year)")
+        jobs = [overall] + year_charts("top_products_by_sales_count", top_volume_products,
+                                       "top_products_by_sales_count", "Top 3 Selling Products by Sales Count")
+        render_charts(jobs, workers)
+        logger.info(f"Top products by sales count grouped bar chart saved to {overall.output_path}.")
+        if not headless:
+            show_charts([overall])
     except Exception as e:
         logger.error(f"Error visualizing top products by sales count: {e}")
         raise
 
 
-def visualize_sale_counts_heatmap(cube_df: pd.DataFrame) -> None:
-    """Visualize total number of sales across regions and years using a heatmap."""
-    try:
-        heatmap_data = cube_df.groupby(["region", "Year", "Month"])["sale_id_count"].sum().unstack(level=["Year", "Month"])
-
-        # Sort years (columns) in ascending order
-        heatmap_data = heatmap_data[sorted(heatmap_data.columns)]
+def visualize_sale_counts_heatmap(region_months: pd.DataFrame, headless: bool = HEADLESS,
+                                  workers: Optional[int] = None) -> None:
+    """
+    Visualize total number of sales across regions and years using a heatmap of the (Year, Month, region) subtotals,
+    plus one heatmap per year in data/results/charts/sales_heatmap_region_month.
 
-        plt.figure(figsize=(10, 6))
-        sns.heatmap(heatmap_data, annot=True, fmt=".0f", cmap="YlOrBr", linewidths=0.5, vmin=0)
-
-        plt.title("Total Number of Sales by Region and Year")
-        plt.xlabel("Year")
-        plt.ylabel("Region")
-        plt.tight_layout()
-
-        output_path = RESULTS_OUTPUT_DIR.joinpath("sales_heatmap_region_year.png")
-        plt.savefig(output_path)
-        logger.info(f"Sales heatmap saved to {output_path}.")
-        plt.show()
+    Unless headless, the heatmap of all years is also shown in a window.
+    """
+    try:
+        overall = ChartJob("sale_counts_heatmap", region_months,
+                           RESULTS_OUTPUT_DIR.joinpath("sales_heatmap_region_year.png"),
+                           "Total Number of Sales by Region and Year")
+        jobs = [overall] + year_charts("sale_counts_heatmap", region_months, "sales_heatmap_region_month",
+                                       "Total Number of Sales by Region and Month")
+        render_charts(jobs, workers)
+        logger.info(f"Sales heatmap saved to {overall.output_path}.")
+        if not headless:
+            show_charts([overall])
     except Exception as e:
         logger.error(f"Error generating sales heatmap: {e}")
         raise
 
 
-def main():
-    """Main function for analyzing and visualizing sale count by region and year using a grouped bar chart and heatmap."""
+@instrument()
+def main(headless: bool = HEADLESS, workers: Optional[int] = None):
+    """
+    Main function for analyzing and visualizing sale count by region and year using a grouped bar chart and heatmap.
+
+    headless (--headless) only writes the charts, without showing them; workers (--workers)
+    renders them in that many processes (default one per CPU).
+    """
+    if headless:
+        # Charts rendered in this process (a single pending one) must not use an interactive backend either
+        use_headless_backend()
     logger.info("Starting SALE_COUNT_BY_REGION_YEAR analysis...")
 
-    # Step 1: Load the precomputed OLAP cube
-    cube_df = load_olap_cube(CUBED_FILE)
+    # Steps 1-2: Load the precomputed OLAP cube, analyze top-selling products by volume (sale count)
+    # on the finest-grain cells and look up the sale counts per region, year and month
+    # (a precomputed subtotal level), or reuse the results of an earlier run on the same cube file
+    cube_path = find_table(OLAP_OUTPUT_DIR, CUBE_NAME)
+
+    def analyze() -> tuple:
+        cube_df = load_olap_cube(cube_path, columns=CUBE_COLUMNS)
+        top_volume = analyze_top_products_by_volume(select_grouping_set(cube_df, CUBE_DIMENSIONS, CUBE_DIMENSIONS))
+        return top_volume, select_grouping_set(cube_df, CUBE_DIMENSIONS, ["Year", "Month", "region"])
 
-    # Step 2: Analyze top-selling products by volume (sale count)
-    top_volume_products = analyze_top_products_by_volume(cube_df)
+    top_volume_products, region_months = StageCache(CACHE_DIR).get_or_compute(
+        "goal_top_products_volume", {"columns": CUBE_COLUMNS, "top_k": TOP_K}, [cube_path], analyze,
+        code=pathlib.Path(__file__))
 
     # Step 3: Save top-volume products as CSV
     top_volume_csv = RESULTS_OUTPUT_DIR.joinpath("top_volume_products_by_region_year.csv")
@@ -111,12 +142,17 @@ def main():
     logger.info(f"Top volume products saved to {top_volume_csv}.")
 
     # Step 4: Visualize top-selling products by sales count using a grouped bar chart
-    visualize_top_products_by_sales_count(top_volume_products)
+    visualize_top_products_by_sales_count(top_volume_products, headless, workers)
 
-    # Step 5: Visualize sale counts via heatmap using the full cube data
-    visualize_sale_counts_heatmap(cube_df)
+    # Step 5: Visualize sale counts via heatmap using the region/year/month subtotals
+    visualize_sale_counts_heatmap(region_months, headless, workers)
 
     logger.info("Grouped bar chart and heatmap analysis of sale counts completed successfully.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Find and chart the top products by sale count per region and year.")
+    parser.add_argument("--headless", action="store_true", default=HEADLESS,
+                        help="write the charts without showing them (default when there is no display)")
+    parser.add_argument("--workers", type=int, default=None, help="render the charts in this many processes")
+    args = parser.parse_args()
+    main(args.headless, args.workers)
@@ -0,0 +1,161 @@
+"""
+scripts/olap/sql_cube.py
+
+OLAP cube aggregation pushed down into SQLite.
+
+The pandas path reads one row per sale out of the warehouse and aggregates in Python.
+This module turns the same dimensions and metrics into a single GROUP BY query, so
+SQLite aggregates while it scans and only one row per cube cell crosses into Python:
+
+    SELECT <dimension expressions>, SUM(s.sale_amount), COUNT(s.sale_amount), ...
+    FROM sale s JOIN customer c ... LEFT JOIN date_dim d ...
+    GROUP BY <dimensions> ORDER BY <dimensions>
+
+The query returns the additive partials of cube_partials.py (a mean is computed as its
+sum and count), which are finalized or rolled up into grouping sets in pandas exactly
+like the partials of the in-memory path. Cells without a value for some dimension are
+left out, as pandas' groupby does. They are dropped after the query, per cell: testing
+every dimension expression per sale in SQL (WHERE, or a HAVING SQLite pushes down) made
+the query about 1.5x slower.
+
+Do not run this script directly. olap_cubing.py uses it, and
+benchmarks/bench_sql_cube.py compares it with the pandas path.
+"""
+
+import pathlib
+import sqlite3
+import sys
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.metrics import instrument  # noqa: E402
+from scripts.olap.cube_partials import finalize_cube, partial_spec  # noqa: E402
+from scripts.olap.grouping_sets import GROUPING_ID_COLUMN, GroupingSets, rollup_partials  # noqa: E402
+
+# ISO date text of a YYYYMMDD date_key, for strftime() on days missing from date_dim
+DATE_KEY_TEXT: str = "printf('%04d-%02d-%02d', s.date_key / 10000, s.date_key / 100 % 100, s.date_key % 100)"
+
+# Cube dimension -> (SQL expression, table aliases it needs). Date parts come from the
+# date_dim calendar and fall back to the date_key itself for sales without a calendar row.
+SQL_DIMENSIONS: Dict[str, tuple] = {
+    "Year": ("COALESCE(d.year, s.date_key / 10000)", ["d"]),
+    "Month": ("COALESCE(d.month, s.date_key / 100 % 100)", ["d"]),
+    "DayOfWeek": (f"COALESCE(d.day_of_week_number, (CAST(strftime('%w', {DATE_KEY_TEXT}) AS INTEGER) + 6) % 7 + 1)",
+                  ["d"]),
+    "region_key": ("c.region_key", ["c"]),
+    "product_id": ("s.product_id", []),
+    "region": ("r.region_name", ["c", "r"]),
+    "product_name": ("p.product_name", ["p"]),
+}
+
+# Joins from the sale fact table, in dependency order. The customer join is always made,
+# so the SQL cube covers the same sales as SALES_CUBE_QUERY.
+SQL_JOINS: Dict[str, str] = {
+    "c": "JOIN customer c ON s.customer_id = c.customer_id",
+    "d": "LEFT JOIN date_dim d ON s.date_key = d.date_key",
+    "r": "LEFT JOIN region_dim r ON c.region_key = r.region_key",
+    "p": "LEFT JOIN product p ON s.product_id = p.product_id",
+}
+
+# SQL aggregate for each partial of cube_partials.py
+SQL_PARTIALS: Dict[str, str] = {"sum": "SUM", "count": "COUNT", "min": "MIN", "max": "MAX"}
+
+
+def build_cube_query(dimensions: List[str], metrics: Dict[str, Union[str, List[str]]],
+                     where: Optional[str] = None) -> str:
+    """
+    Build the GROUP BY query returning one row of partial aggregates per cube cell.
+
+    Args:
+        dimensions (list): Cube dimensions, keys of SQL_DIMENSIONS.
+        metrics (dict): Metrics on sale columns, as passed to create_olap_cube.
+        where (str, optional): Extra SQL condition on the sales (e.g. "s.sale_id > ?").
+
+    Returns:
+        str: The query; its columns are the dimensions followed by the partial columns.
+
+    Raises:
+        ValueError: If a dimension has no SQL expression.
+    """
+    unknown = [dimension for dimension in dimensions if dimension not in SQL_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"No SQL expression for cube dimensions {unknown}; add them to SQL_DIMENSIONS.")
+
+    aliases = {"c"}
+    for dimension in dimensions:
+        aliases.update(SQL_DIMENSIONS[dimension][1])
+    joins = [join for alias, join in SQL_JOINS.items() if alias in aliases]
+
+    columns = [f'{SQL_DIMENSIONS[dimension][0]} AS "{dimension}"' for dimension in dimensions]
+    columns += [
+        f'{SQL_PARTIALS[partial]}(s.{column}) AS "{column}_{partial}"'
+        for column, partials in partial_spec(metrics).items()
+        for partial in partials
+    ]
+    positions = ", ".join(str(position) for position in range(1, len(dimensions) + 1))
+
+    query = f"SELECT {', '.join(columns)}\nFROM sale s\n" + "\n".join(joins)
+    if where:
+        query += f"\nWHERE {where}"
+    if dimensions:
+        query += f"\nGROUP BY {positions}\nORDER BY {positions}"
+    return query
+
+
+@instrument()
+def sql_partial_aggregate(conn: sqlite3.Connection, dimensions: List[str],
+                          metrics: Dict[str, Union[str, List[str]]], where: Optional[str] = None,
+                          params: tuple = ()) -> pd.DataFrame:
+    """Aggregate the sales inside SQLite into one partial cell per combination of dimension values."""
+    partials = pd.read_sql_query(build_cube_query(dimensions, metrics, where), conn, params=params)
+    # GROUP BY keeps a NULL group; pandas' groupby leaves those rows out of the cube
+    partials = partials.dropna(subset=dimensions).reset_index(drop=True)
+    # A NULL group turns integer keys into floats; give them back their integer type
+    integral = [dimension for dimension in dimensions if pd.api.types.is_float_dtype(partials[dimension])
+                and (partials[dimension] % 1 == 0).all()]
+    return partials.astype({dimension: "int64" for dimension in integral})
+
+
+@instrument()
+def create_sql_cube(
+    conn: sqlite3.Connection,
+    dimensions: List[str],
+    metrics: Dict[str, Union[str, List[str]]],
+    grouping_sets: Optional[GroupingSets] = None,
+    where: Optional[str] = None,
+    params: tuple = (),
+) -> pd.DataFrame:
+    """
+    Create an OLAP cube with the aggregation done by SQLite.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the data warehouse.
+        dimensions (list): Cube dimensions, keys of SQL_DIMENSIONS.
+        metrics (dict): Mergeable metrics (sum, count, mean, min, max) on sale columns.
+        grouping_sets (str or list, optional): Also compute subtotals, as in create_olap_cube.
+        where (str, optional): Extra SQL condition on the sales, with ? placeholders.
+        params (tuple): Values for the placeholders in where.
+
+    Returns:
+        pd.DataFrame: The same cube create_olap_cube builds from the ingested sales: a
+        cell_id column at the finest grain, or every level with a grouping_id column.
+    """
+    partials = sql_partial_aggregate(conn, dimensions, metrics, where, params)
+    if grouping_sets is not None:
+        levels = rollup_partials(partials, dimensions, metrics, grouping_sets)
+        cube = finalize_cube(levels, dimensions + [GROUPING_ID_COLUMN], metrics)
+        logger.info(f"SQL OLAP cube created with dimensions {dimensions} and grouping sets {grouping_sets}")
+        return cube
+
+    cube = finalize_cube(partials, dimensions, metrics)
+    cube["cell_id"] = np.arange(len(cube), dtype=np.int64)
+    logger.info(f"SQL OLAP cube created with dimensions {dimensions} from {len(cube)} aggregated rows")
+    return cube
@@ -0,0 +1,262 @@
+r"""
+scripts/run_pipeline.py
+
+Run the whole pipeline (prep, warehouse load, OLAP cube, goal analyses) in dependency order.
+
+Each stage is one of the existing entry-point scripts, run in its own process from the
+project root, exactly as if started by hand. Stages whose dependencies have all
+finished run at the same time, so the three independent prep scripts run in parallel.
+
+A stage is skipped when nothing it reads has changed since its last successful run:
+its fingerprint is a SHA-256 over the contents of its input files, of its script and
+of the project modules the script imports (so editing scripts/olap/top_k.py reruns
+the stages that use it), and fingerprints are kept in data/pipeline_state.json. A
+stage also runs when one of its outputs is missing, or when --force is given. The
+fingerprint is stored after the stage finishes, so stages that update their own
+inputs (olap_cubing.py stores the cube in the warehouse it reads) are not rerun on
+the next pass.
+
+If a stage fails, the stages that depend on it are not started; the others finish.
+A table with the status and wall time of every stage is printed at the end, followed
+by the per-function metrics the stage scripts recorded for this run (utils/metrics.py).
+The stages share the runner's run_id; --profile tracemalloc|cprofile turns on the
+matching profiling mode in every stage.
+
+How to Run (from the root project folder, with the .venv active):
+
+    py scripts\run_pipeline.py
+    python3 scripts/run_pipeline.py --workers 3 --force
+    python3 scripts/run_pipeline.py --profile tracemalloc
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, NamedTuple, Optional
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.metrics import PROFILE_MODES, RUN_ID, format_summary, read_metrics, summarize_run  # noqa: E402
+from utils.stage_cache import project_modules  # noqa: E402
+from utils.storage import hash_file  # noqa: E402
+
+# Constants
+STATE_FILE: pathlib.Path = pathlib.Path("data").joinpath("pipeline_state.json")
+DEFAULT_WORKERS: int = 3
+
+
+class Stage(NamedTuple):
+    """One pipeline step: a script plus the files it reads and writes (glob patterns relative to the root)."""
+    name: str
+    script: str
+    inputs: List[str]
+    outputs: List[str]
+    depends_on: List[str] = []
+    args: List[str] = []  # command-line arguments for the script
+
+
+# The pipeline DAG, in an order that already respects the dependencies
+STAGES: List[Stage] = [
+    Stage("prepare_customers", "scripts/data_preparation/prepare_customers_data.py",
+          ["data/raw/customers_data.csv"], ["data/prepared/customers_data_prepared.*"]),
+    Stage("prepare_products", "scripts/data_preparation/prepare_products_data.py",
+          ["data/raw/products_data.csv"], ["data/prepared/products_data_prepared.*"]),
+    Stage("prepare_sales", "scripts/data_preparation/prepare_sales_data.py",
+          ["data/raw/sales_data.csv"], ["data/prepared/sales_data_prepared.*"]),
+    Stage("etl_to_dw", "scripts/etl_to_dw.py",
+          ["data/prepared/*_data_prepared.*"], ["data/dw/smart_sales.db"],
+          ["prepare_customers", "prepare_products", "prepare_sales"]),
+    Stage("olap_cubing", "scripts/olap/olap_cubing.py",
+          ["data/dw/smart_sales.db"], ["data/olap_cubing_outputs/multidimensional_olap_cube_grouping_sets.*"],
+          ["etl_to_dw"]),
+    Stage("goal_top_products", "scripts/olap/olap_goal_top_products.py",
+          ["data/olap_cubing_outputs/multidimensional_olap_cube_grouping_sets.*"],
+          ["data/results/top_products_by_region_month.csv"], ["olap_cubing"]),
+    Stage("goal_top_products_volume", "scripts/olap/olap_goal_top_products_volume.py",
+          ["data/olap_cubing_outputs/multidimensional_olap_cube_grouping_sets.*"],
+          ["data/results/top_volume_products_by_region_year.csv"], ["olap_cubing"]),
+]
+
+
+def validate_stages(stages: List[Stage]) -> None:
+    """
+    Check that stage names are unique and every dependency refers to an earlier stage.
+
+    Raises:
+        ValueError: If a name repeats or a dependency is unknown or listed later (which includes cycles).
+    """
+    seen = set()
+    for stage in stages:
+        if stage.name in seen:
+            raise ValueError(f"Stage '{stage.name}' is defined twice.")
+        for dependency in stage.depends_on:
+            if dependency not in seen:
+                raise ValueError(f"Stage '{stage.name}' depends on '{dependency}', which is not an earlier stage.")
+        seen.add(stage.name)
+
+
+def stage_files(root: pathlib.Path, patterns: List[str]) -> List[pathlib.Path]:
+    """Return the files matching the glob patterns under root, sorted."""
+    return sorted({path for pattern in patterns for path in root.glob(pattern) if path.is_file()})
+
+
+def fingerprint(stage: Stage, root: pathlib.Path) -> str:
+    """Return a hash of the stage's script and imported project modules, its arguments and its input files."""
+    digest = hashlib.sha256()
+    if stage.args:
+        digest.update(f"args:{stage.args}\n".encode())
+    root = root.resolve()
+    for path in project_modules(root.joinpath(stage.script), root) + stage_files(root, stage.inputs):
+        relative = path.relative_to(root).as_posix() if path.exists() else str(path)
+        digest.update(f"{relative}:{hash_file(path) if path.exists() else 'missing'}\n".encode())
+    return digest.hexdigest()
+
+
+def is_up_to_date(stage: Stage, root: pathlib.Path, state: Dict[str, str]) -> bool:
+    """Return True if the stage ran before on the same inputs and all its outputs still exist."""
+    if state.get(stage.name) != fingerprint(stage, root):
+        return False
+    return all(any(root.glob(pattern)) for pattern in stage.outputs)
+
+
+def load_state(state_path: pathlib.Path) -> Dict[str, str]:
+    """Return the stored stage fingerprints, or an empty dict if there are none yet."""
+    if not state_path.exists():
+        return {}
+    return json.loads(state_path.read_text())
+
+
+def save_state(state_path: pathlib.Path, state: Dict[str, str]) -> None:
+    """Write the stage fingerprints, replacing the file in one step."""
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = state_path.with_suffix(".tmp")
+    temp_path.write_text(json.dumps(state, indent=2, sort_keys=True))
+    temp_path.replace(state_path)
+
+
+def run_stage(stage: Stage, root: pathlib.Path, profile: Optional[str] = None) -> float:
+    """
+    Run the stage's script in a new Python process from root and return its wall time in seconds.
+
+    The script records its metrics under the runner's run_id, with the given profiling mode.
+
+    Raises:
+        subprocess.CalledProcessError: If the script exits with an error.
+    """
+    # Charts are saved to files; a non-interactive backend keeps plt.show() from waiting on a window
+    env = {**os.environ, "MPLBACKEND": "Agg", "SMART_RUN_ID": RUN_ID}
+    if profile:
+        env["SMART_PROFILE"] = profile
+    start_time = time.perf_counter()
+    subprocess.run([sys.executable, str(root.joinpath(stage.script)), *stage.args], cwd=root, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    return time.perf_counter() - start_time
+
+
+def run_pipeline(
+    stages: List[Stage] = STAGES,
+    workers: int = DEFAULT_WORKERS,
+    force: bool = False,
+    root: pathlib.Path = PROJECT_ROOT,
+    state_path: Optional[pathlib.Path] = None,
+    profile: Optional[str] = None,
+) -> Dict[str, Dict[str, object]]:
+    """
+    Run the stages in dependency order, independent stages in parallel.
+
+    Args:
+        stages (list): Stages in an order that respects their dependencies.
+        workers (int): Most stages running at the same time.
+        force (bool): Run every stage even if its inputs have not changed.
+        root (pathlib.Path): Folder the scripts run from and the patterns are relative to.
+        state_path (pathlib.Path, optional): Fingerprint file (default: data/pipeline_state.json under root).
+        profile (str, optional): Profiling mode for the stage scripts, "tracemalloc" or "cprofile".
+
+    Returns:
+        dict: {stage name: {"status": "ran" | "skipped" | "failed" | "blocked", "seconds": float}}
+        in stage order. Blocked stages were not started because a dependency failed.
+    """
+    validate_stages(stages)
+    state_path = state_path or root.joinpath(STATE_FILE)
+    state = load_state(state_path)
+    results: Dict[str, Dict[str, object]] = {}
+    pending = list(stages)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while pending or running:
+            # Start (or skip) every stage whose dependencies are all done
+            for stage in list(pending):
+                statuses = [results.get(dependency, {}).get("status") for dependency in stage.depends_on]
+                if any(status in ("failed", "blocked") for status in statuses):
+                    results[stage.name] = {"status": "blocked", "seconds": 0.0}
+                    logger.warning(f"Pipeline stage {stage.name} not started: a dependency failed")
+                elif all(status in ("ran", "skipped") for status in statuses):
+                    if not force and is_up_to_date(stage, root, state):
+                        results[stage.name] = {"status": "skipped", "seconds": 0.0}
+                        logger.info(f"Pipeline stage {stage.name} skipped: inputs unchanged")
+                    else:
+                        logger.info(f"Pipeline stage {stage.name} started")
+                        running[executor.submit(run_stage, stage, root, profile)] = stage
+                else:
+                    continue
+                pending.remove(stage)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    seconds = future.result()
+                except subprocess.CalledProcessError as e:
+                    results[stage.name] = {"status": "failed", "seconds": 0.0}
+                    error_tail = e.stderr.decode(errors="replace").strip()[-2000:]
+                    logger.error(f"Pipeline stage {stage.name} failed with exit code {e.returncode}:\n{error_tail}")
+                    continue
+                results[stage.name] = {"status": "ran", "seconds": seconds}
+                state[stage.name] = fingerprint(stage, root)
+                save_state(state_path, state)
+                logger.info(f"Pipeline stage {stage.name} finished in {seconds:.2f} s")
+
+    return {stage.name: results[stage.name] for stage in stages}
+
+
+def format_report(results: Dict[str, Dict[str, object]]) -> str:
+    """Return a table with the status and wall time of each stage."""
+    lines = [f"{'stage':<26} {'status':<8} {'seconds':>8}"]
+    for name, result in results.items():
+        lines.append(f"{name:<26} {result['status']:<8} {result['seconds']:>8.2f}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the pipeline stages in dependency order.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="stages run at the same time")
+    parser.add_argument("--force", action="store_true", help="run every stage even if its inputs are unchanged")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None,
+                        help="also trace memory allocations or save cProfile files in every stage")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    results = run_pipeline(workers=args.workers, force=args.force, profile=args.profile)
+    print(format_report(results))
+    print(f"Total wall time: {time.perf_counter() - start_time:.2f} s")
+    print()
+    print(format_summary(summarize_run(read_metrics(run_id=RUN_ID)), RUN_ID))
+    if any(result["status"] in ("failed", "blocked") for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
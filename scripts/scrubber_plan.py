@@ -0,0 +1,130 @@
+r"""
+scripts/scrubber_plan.py
+
+Do not run this script directly.
+DataScrubber uses it in lazy mode (DataScrubber(df, lazy=True)).
+
+In lazy mode each DataScrubber cleaning call only records a PlanStep. Before the
+plan runs, optimize_plan() rewrites it so it touches less data, without changing the
+result:
+
+1. Push down: row filters (filter_column_outliers) move ahead of the type conversions,
+   string formatting, drops and renames they don't depend on, and drop_columns
+   moves ahead of the steps that don't use the dropped columns. Later steps then
+   work on fewer rows and copy fewer columns.
+2. Fuse: adjacent row filters (including dropping rows with missing values) become one
+   boolean mask and one copy, adjacent string formatting of the same column becomes
+   one chain with a single trim, and adjacent drops become one drop.
+
+Row filters are not moved ahead of date parsing: pandas picks the datetime resolution
+from the values it sees, so parsing fewer rows could change the column dtype.
+
+One behavior differs from eager mode: a conversion that would fail only on rows a
+later filter removes now succeeds, because the filter runs first.
+"""
+
+from typing import Dict, List, NamedTuple, Optional
+
+
+class PlanStep(NamedTuple):
+    """One recorded DataScrubber call (op is the method name) or a fused step."""
+    op: str
+    args: Dict
+
+
+# Steps that change the values of one column (args["column"]) and nothing else
+COLUMN_STEPS = ["convert_column_to_new_data_type", "format_column_strings_to_lower_and_trim",
+                "format_column_strings_to_upper_and_trim"]
+
+# String formatting steps and the case change each one applies before trimming
+STRING_CASES = {"format_column_strings_to_lower_and_trim": "lower",
+                "format_column_strings_to_upper_and_trim": "upper"}
+
+
+def is_row_filter(step: PlanStep) -> bool:
+    """Return True for steps that only remove rows, judged by values they don't change."""
+    return step.op == "filter_column_outliers" or (step.op == "handle_missing_data" and step.args["drop"])
+
+
+def filter_before(earlier: PlanStep, step: PlanStep) -> Optional[PlanStep]:
+    """Return filter_column_outliers rewritten to run before earlier, or None if it cannot move."""
+    column = step.args["column"]
+    if earlier.op in COLUMN_STEPS:
+        return step if earlier.args["column"] != column else None
+    if earlier.op == "drop_columns":
+        return step if column not in earlier.args["columns"] else None
+    if earlier.op == "rename_columns":
+        mapping = earlier.args["column_mapping"]
+        if column in mapping and column not in mapping.values():
+            return None  # renamed away: the eager call fails, keep it where it is
+        original = {new: old for old, new in mapping.items()}.get(column, column)
+        return PlanStep(step.op, {**step.args, "column": original})
+    return None
+
+
+def drop_before(earlier: PlanStep, step: PlanStep) -> Optional[PlanStep]:
+    """Return drop_columns unchanged if it can run before earlier, or None if it cannot move."""
+    dropped = set(step.args["columns"])
+    if earlier.op in COLUMN_STEPS or earlier.op == "filter_column_outliers":
+        return step if earlier.args["column"] not in dropped else None
+    if earlier.op == "parse_dates_to_add_standard_datetime":
+        return step if not dropped & {earlier.args["column"], "StandardDateTime"} else None
+    if earlier.op == "rename_columns":
+        mapping = earlier.args["column_mapping"]
+        return step if not dropped & (set(mapping) | set(mapping.values())) else None
+    if earlier.op == "handle_missing_data" and not earlier.args["drop"]:
+        return step  # filling values column by column does not depend on other columns
+    return None
+
+
+def push_down(steps: List[PlanStep]) -> List[PlanStep]:
+    """Move row filters and column drops as early in the plan as they can safely go."""
+    steps = list(steps)
+    for position in range(len(steps)):
+        current = position
+        while current > 0:
+            step = steps[current]
+            if step.op == "filter_column_outliers":
+                moved = filter_before(steps[current - 1], step)
+            elif step.op == "drop_columns":
+                moved = drop_before(steps[current - 1], step)
+            else:
+                moved = None
+            if moved is None:
+                break
+            steps[current - 1], steps[current] = moved, steps[current - 1]
+            current -= 1
+    return steps
+
+
+def fuse(steps: List[PlanStep]) -> List[PlanStep]:
+    """Merge adjacent steps that can run as one pass over the data."""
+    fused: List[PlanStep] = []
+    for step in steps:
+        previous = fused[-1] if fused else None
+        if is_row_filter(step):
+            condition = (("between", step.args["column"], step.args["lower_bound"], step.args["upper_bound"])
+                         if step.op == "filter_column_outliers" else ("notna",))
+            if previous is not None and previous.op == "filter_rows":
+                previous.args["conditions"].append(condition)
+            else:
+                fused.append(PlanStep("filter_rows", {"conditions": [condition]}))
+        elif step.op in STRING_CASES:
+            column = step.args["column"]
+            if previous is not None and previous.op == "format_strings" and previous.args["column"] == column:
+                previous.args["cases"].append(STRING_CASES[step.op])
+            else:
+                fused.append(PlanStep("format_strings", {"column": column, "cases": [STRING_CASES[step.op]]}))
+        elif (step.op == "drop_columns" and previous is not None and previous.op == "drop_columns"
+              and not set(step.args["columns"]) & set(previous.args["columns"])):
+            previous.args["columns"].extend(step.args["columns"])
+        else:
+            fused.append(PlanStep(step.op, dict(step.args)))
+    return fused
+
+
+def optimize_plan(steps: List[PlanStep]) -> List[PlanStep]:
+    """Return an equivalent plan that filters and drops early and fuses adjacent steps."""
+    steps = [PlanStep(step.op, {key: list(value) if isinstance(value, list) else value
+                                for key, value in step.args.items()}) for step in steps]
+    return fuse(push_down(steps))
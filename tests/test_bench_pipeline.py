@@ -0,0 +1,67 @@
+r"""
+tests/test_bench_pipeline.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_bench_pipeline.py
+    python3 tests\test_bench_pipeline.py
+
+This test suite verifies that the pipeline benchmark compares the stage and function
+timings of two commits and flags the ones that got slower.
+"""
+
+import unittest
+import json
+import os
+import pathlib
+import sys
+import tempfile
+
+# Write the logs and metrics of the test run to a temporary folder, not the project's logs/
+os.environ.setdefault("SMART_LOG_DIR", str(pathlib.Path(tempfile.gettempdir()).joinpath("smart_test_logs")))
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from benchmarks.bench_pipeline import compare, machine  # noqa: E402
+
+
+class TestBenchPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.results_file = pathlib.Path(self.temp_dir.name).joinpath("pipeline.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_results(self, rows: list) -> None:
+        with self.results_file.open("w") as file:
+            for commit, kind, name, status, seconds in rows:
+                file.write(json.dumps({"commit": commit, "machine": machine(), "scale": 1000, "kind": kind,
+                                       "name": name, "status": status, "seconds": seconds}) + "\n")
+
+    def test_slower_stage_is_flagged(self):
+        self.write_results([
+            ("aaa1111", "stage", "etl_to_dw", "ran", 1.0),
+            ("aaa1111", "stage", "olap_cubing", "ran", 2.0),
+            ("aaa1111", "stage", "prepare_sales", "skipped", 0.1),
+            ("aaa1111", "function", "load_data_to_db", "ok", 0.8),
+            ("bbb2222", "stage", "etl_to_dw", "ran", 3.0),
+            ("bbb2222", "stage", "olap_cubing", "ran", 2.05),
+            ("bbb2222", "stage", "prepare_sales", "skipped", 5.0),
+            ("bbb2222", "function", "load_data_to_db", "error", 9.0),
+        ])
+        table = compare(self.results_file, "bbb2222", None, threshold=0.1, min_seconds=0.05)
+        self.assertEqual(table.attrs["baseline"], "aaa1111")
+        # Skipped stages and failed calls are not timings worth comparing
+        self.assertEqual(table.index.tolist(), [(1000, "stage", "etl_to_dw"), (1000, "stage", "olap_cubing")])
+        self.assertEqual(table["regression"].tolist(), [True, False])
+        self.assertEqual(table.loc[(1000, "stage", "etl_to_dw"), "ratio"], 3.0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
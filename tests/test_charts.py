@@ -0,0 +1,84 @@
+r"""
+tests/test_charts.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_charts.py
+    python3 tests\test_charts.py
+
+This test suite verifies that the goal script charts render headless, in worker processes,
+only when their data changed, and without leaving figures open.
+"""
+
+import unittest
+import os
+import pathlib
+import sys
+import tempfile
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+# Write the logs and metrics of the test run to a temporary folder, not the project's logs/
+os.environ.setdefault("SMART_LOG_DIR", str(pathlib.Path(tempfile.gettempdir()).joinpath("smart_test_logs")))
+
+import matplotlib.pyplot as plt  # noqa: E402
+import pandas as pd  # noqa: E402
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.olap.charts import ChartJob, chart_hash, render_charts, rendered_hash  # noqa: E402
+
+
+def region_months(year: int, scale: int = 1) -> pd.DataFrame:
+    return pd.DataFrame({
+        "region": ["East", "East", "West", "West"],
+        "Year": [year] * 4,
+        "Month": [1, 2, 1, 2],
+        "sale_id_count": [count * scale for count in (5, 7, 3, 9)],
+    })
+
+
+class TestCharts(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def jobs(self, scale_2021: int = 1) -> list:
+        return [ChartJob("sale_counts_heatmap", region_months(year, scale_2021 if year == 2021 else 1),
+                         self.root.joinpath("heatmaps", f"{year}.png"), f"Sales in {year}")
+                for year in (2020, 2021, 2022)]
+
+    def test_only_charts_with_changed_data_are_rendered_again(self):
+        jobs = self.jobs()
+        statuses = render_charts(jobs, workers=1)
+        self.assertEqual(set(statuses.values()), {"rendered"})
+        self.assertEqual(plt.get_fignums(), [])
+        for job in jobs:
+            self.assertEqual(rendered_hash(job.output_path), chart_hash(job))
+
+        self.assertEqual(set(render_charts(self.jobs(), workers=1).values()), {"unchanged"})
+
+        # Changing one year's data, or deleting a chart, renders just that chart
+        jobs[0].output_path.unlink()
+        statuses = render_charts(self.jobs(scale_2021=2), workers=1)
+        rendered = sorted(pathlib.Path(path).stem for path, status in statuses.items() if status == "rendered")
+        self.assertEqual(rendered, ["2020", "2021"])
+
+    def test_charts_render_in_worker_processes(self):
+        statuses = render_charts(self.jobs(), workers=2)
+        self.assertEqual(set(statuses.values()), {"rendered"})
+        for job in self.jobs():
+            self.assertEqual(rendered_hash(job.output_path), chart_hash(job))
+        with self.assertRaises(ValueError):
+            chart_hash(ChartJob("pie", region_months(2020), self.root.joinpath("pie.png"), "Pie"))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
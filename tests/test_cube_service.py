@@ -0,0 +1,155 @@
+r"""
+tests/test_cube_service.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_cube_service.py
+    python3 tests\test_cube_service.py
+
+This test suite verifies that the cube query service answers like the grouping sets cube
+and the goal scripts, caches answers, reloads a rewritten cube, and serves JSON over HTTP.
+"""
+
+import unittest
+import json
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from unittest import mock
+import pandas as pd
+
+# Write the logs and metrics of the test run to a temporary folder, not the project's logs/
+os.environ.setdefault("SMART_LOG_DIR", str(pathlib.Path(tempfile.gettempdir()).joinpath("smart_test_logs")))
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts import etl_to_dw  # noqa: E402
+from scripts.dw_access import close_pools  # noqa: E402
+from scripts.olap import olap_cubing  # noqa: E402
+from scripts.olap.cube_service import CUBE_DIMENSIONS, CUBE_NAME, CubeService, serve  # noqa: E402
+from scripts.olap.grouping_sets import select_grouping_set  # noqa: E402
+from scripts.olap.olap_goal_top_products import analyze_top_products_by_region  # noqa: E402
+from utils.storage import find_table, read_table, write_table  # noqa: E402
+
+SOURCE_PREPARED_DIR = PROJECT_ROOT.joinpath("tests", "fixtures", "prepared")
+
+
+class TestCubeService(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Build the warehouse and its grouping sets cube once in a temporary folder."""
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(cls.temp_dir.name)
+        shutil.copytree(SOURCE_PREPARED_DIR, root.joinpath("prepared"))
+        cls.db_path = root.joinpath("smart_sales.db")
+        cls.output_dir = root.joinpath("olap_cubing_outputs")
+        cls.output_dir.mkdir()
+        etl_to_dw.load_data_to_db(cls.db_path, root.joinpath("prepared"))
+        with mock.patch.object(olap_cubing, "DB_PATH", cls.db_path), \
+                mock.patch.object(olap_cubing, "OLAP_OUTPUT_DIR", cls.output_dir), \
+                mock.patch.object(olap_cubing, "CACHE_DIR", root.joinpath("cache")):
+            olap_cubing.main()
+        cls.cube_path = find_table(cls.output_dir, CUBE_NAME)
+        cls.cube = read_table(cls.cube_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        close_pools()
+        cls.temp_dir.cleanup()
+
+    def service(self, source: str = "file") -> CubeService:
+        return CubeService(source, cube_dir=self.output_dir, db_path=self.db_path, check_interval=0)
+
+    def assert_frames_equal(self, actual: pd.DataFrame, expected: pd.DataFrame):
+        pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True),
+                                      check_dtype=False)
+
+    def test_queries_match_the_cube_and_the_goal_scripts(self):
+        service = self.service()
+
+        # Roll-up: sale counts by region x year is the (Year, region) grouping set
+        answer = service.query(["region", "Year"], metrics=["sale_id_count"])
+        expected = select_grouping_set(self.cube, CUBE_DIMENSIONS, ["Year", "region"])
+        self.assert_frames_equal(answer, expected.sort_values(["Year", "region"])[["Year", "region", "sale_id_count"]])
+
+        # Top 3 products per region and month, as olap_goal_top_products.py finds them
+        answer = service.query(["Month", "region", "product_name"], metrics=["sale_amount_sum"], top=3,
+                               per=["region", "Month"], by="sale_amount_sum")
+        expected = analyze_top_products_by_region(self.cube)
+        self.assert_frames_equal(answer.rename(columns={"sale_amount_sum": "total_sales"}), expected[
+            ["Month", "region", "product_name", "total_sales"]])
+
+        # Slice and dice: filter values may come as strings, like from a URL
+        year, region = self.cube["Year"].dropna().iloc[0], self.cube["region"].dropna().iloc[0]
+        answer = service.query(["region"], {"Year": [str(year)], "region": region})
+        level = select_grouping_set(self.cube, CUBE_DIMENSIONS, ["Year", "region"])
+        self.assert_frames_equal(answer, level[(level["Year"] == year) & (level["region"] == region)])
+        self.assertTrue(service.query(["region"], {"region": "Nowhere"}).empty)
+
+        # Drill down from a year into its months
+        months = service.drill_down(["Year"], {"Year": year})
+        level = select_grouping_set(self.cube, CUBE_DIMENSIONS, ["Year", "Month"])
+        self.assert_frames_equal(months, level[level["Year"] == year].sort_values("Month"))
+
+        # The warehouse source rolls up the stored cube to the same answers
+        self.assert_frames_equal(self.service("warehouse").query(["region", "Year"]), service.query(["region", "Year"]))
+
+        for bad_query in ({"group_by": ["Country"]}, {"group_by": ["Year"], "metrics": ["profit"]},
+                          {"group_by": ["Year"], "per": ["region"], "top": 1},
+                          {"group_by": ["Year"], "filters": {"Year": "last"}}):
+            with self.assertRaises(ValueError):
+                service.query(**bad_query)
+
+    def test_answers_are_cached_until_the_cube_changes(self):
+        backup = self.cube_path.read_bytes()
+        try:
+            service = self.service()
+            first = service.query(["region"], metrics=["sale_id_count"])
+            first.loc[0, "sale_id_count"] = -1  # Callers get a copy, the cached answer stays intact
+            second = service.query(["region"], metrics=["sale_id_count"])
+            self.assertEqual((service.hits, service.misses), (1, 1))
+            self.assertGreater(second.loc[0, "sale_id_count"], 0)
+
+            # Rewriting the cube file (as olap_cubing.py does) loads the new cube and drops the cache
+            changed = self.cube.copy()
+            changed["sale_id_count"] = changed["sale_id_count"] * 2
+            write_table(changed, self.cube_path)
+            third = service.query(["region"], metrics=["sale_id_count"])
+            self.assertEqual(service.misses, 2)
+            self.assertEqual(third["sale_id_count"].tolist(), (second["sale_id_count"] * 2).tolist())
+        finally:
+            self.cube_path.write_bytes(backup)
+
+    def test_http_service_returns_json(self):
+        server = serve(self.service(), port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        try:
+            with urllib.request.urlopen(f"{base}/query?group_by=region&top=2&by=sale_amount_sum") as response:
+                body = json.loads(response.read())
+            expected = self.service().query(["region"], top=2, by="sale_amount_sum")
+            self.assertEqual(body["count"], 2)
+            self.assertEqual([row["region"] for row in body["rows"]], expected["region"].tolist())
+
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                urllib.request.urlopen(f"{base}/query?group_by=Country")
+            self.assertEqual(raised.exception.code, 400)
+            self.assertIn("Country", json.loads(raised.exception.read())["error"])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -11,11 +11,17 @@ This test suite verifies that each function in the DataScrubber class works as e
 """
 
 import unittest
+import os
 import pathlib
+import subprocess
 import sys
+import tempfile
 from io import StringIO
 import pandas as pd
 
+# Write the logs and metrics of the test run to a temporary folder, not the project's logs/
+os.environ.setdefault("SMART_LOG_DIR", str(pathlib.Path(tempfile.gettempdir()).joinpath("smart_test_logs")))
+
 # For local imports, temporarily add project root to Python sys.path
 PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT) not in sys.path:
@@ -93,6 +99,8 @@ class TestDataScrubber(unittest.TestCase):
         info, describe = self.scrubber.inspect_data()
         self.assertIsNotNone(info, "DataFrame info should not be None")
         self.assertIsNotNone(describe, "DataFrame description should not be None")
+        self.assertTrue(info.startswith("6 rows, 4 columns, 0 duplicate rows"), info)
+        self.assertIn("Score", describe, "Every column should be described")
 
     def test_parse_dates_to_add_standard_datetime(self):
         df_parsed = self.scrubber.parse_dates_to_add_standard_datetime('Date')
@@ -112,6 +120,101 @@ class TestDataScrubber(unittest.TestCase):
         df_reordered = self.scrubber.reorder_columns(['Name', 'ID', 'Date'])
         self.assertEqual(df_reordered.columns.tolist(), ['Name', 'ID', 'Date'], "Columns not reordered correctly")
 
+    def test_lazy_plan_matches_eager(self):
+        """Test that a lazy plan gives the same DataFrame as the same calls made eagerly."""
+        messy = pd.DataFrame({
+            'ID': [1, 2, 3, 4, 5, 5, 6],
+            'Name': ['  Alice', 'bob ', 'Charlie', None, ' Eve', ' Eve', 'Ann'],
+            'Score': [10, 15, 200, 12, 25, 25, -3],
+            'Date': ['2023-01-01', '2023-01-02', '2023-01-03', '2023-01-04', '2023-01-05', '2023-01-05', '2023-01-06'],
+            'Notes': ['a', 'b', 'c', 'd', 'e', 'e', 'f'],
+        })
+        calls = [
+            ('parse_dates_to_add_standard_datetime', ('Date',)),
+            ('format_column_strings_to_upper_and_trim', ('Name',)),
+            ('format_column_strings_to_lower_and_trim', ('Name',)),
+            ('convert_column_to_new_data_type', ('ID', 'float')),
+            ('rename_columns', ({'Score': 'Points', 'Name': 'FullName'},)),
+            ('filter_column_outliers', ('Points', 0, 100)),
+            ('drop_columns', (['Notes'],)),
+            ('handle_missing_data', (True,)),
+            ('remove_duplicate_records', ()),
+            ('reorder_columns', (['FullName', 'Points', 'ID', 'StandardDateTime', 'Date'],)),
+        ]
+        eager = DataScrubber(messy.copy())
+        for method, args in calls:
+            getattr(eager, method)(*args)
+
+        lazy = DataScrubber(messy.copy(), lazy=True)
+        for method, args in calls:
+            self.assertIs(getattr(lazy, method)(*args), lazy, "Lazy calls should return the scrubber")
+        plan = lazy.explain()
+        self.assertTrue(plan[0].startswith('drop_columns'), f"Drop not pushed down: {plan}")
+        self.assertTrue(plan[2].startswith("filter_rows(conditions=[('between', 'Score'"), f"Filter not pushed down: {plan}")
+        self.assertEqual(sum(step.startswith('format_strings') for step in plan), 1, "String steps not fused")
+
+        pd.testing.assert_frame_equal(lazy.execute(), eager.df)
+        self.assertEqual(lazy.plan, [], "Plan not cleared after execute")
+
+    def test_lazy_mode_runs_pending_plan_before_checks(self):
+        """Test that consistency checks see the result of the recorded plan."""
+        scrubber = DataScrubber(df.copy(), lazy=True)
+        scrubber.handle_missing_data(fill_value=0).remove_duplicate_records()
+        consistency = scrubber.check_data_consistency_after_cleaning()
+        self.assertEqual(consistency['duplicate_count'], 0, "Plan not executed before the check")
+
+    def test_profile_data_matches_pandas(self):
+        """Test that the one-pass profile agrees with the separate pandas scans, whole and in chunks."""
+        expected_nulls = df.isnull().sum()
+        for chunksize in (None, 2, 4):
+            profile = self.scrubber.profile_data(chunksize=chunksize)
+            columns = profile['columns']
+            self.assertEqual(profile['rows'], len(df))
+            self.assertEqual(profile['duplicate_count'], df.duplicated().sum(), "Duplicate count differs")
+            self.assertEqual(columns['null_count'].tolist(), expected_nulls.tolist(), "Null counts differ")
+            self.assertEqual(columns['distinct_count'].tolist(), df.nunique().tolist(), "Distinct counts differ")
+            self.assertAlmostEqual(columns.loc['Score', 'mean'], df['Score'].mean())
+            self.assertEqual(columns.loc['ID', 'min'], df['ID'].min())
+            self.assertEqual(columns.loc['Score', 'max'], df['Score'].max())
+
+    def test_profile_data_sketch_mode_estimates(self):
+        """Test that sketch mode estimates distinct counts and duplicates closely."""
+        rows = pd.DataFrame({'ID': range(20000), 'Group': [i % 50 for i in range(20000)]})
+        rows = pd.concat([rows, rows.iloc[:300]], ignore_index=True)
+        profile = DataScrubber(rows).profile_data(sketch=True, chunksize=5000)
+        self.assertTrue(profile['approximate'])
+        self.assertAlmostEqual(profile['columns'].loc['ID', 'distinct_count'], 20000, delta=600)
+        self.assertEqual(profile['columns'].loc['Group', 'distinct_count'], 50)
+        self.assertGreaterEqual(profile['duplicate_count'], 300, "A Bloom filter never misses a duplicate")
+        self.assertLessEqual(profile['duplicate_count'], 400)
+
+    def test_optimize_dtypes_shrinks_without_changing_values(self):
+        """Test that columns get the smallest exact dtypes and only low-cardinality strings become categorical."""
+        rows = pd.DataFrame({
+            'ID': range(1000),
+            'Region': ['East', 'West', 'North', 'South'] * 250,
+            'Name': [f'customer_{i}' for i in range(1000)],
+            'Points': [i * 0.5 for i in range(1000)],
+            'Amount': [i + 0.01 for i in range(1000)],
+        })
+        scrubber = DataScrubber(rows.copy())
+        optimized = scrubber.optimize_dtypes()
+        self.assertEqual(str(optimized['ID'].dtype), 'int16')
+        self.assertIsInstance(optimized['Region'].dtype, pd.CategoricalDtype)
+        self.assertNotIsInstance(optimized['Name'].dtype, pd.CategoricalDtype)
+        self.assertEqual(str(optimized['Points'].dtype), 'float32')
+        self.assertEqual(str(optimized['Amount'].dtype), 'float64', "Inexact float32 values must stay float64")
+        pd.testing.assert_frame_equal(optimized, rows, check_dtype=False, check_categorical=False)
+        self.assertGreater(scrubber.dtype_report['saved_bytes'], 0)
+
+    def test_import_leaves_logging_alone(self):
+        """Test that importing DataScrubber in a fresh process does not set up the project logger."""
+        code = ("import sys; sys.path.append(sys.argv[1]); import scripts.data_scrubber; "
+                "print('utils.logger' in sys.modules)")
+        result = subprocess.run([sys.executable, "-c", code, str(PROJECT_ROOT)],
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "False")
+
 
 # Run the tests with verbosity=2 for detailed output
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+r"""
+tests/test_dw_access.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_dw_access.py
+    python3 tests\test_dw_access.py
+
+This test suite verifies the pooled warehouse connections in scripts/dw_access.py.
+"""
+
+import unittest
+import os
+import pathlib
+import sqlite3
+import sys
+import tempfile
+import threading
+
+# Write the logs and metrics of the test run to a temporary folder, not the project's logs/
+os.environ.setdefault("SMART_LOG_DIR", str(pathlib.Path(tempfile.gettempdir()).joinpath("smart_test_logs")))
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts import dw_access  # noqa: E402
+
+
+class TestDwAccess(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = pathlib.Path(self.temp_dir.name).joinpath("smart_sales.db")
+        with dw_access.writer(self.db_path) as conn:
+            conn.execute("CREATE TABLE sale (sale_id INTEGER PRIMARY KEY, sale_amount REAL)")
+            conn.execute("INSERT INTO sale VALUES (1, 10.0)")
+
+    def tearDown(self):
+        dw_access.close_pools()
+        self.temp_dir.cleanup()
+
+    def count_sales(self) -> int:
+        with dw_access.reader(self.db_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM sale").fetchone()[0]
+
+    def test_readers_see_the_last_commit_during_a_write(self):
+        with dw_access.writer(self.db_path) as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            conn.execute("INSERT INTO sale VALUES (2, 20.0)")
+            # Another thread reads without waiting for the open write transaction
+            counts = []
+            thread = threading.Thread(target=lambda: counts.append(self.count_sales()))
+            thread.start()
+            thread.join(timeout=5)
+            self.assertEqual(counts, [1])
+        self.assertEqual(self.count_sales(), 2)
+
+    def test_readers_are_read_only(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            with dw_access.reader(self.db_path) as conn:
+                conn.execute("DELETE FROM sale")
+
+    def test_failed_write_rolls_back(self):
+        with self.assertRaises(ValueError):
+            with dw_access.writer(self.db_path) as conn:
+                conn.execute("INSERT INTO sale VALUES (3, 30.0)")
+                raise ValueError("load failed")
+        self.assertEqual(self.count_sales(), 1)
+
+    def test_pool_reuses_at_most_its_size_in_connections(self):
+        pool = dw_access.get_pool(self.db_path, read_only=True)
+        borrowed = [pool.acquire() for _ in range(pool.size)]
+        self.assertEqual(len(set(map(id, borrowed))), pool.size)
+
+        # With every connection out, the next borrower waits for one to come back
+        waiting = []
+        thread = threading.Thread(target=lambda: waiting.append(pool.acquire()))
+        thread.start()
+        thread.join(timeout=0.2)
+        self.assertEqual(waiting, [])
+        pool.release(borrowed[0])
+        thread.join(timeout=5)
+        self.assertIs(waiting[0], borrowed[0])
+        self.assertEqual(len(pool.opened), pool.size)
+
+
+# Run the tests with verbosity=2 for detailed output
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,114 @@
+r"""
+tests/test_dw_bulk_loader.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_dw_bulk_loader.py
+    python3 tests\test_dw_bulk_loader.py
+
+This test suite verifies that the bulk loader writes the same warehouse as pandas to_sql,
+always rebuilds the indexes it drops, and puts the load PRAGMAs back afterwards.
+"""
+
+import unittest
+import os
+import pathlib
+import shutil
+import sqlite3
+import sys
+import tempfile
+import pandas as pd
+
+# Write the logs and metrics of the test run to a temporary folder, not the project's logs/
+os.environ.setdefault("SMART_LOG_DIR", str(pathlib.Path(tempfile.gettempdir()).joinpath("smart_test_logs")))
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts import etl_to_dw  # noqa: E402
+from scripts.dw_access import close_pools  # noqa: E402
+from scripts.dw_bulk_loader import apply_load_pragmas, bulk_load, deferred_indexes, restore_pragmas  # noqa: E402
+
+SOURCE_PREPARED_DIR = PROJECT_ROOT.joinpath("tests", "fixtures", "prepared")
+
+
+def index_names(conn: sqlite3.Connection) -> list:
+    return sorted(name for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"))
+
+
+class TestDwBulkLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.temp_dir.name)
+
+    def tearDown(self):
+        close_pools()
+        self.temp_dir.cleanup()
+
+    def sales_db(self, name: str, isolation_level: str = "") -> sqlite3.Connection:
+        """Return a connection to a new database with one indexed table."""
+        conn = sqlite3.connect(self.root.joinpath(name), isolation_level=isolation_level)
+        conn.execute("CREATE TABLE sale (sale_id INTEGER PRIMARY KEY, customer_id INTEGER, sale_amount REAL)")
+        conn.execute("CREATE INDEX idx_sale_customer ON sale (customer_id, sale_amount)")
+        conn.commit()
+        return conn
+
+    def test_bulk_load_matches_to_sql(self):
+        prepared_dir = self.root.joinpath("prepared")
+        shutil.copytree(SOURCE_PREPARED_DIR, prepared_dir)
+        bulk_path, to_sql_path = self.root.joinpath("bulk.db"), self.root.joinpath("to_sql.db")
+        etl_to_dw.load_data_to_db(bulk_path, prepared_dir, method="bulk")
+        etl_to_dw.load_data_to_db(to_sql_path, prepared_dir, method="to_sql")
+
+        with sqlite3.connect(bulk_path) as bulk, sqlite3.connect(to_sql_path) as to_sql:
+            tables = [name for (name,) in bulk.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+            self.assertIn("sale", tables)
+            self.assertEqual(index_names(bulk), index_names(to_sql))
+            for table in tables:
+                query = f"SELECT * FROM {table} ORDER BY 1, 2"
+                pd.testing.assert_frame_equal(pd.read_sql_query(query, bulk), pd.read_sql_query(query, to_sql),
+                                              obj=table)
+
+    def test_deferred_indexes_are_rebuilt_when_the_load_raises(self):
+        # Autocommit, so nothing rolls the dropped index back: deferred_indexes must rebuild it
+        conn = self.sales_db("autocommit.db", isolation_level=None)
+        with self.assertRaises(sqlite3.IntegrityError):
+            with deferred_indexes(conn.cursor(), ["sale"]) as dropped:
+                self.assertEqual(dropped, ["idx_sale_customer"])
+                self.assertEqual(index_names(conn), [])
+                conn.executemany("INSERT INTO sale VALUES (?, ?, ?)", [(1, 10, 5.0), (1, 11, 6.0)])
+        self.assertEqual(index_names(conn), ["idx_sale_customer"])
+        conn.close()
+
+        # bulk_load rolls the whole load back and keeps the index
+        conn = self.sales_db("transaction.db")
+        rows = pd.DataFrame({"sale_id": [2, 3, 3], "customer_id": [10, 11, 12], "sale_amount": [1.0, 2.0, 3.0]})
+        with self.assertRaises(sqlite3.IntegrityError):
+            bulk_load(conn, {"sale": rows})
+        self.assertEqual(index_names(conn), ["idx_sale_customer"])
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM sale WHERE sale_id > 1").fetchone()[0], 0)
+        conn.close()
+
+    def test_restore_pragmas_puts_back_the_original_values(self):
+        conn = self.sales_db("pragmas.db")
+        conn.execute("PRAGMA synchronous = FULL")
+        original = {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in ("journal_mode", "synchronous")}
+        self.assertEqual(original, {"journal_mode": "delete", "synchronous": 2})
+
+        previous = apply_load_pragmas(conn)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+        restore_pragmas(conn, previous)
+        for name, value in original.items():
+            self.assertEqual(conn.execute(f"PRAGMA {name}").fetchone()[0], value, name)
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
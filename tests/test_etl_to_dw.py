@@ -0,0 +1,222 @@
+r"""
+tests/test_etl_to_dw.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_etl_to_dw.py
+    python3 tests\test_etl_to_dw.py
+
+This test suite verifies the full and incremental warehouse loads in etl_to_dw.py
+against a temporary SQLite database.
+"""
+
+import unittest
+import os
+import pathlib
+import shutil
+import sqlite3
+import sys
+import tempfile
+from unittest import mock
+import pandas as pd
+
+# Write the logs and metrics of the test run to a temporary folder, not the project's logs/
+os.environ.setdefault("SMART_LOG_DIR", str(pathlib.Path(tempfile.gettempdir()).joinpath("smart_test_logs")))
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts import etl_to_dw  # noqa: E402
+from scripts.dw_access import close_pools  # noqa: E402
+from scripts import check_query_plans  # noqa: E402
+from scripts.check_query_plans import find_full_scans, find_table_lookups  # noqa: E402
+
+SOURCE_PREPARED_DIR = PROJECT_ROOT.joinpath("tests", "fixtures", "prepared")
+
+
+def read_table(db_path: pathlib.Path, table: str, key: str) -> pd.DataFrame:
+    """Read a whole warehouse table ordered by its key."""
+    with sqlite3.connect(db_path) as conn:
+        return pd.read_sql_query(f"SELECT * FROM {table} ORDER BY {key}", conn)
+
+
+class TestEtlToDw(unittest.TestCase):
+
+    def setUp(self):
+        """Copy the prepared files into a temporary folder next to an empty database."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.temp_dir.name)
+        self.prepared_dir = root.joinpath("prepared")
+        shutil.copytree(SOURCE_PREPARED_DIR, self.prepared_dir)
+        self.db_path = root.joinpath("smart_sales.db")
+
+    def tearDown(self):
+        close_pools()
+        self.temp_dir.cleanup()
+
+    def test_incremental_load_matches_full_load(self):
+        etl_to_dw.load_data_incrementally(self.db_path, self.prepared_dir)
+        incremental = {table: read_table(self.db_path, table, key)
+                       for table, (_, key) in etl_to_dw.WAREHOUSE_TABLES.items()}
+
+        full_db_path = self.db_path.with_name("full.db")
+        etl_to_dw.load_data_to_db(full_db_path, self.prepared_dir)
+        for table, (_, key) in etl_to_dw.WAREHOUSE_TABLES.items():
+            pd.testing.assert_frame_equal(incremental[table], read_table(full_db_path, table, key))
+
+    def test_prepared_files_with_raw_column_names_load_the_same(self):
+        etl_to_dw.load_data_to_db(self.db_path, self.prepared_dir)
+
+        # The prep scripts keep the raw header names (CustomerID, SaleDate, ...)
+        raw_names = {column: raw for raw, column in etl_to_dw.PREPARED_COLUMNS.items()}
+        for path in self.prepared_dir.glob("*.csv"):
+            pd.read_csv(path).rename(columns=raw_names).to_csv(path, index=False)
+        raw_db_path = self.db_path.with_name("raw.db")
+        etl_to_dw.load_data_to_db(raw_db_path, self.prepared_dir)
+        for table, (_, key) in etl_to_dw.WAREHOUSE_TABLES.items():
+            pd.testing.assert_frame_equal(read_table(raw_db_path, table, key), read_table(self.db_path, table, key))
+
+    def test_incremental_load_upserts_only_changes(self):
+        etl_to_dw.load_data_incrementally(self.db_path, self.prepared_dir)
+
+        # Change one sale and append a new one
+        sales_path = self.prepared_dir.joinpath("sales_data_prepared.csv")
+        sales_df = pd.read_csv(sales_path)
+        changed_id = int(sales_df.loc[0, "sale_id"])
+        sales_df.loc[0, "sale_amount"] = 12345.0
+        new_row = sales_df.iloc[[1]].copy()
+        new_row["sale_id"] = sales_df["sale_id"].max() + 1
+        sales_df = pd.concat([sales_df, new_row], ignore_index=True)
+        sales_df.to_csv(sales_path, index=False)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            self.assertEqual(etl_to_dw.load_table_incrementally("customer", self.prepared_dir, cursor), 0)
+            self.assertEqual(etl_to_dw.load_table_incrementally("sale", self.prepared_dir, cursor), 2)
+            conn.commit()
+
+        sale = read_table(self.db_path, "sale", "sale_id").set_index("sale_id")
+        self.assertEqual(len(sale), len(sales_df))
+        self.assertEqual(sale.loc[changed_id, "sale_amount"], 12345.0)
+
+        # A second run with no changes writes nothing
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            self.assertEqual(etl_to_dw.load_table_incrementally("sale", self.prepared_dir, cursor), 0)
+
+    def test_rows_removed_from_prepared_files_are_deleted(self):
+        etl_to_dw.load_data_incrementally(self.db_path, self.prepared_dir)
+
+        for table, count in (("sale", 10), ("customer", 1)):
+            prepared_name, key = etl_to_dw.WAREHOUSE_TABLES[table]
+            prepared_path = self.prepared_dir.joinpath(f"{prepared_name}.csv")
+            prepared_df = pd.read_csv(prepared_path)
+            prepared_df.iloc[count:].to_csv(prepared_path, index=False)
+        etl_to_dw.load_data_incrementally(self.db_path, self.prepared_dir)
+
+        full_db_path = self.db_path.with_name("full.db")
+        etl_to_dw.load_data_to_db(full_db_path, self.prepared_dir)
+        for table, (_, key) in etl_to_dw.WAREHOUSE_TABLES.items():
+            pd.testing.assert_frame_equal(read_table(self.db_path, table, key), read_table(full_db_path, table, key))
+        with sqlite3.connect(self.db_path) as conn:
+            hashed = dict(conn.execute("SELECT table_name, COUNT(*) FROM etl_row_hash GROUP BY table_name"))
+        self.assertEqual(hashed, {table: len(read_table(full_db_path, table, key))
+                                  for table, (_, key) in etl_to_dw.WAREHOUSE_TABLES.items()})
+
+    def test_known_queries_avoid_full_table_scans(self):
+        etl_to_dw.load_data_to_db(self.db_path, self.prepared_dir)
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(find_full_scans(conn), {})
+            self.assertEqual(find_table_lookups(conn), {})
+
+            # A narrower date index still avoids the scan but reads every matching sale row
+            conn.execute("DROP INDEX idx_sale_date")
+            conn.execute("CREATE INDEX idx_sale_date ON sale (date_key)")
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertNotIn("sales_by_date_range", find_full_scans(conn))
+            self.assertIn("sales_by_date_range", find_table_lookups(conn))
+
+            # Without the managed indexes the cube ingest query scans the sale table
+            for name in etl_to_dw.WAREHOUSE_INDEXES:
+                conn.execute(f"DROP INDEX {name}")
+
+        # Use a new connection so no cached statement plans are reused
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertIn("olap_cube_ingest", find_full_scans(conn))
+
+    def prepared_sales(self) -> pd.DataFrame:
+        return pd.read_csv(self.prepared_dir.joinpath("sales_data_prepared.csv")).sort_values("sale_id")
+
+    def test_sales_join_the_date_dimension(self):
+        etl_to_dw.load_data_to_db(self.db_path, self.prepared_dir)
+        with sqlite3.connect(self.db_path) as conn:
+            joined = pd.read_sql_query("""
+                SELECT d.full_date, d.year, d.quarter, d.month, d.day_of_week
+                FROM sale s JOIN date_dim d ON s.date_key = d.date_key
+                ORDER BY s.sale_id
+            """, conn)
+            days, first_key, last_key = conn.execute(
+                "SELECT COUNT(*), MIN(date_key), MAX(date_key) FROM date_dim").fetchone()
+
+        expected = pd.to_datetime(self.prepared_sales()["sale_date"], format="%m/%d/%Y")
+        self.assertEqual(len(joined), len(expected), "Every sale needs a calendar row")
+        self.assertEqual(joined["full_date"].tolist(), expected.dt.strftime("%Y-%m-%d").tolist())
+        self.assertEqual(joined["year"].tolist(), expected.dt.year.tolist())
+        self.assertEqual(joined["quarter"].tolist(), expected.dt.quarter.tolist())
+        self.assertEqual(joined["month"].tolist(), expected.dt.month.tolist())
+        self.assertEqual(joined["day_of_week"].tolist(), expected.dt.day_name().tolist())
+        span = pd.to_datetime(str(last_key)) - pd.to_datetime(str(first_key))
+        self.assertEqual(days, span.days + 1, "The calendar has a gap")
+
+    def test_sales_store_integer_keys_that_decode_to_the_labels(self):
+        etl_to_dw.load_data_to_db(self.db_path, self.prepared_dir)
+        with sqlite3.connect(self.db_path) as conn:
+            column_types = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(sale)")}
+            decoded = pd.read_sql_query("""
+                SELECT st.store_id, ca.campaign_id, pt.payment_type_name AS payment_type, r.region_name AS region
+                FROM sale s
+                JOIN store_dim st ON s.store_key = st.store_key
+                JOIN campaign_dim ca ON s.campaign_key = ca.campaign_key
+                JOIN payment_type_dim pt ON s.payment_type_key = pt.payment_type_key
+                JOIN customer c ON s.customer_id = c.customer_id
+                JOIN region_dim r ON c.region_key = r.region_key
+                ORDER BY s.sale_id
+            """, conn)
+
+        self.assertEqual(set(column_types.values()) - {"INTEGER"}, {"REAL"}, "Only keys and measures")
+        customers = pd.read_csv(self.prepared_dir.joinpath("customers_data_prepared.csv"))
+        expected = self.prepared_sales().merge(customers[["customer_id", "region"]], on="customer_id")
+        for column in decoded.columns:
+            self.assertEqual(decoded[column].tolist(), expected[column].tolist(), column)
+
+    def test_old_warehouse_is_migrated_to_dimension_keys(self):
+        full_db_path = self.db_path.with_name("full.db")
+        etl_to_dw.load_data_to_db(full_db_path, self.prepared_dir)
+
+        # A version 0 warehouse: labels and sale_date in the rows, no date_key and no dimension tables
+        with sqlite3.connect(self.db_path) as conn:
+            for table, (table_name, _) in etl_to_dw.WAREHOUSE_TABLES.items():
+                pd.read_csv(self.prepared_dir.joinpath(f"{table_name}.csv")).to_sql(table, conn, index=False)
+
+        # The query plan checker asks for the migration instead of failing on the missing tables
+        with mock.patch.object(sys, "argv", ["check_query_plans.py", "--db", str(self.db_path)]), \
+                mock.patch("builtins.print") as printed:
+            self.assertEqual(check_query_plans.main(), 2)
+        self.assertIn("etl_to_dw.py", " ".join(str(call.args[0]) for call in printed.call_args_list))
+
+        with sqlite3.connect(self.db_path) as conn:
+            etl_to_dw.create_schema(conn.cursor())
+            conn.commit()
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], etl_to_dw.SCHEMA_VERSION)
+        for table in ["customer", "sale", "date_dim", "region_dim", "store_dim", "campaign_dim", "payment_type_dim"]:
+            key = read_table(full_db_path, table, "1").columns[0]
+            pd.testing.assert_frame_equal(read_table(self.db_path, table, key), read_table(full_db_path, table, key),
+                                          check_dtype=False, obj=table)
+
+
+# Run the tests with verbosity=2 for detailed output
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,85 @@
+r"""
+tests/test_generate_raw_data.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_generate_raw_data.py
+    python3 tests\test_generate_raw_data.py
+
+This test suite verifies that the synthetic raw files match the real raw files' columns,
+are reproducible from their seed, and carry the duplicates, nulls and outliers the prep
+scripts clean up.
+"""
+
+import unittest
+import os
+import pathlib
+import sys
+import tempfile
+import pandas as pd
+
+# Write the logs and metrics of the test run to a temporary folder, not the project's logs/
+os.environ.setdefault("SMART_LOG_DIR", str(pathlib.Path(tempfile.gettempdir()).joinpath("smart_test_logs")))
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from benchmarks.generate_raw_data import generate_raw_data  # noqa: E402
+
+RAW_DATA_DIR = PROJECT_ROOT.joinpath("data", "raw")
+FILE_NAMES = ["customers_data.csv", "products_data.csv", "sales_data.csv"]
+
+
+class TestGenerateRawData(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def generate(self, folder, seed=42):
+        counts = generate_raw_data(self.root.joinpath(folder), 20_000, seed=seed, batch_rows=6_000)
+        return counts, {name: pd.read_csv(self.root.joinpath(folder, name)) for name in FILE_NAMES}
+
+    def test_files_have_the_raw_columns_and_are_reproducible(self):
+        counts, tables = self.generate("a")
+        for name in FILE_NAMES:
+            raw_columns = pd.read_csv(RAW_DATA_DIR.joinpath(name), nrows=0).columns.tolist()
+            self.assertEqual(tables[name].columns.tolist(), raw_columns, name)
+            self.assertEqual(len(tables[name]), counts[name])
+        self.assertGreater(counts["sales_data.csv"], 20_000)
+
+        self.generate("b")
+        self.generate("c", seed=7)
+        for name in FILE_NAMES:
+            self.assertEqual(self.root.joinpath("a", name).read_bytes(), self.root.joinpath("b", name).read_bytes(),
+                             f"{name} differs for the same seed")
+        self.assertNotEqual(self.root.joinpath("a", "sales_data.csv").read_bytes(),
+                            self.root.joinpath("c", "sales_data.csv").read_bytes())
+
+    def test_files_have_duplicates_nulls_outliers_and_skew(self):
+        _, tables = self.generate("a")
+        customers, products, sales = (tables[name] for name in FILE_NAMES)
+
+        self.assertGreater(sales["TransactionID"].duplicated().sum(), 0)
+        self.assertGreater(customers["CustomerID"].duplicated().sum(), 0)
+        self.assertGreater(sales["DiscountPercent"].isna().sum(), 0)
+        self.assertGreater(customers["LastActiveYear"].isna().sum(), 0)
+        self.assertGreater((~sales["DiscountPercent"].dropna().between(0, 50)).sum(), 0)
+        self.assertGreater((~customers["LastActiveYear"].dropna().between(2020, 2025)).sum(), 0)
+        self.assertGreater((sales["PaymentType"] != sales["PaymentType"].str.strip().str.title()).sum(), 0)
+
+        # Every sale refers to a generated customer and product, and a few products sell most
+        self.assertTrue(sales["CustomerID"].isin(customers["CustomerID"]).all())
+        self.assertTrue(sales["ProductID"].isin(products["ProductID"]).all())
+        top_share = sales["ProductID"].value_counts(normalize=True).iloc[:3].sum()
+        self.assertGreater(top_share, 3 / products["ProductID"].nunique() * 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,86 @@
+r"""
+tests/test_logger.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_logger.py
+    python3 tests\test_logger.py
+
+This test suite verifies that sampled per-chunk messages are written 1 in N (all of them
+when DEBUG logging is on), that skipped messages are never formatted, and that metrics
+records stay out of the text logs.
+"""
+
+import unittest
+import os
+import pathlib
+import sys
+import tempfile
+from unittest import mock
+
+# Write the logs and metrics of the test run to a temporary folder, not the project's logs/
+os.environ.setdefault("SMART_LOG_DIR", str(pathlib.Path(tempfile.gettempdir()).joinpath("smart_test_logs")))
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils import logger as logger_module  # noqa: E402
+from utils.logger import METRICS_LEVEL, logger, sampled  # noqa: E402
+
+
+def clean_chunk(number: int, evaluated: list) -> None:
+    log = sampled()
+    log.info("Cleaned chunk {}", number)
+    log.opt(lazy=True).info("Missing values in chunk {}: {}", lambda: number, lambda: evaluated.append(number))
+
+
+class TestLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = []
+        self.handler = logger.add(self.lines.append, level="INFO", format="{message}",
+                                  filter=logger_module._not_metrics)
+        patcher = mock.patch.object(logger_module, "_sample_counts", logger_module.Counter())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        logger.remove(self.handler)
+
+    def messages(self):
+        return [line.strip() for line in self.lines]
+
+    def test_sampled_messages_are_written_one_in_n(self):
+        evaluated = []
+        with mock.patch.object(logger_module, "LOG_SAMPLE_EVERY", 4), \
+                mock.patch.object(logger_module, "_LOWEST_LEVEL_NO", logger.level("INFO").no):
+            for number in range(10):
+                clean_chunk(number, evaluated)
+        self.assertEqual([line for line in self.messages() if line.startswith("Cleaned")],
+                         ["Cleaned chunk 0", "Cleaned chunk 4", "Cleaned chunk 8"])
+        # Lazy arguments of skipped calls are never evaluated
+        self.assertEqual(evaluated, [0, 4, 8])
+
+        # Keys are counted separately
+        with mock.patch.object(logger_module, "_LOWEST_LEVEL_NO", logger.level("INFO").no):
+            self.assertIs(sampled("other", every=4), logger)
+            self.assertIsNot(sampled("other", every=4), logger)
+
+    def test_every_message_is_written_when_debug_logging_is_on(self):
+        with mock.patch.object(logger_module, "LOG_SAMPLE_EVERY", 4), \
+                mock.patch.object(logger_module, "_LOWEST_LEVEL_NO", logger.level("DEBUG").no):
+            for number in range(5):
+                clean_chunk(number, [])
+        self.assertEqual(len([line for line in self.messages() if line.startswith("Cleaned")]), 5)
+
+    def test_metrics_records_stay_out_of_the_text_logs(self):
+        logger.log(METRICS_LEVEL, '{"stage": "x"}')
+        logger.info("plain message")
+        self.assertEqual(self.messages(), ["plain message"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
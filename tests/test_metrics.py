@@ -0,0 +1,113 @@
+r"""
+tests/test_metrics.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_metrics.py
+    python3 tests\test_metrics.py
+
+This test suite verifies the stage metrics records, memory tracing of nested stages
+and the per-run summary.
+"""
+
+import unittest
+import json
+import os
+import pathlib
+import sys
+import tempfile
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+# Write the logs and metrics of the test run to a temporary folder, not the project's logs/
+os.environ.setdefault("SMART_LOG_DIR", str(pathlib.Path(tempfile.gettempdir()).joinpath("smart_test_logs")))
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils import metrics  # noqa: E402
+from utils.logger import METRICS_LEVEL, logger  # noqa: E402
+
+
+@metrics.instrument()
+def keep_first_rows(df: pd.DataFrame, rows: int) -> pd.DataFrame:
+    return df.head(rows)
+
+
+@metrics.instrument("allocate")
+def allocate(megabytes: int) -> int:
+    return int(np.ones(megabytes * metrics.MB // 8).sum())
+
+
+@metrics.instrument("load")
+def load(rows: int) -> None:
+    metrics.record_rows(rows_in=rows)
+    allocate(16)
+    metrics.record_rows(rows_out=rows - 1)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = []
+        self.handler = logger.add(self.lines.append, level=METRICS_LEVEL, format="{message}",
+                                  filter=lambda record: record["level"].name == METRICS_LEVEL)
+
+    def tearDown(self):
+        logger.remove(self.handler)
+
+    def records(self):
+        return [json.loads(line) for line in self.lines]
+
+    def test_decorated_call_records_times_and_rows(self):
+        keep_first_rows(pd.DataFrame({"a": range(10)}), 3)
+        [record] = self.records()
+        self.assertEqual(record["stage"], "test_metrics.keep_first_rows")
+        self.assertEqual(record["run_id"], metrics.RUN_ID)
+        self.assertEqual((record["status"], record["rows_in"], record["rows_out"]), ("ok", 10, 3))
+        self.assertGreaterEqual(record["wall_s"], 0)
+        self.assertGreaterEqual(record["cpu_s"], 0)
+        if metrics.resource is not None:
+            self.assertGreater(record["peak_rss_mb"], 0)
+
+    def test_failed_stage_is_recorded_and_reraised(self):
+        with self.assertRaises(KeyError):
+            with metrics.stage_metrics("failing", rows_in=5):
+                raise KeyError("missing")
+        [record] = self.records()
+        self.assertEqual((record["stage"], record["status"], record["error"]), ("failing", "error", "KeyError"))
+
+    def test_nested_stages_trace_their_own_and_inner_peaks(self):
+        with mock.patch.object(metrics, "PROFILE_MODE", "tracemalloc"):
+            load(100)
+        inner, outer = self.records()
+        self.assertEqual((inner["stage"], outer["stage"]), ("allocate", "load"))
+        self.assertGreaterEqual(inner["traced_peak_mb"], 16)
+        self.assertGreaterEqual(outer["traced_peak_mb"], inner["traced_peak_mb"])
+        self.assertEqual((outer["rows_in"], outer["rows_out"]), (100, 99))
+        self.assertIsNone(inner["rows_in"])
+
+    def test_summary_totals_the_stages_of_one_run(self):
+        with mock.patch.object(metrics, "RUN_ID", "other-run"):
+            keep_first_rows(pd.DataFrame({"a": range(4)}), 1)
+        for rows in (5, 7):
+            keep_first_rows(pd.DataFrame({"a": range(rows)}), 2)
+        allocate(1)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            metrics_file = pathlib.Path(temp_dir).joinpath("metrics.jsonl")
+            metrics_file.write_text("".join(self.lines))
+            summary = metrics.summarize_run(metrics.read_metrics(metrics_file))
+
+        self.assertEqual(set(summary.index), {"test_metrics.keep_first_rows", "allocate"})
+        row = summary.loc["test_metrics.keep_first_rows"]
+        self.assertEqual((row["calls"], row["rows_in"], row["rows_out"]), (2, 12, 4))
+        self.assertTrue(pd.isna(summary.loc["allocate", "rows_in"]))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,342 @@
+r"""
+tests/test_olap_cubing.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_olap_cubing.py
+    python3 tests\test_olap_cubing.py
+
+This test suite verifies the OLAP cube builders in scripts/olap against a temporary
+copy of the data warehouse.
+"""
+
+import unittest
+import os
+import pathlib
+import shutil
+import sqlite3
+import sys
+import tempfile
+from unittest import mock
+import pandas as pd
+
+# Write the logs and metrics of the test run to a temporary folder, not the project's logs/
+os.environ.setdefault("SMART_LOG_DIR", str(pathlib.Path(tempfile.gettempdir()).joinpath("smart_test_logs")))
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts import etl_to_dw  # noqa: E402
+from scripts.dw_access import close_pools  # noqa: E402
+from scripts.olap import cube_store, olap_cubing  # noqa: E402
+from scripts.olap.cube_store import lookup_stored_cell_sales  # noqa: E402
+from scripts.olap.sql_cube import build_cube_query, create_sql_cube  # noqa: E402
+from scripts.olap.grouping_sets import grouping_id, resolve_grouping_sets, select_grouping_set  # noqa: E402
+from scripts.olap.top_k import top_k_per_group  # noqa: E402
+from utils.storage import find_table, read_table  # noqa: E402
+
+SOURCE_PREPARED_DIR = PROJECT_ROOT.joinpath("tests", "fixtures", "prepared")
+
+
+class TestOlapCubing(unittest.TestCase):
+
+    def setUp(self):
+        """Load the prepared files into a temporary warehouse."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.temp_dir.name)
+        self.prepared_dir = root.joinpath("prepared")
+        shutil.copytree(SOURCE_PREPARED_DIR, self.prepared_dir)
+        self.db_path = root.joinpath("smart_sales.db")
+        self.output_dir = root.joinpath("olap_cubing_outputs")
+        self.output_dir.mkdir()
+        etl_to_dw.load_data_to_db(self.db_path, self.prepared_dir)
+
+        self.patches = [
+            mock.patch.object(olap_cubing, "DB_PATH", self.db_path),
+            mock.patch.object(olap_cubing, "OLAP_OUTPUT_DIR", self.output_dir),
+            mock.patch.object(olap_cubing, "CACHE_DIR", root.joinpath("cache")),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        close_pools()
+        for patch in self.patches:
+            patch.stop()
+        self.temp_dir.cleanup()
+
+    def decode(self, cube: pd.DataFrame) -> pd.DataFrame:
+        """Replace the cube's key columns with their labels, as main() does."""
+        with sqlite3.connect(self.db_path) as conn:
+            return olap_cubing.decode_dimensions(cube, conn)
+
+    def pandas_cube(self) -> pd.DataFrame:
+        """Build the cube from scratch with the in-memory pandas path."""
+        sales_df = olap_cubing.add_time_dimensions(olap_cubing.ingest_sales_data_from_dw())
+        cube = olap_cubing.create_olap_cube(sales_df, olap_cubing.CUBE_DIMENSIONS, olap_cubing.CUBE_METRICS)
+        return self.decode(cube.drop(columns=["cell_id"]))
+
+    def written_cube(self) -> pd.DataFrame:
+        cube = pd.read_csv(self.output_dir.joinpath("multidimensional_olap_cube.csv"))
+        return cube.drop(columns=["cell_id"])
+
+    def assert_cubes_equal(self, actual: pd.DataFrame, expected: pd.DataFrame):
+        pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True),
+                                      check_dtype=False, check_categorical=False)
+
+    def test_full_build_matches_pandas_cube(self):
+        olap_cubing.main(full=True)
+        written = self.written_cube()
+        self.assert_cubes_equal(written, self.pandas_cube())
+
+        # The cube groups on keys but is written with the labels
+        customers = pd.read_csv(self.prepared_dir.joinpath("customers_data_prepared.csv"))
+        products = pd.read_csv(self.prepared_dir.joinpath("products_data_prepared.csv"))
+        self.assertLessEqual(set(written["region"]), set(customers["region"]))
+        self.assertLessEqual(set(written["product_name"]), set(products["product_name"]))
+
+    def test_incremental_refresh_folds_in_only_new_sales(self):
+        olap_cubing.main()
+
+        # Append new sales, some into existing cells and some into new ones
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                INSERT INTO sale (sale_id, customer_id, product_id, sale_amount, date_key)
+                SELECT sale_id + 100000, customer_id, product_id, sale_amount * 2, date_key
+                FROM sale WHERE sale_id % 3 = 0
+            """)
+            # A day with no calendar row yet
+            conn.execute("""
+                INSERT INTO sale (sale_id, customer_id, product_id, sale_amount, date_key)
+                VALUES (999999, 1001, 101, 10.0, 20251224)
+            """)
+            new_sales = conn.execute("SELECT COUNT(*) FROM sale WHERE sale_id > 100000").fetchone()[0]
+
+        with sqlite3.connect(self.db_path) as conn:
+            folded = olap_cubing.refresh_cube_store(
+                conn, olap_cubing.CUBE_DIMENSIONS, olap_cubing.CUBE_METRICS,
+                olap_cubing.SALES_DELTA_QUERY, olap_cubing.add_time_dimensions)
+        self.assertEqual(folded, new_sales)
+
+        olap_cubing.main()
+        self.assert_cubes_equal(self.written_cube(), self.pandas_cube())
+
+    def test_full_reload_forces_rebuild(self):
+        olap_cubing.main()
+
+        # Correct historical sales and reload the warehouse
+        sales_path = self.prepared_dir.joinpath("sales_data_prepared.csv")
+        sales_df = pd.read_csv(sales_path)
+        sales_df["sale_amount"] = sales_df["sale_amount"] + 1
+        sales_df.to_csv(sales_path, index=False)
+        etl_to_dw.load_data_to_db(self.db_path, self.prepared_dir)
+        olap_cubing.main()
+        self.assert_cubes_equal(self.written_cube(), self.pandas_cube())
+
+    def incremental_and_full_cubes(self, change) -> tuple:
+        """Refresh the stored cube after an incremental load that applies change, then rebuild it fully."""
+        db_path = self.db_path.with_name("incremental.db")
+        with mock.patch.object(olap_cubing, "DB_PATH", db_path):
+            etl_to_dw.load_data_incrementally(db_path, self.prepared_dir)
+            olap_cubing.main()
+            change()
+            etl_to_dw.load_data_incrementally(db_path, self.prepared_dir)
+            olap_cubing.main()
+            incremental = self.written_cube()
+            olap_cubing.main(full=True)
+        return incremental, self.written_cube()
+
+    def test_changed_customer_region_rebuilds_stored_cube(self):
+        def move_customer():
+            customers_path = self.prepared_dir.joinpath("customers_data_prepared.csv")
+            customers_df = pd.read_csv(customers_path)
+            customers_df.loc[0, "region"] = "North" if customers_df.loc[0, "region"] != "North" else "South"
+            customers_df.to_csv(customers_path, index=False)
+
+        incremental, full = self.incremental_and_full_cubes(move_customer)
+        self.assert_cubes_equal(incremental, full)
+
+    def test_sale_below_watermark_rebuilds_stored_cube(self):
+        def insert_old_sale():
+            sales_path = self.prepared_dir.joinpath("sales_data_prepared.csv")
+            sales_df = pd.read_csv(sales_path)
+            old_sale = sales_df.iloc[[0]].copy()
+            old_sale["sale_id"] = sales_df["sale_id"].min() - 1
+            pd.concat([sales_df, old_sale], ignore_index=True).to_csv(sales_path, index=False)
+
+        incremental, full = self.incremental_and_full_cubes(insert_old_sale)
+        self.assertEqual(incremental["sale_id_count"].sum(), full["sale_id_count"].sum())
+        self.assert_cubes_equal(incremental, full)
+
+    def test_deleted_sales_and_customer_rebuild_stored_cube(self):
+        def delete_rows():
+            for name, count in (("sales_data_prepared.csv", 10), ("customers_data_prepared.csv", 1)):
+                prepared_path = self.prepared_dir.joinpath(name)
+                pd.read_csv(prepared_path).iloc[count:].to_csv(prepared_path, index=False)
+
+        incremental, full = self.incremental_and_full_cubes(delete_rows)
+        self.assertEqual(incremental["sale_id_count"].sum(), full["sale_id_count"].sum())
+        self.assert_cubes_equal(incremental, full)
+
+    def test_unchanged_warehouse_reuses_cached_cubes(self):
+        olap_cubing.main()
+        first = self.written_cube()
+        self.output_dir.joinpath("multidimensional_olap_cube.csv").unlink()
+        with mock.patch.object(olap_cubing, "refresh_cube_store") as refresh:
+            olap_cubing.main()
+        refresh.assert_not_called()
+        self.assert_cubes_equal(self.written_cube(), first)
+
+    def test_chunked_ingest_matches_pandas_cube(self):
+        sales_df = olap_cubing.add_time_dimensions(olap_cubing.ingest_sales_data_from_dw())
+        expected = olap_cubing.create_olap_cube(sales_df, olap_cubing.CUBE_DIMENSIONS, olap_cubing.CUBE_METRICS)
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual([len(chunk) for chunk in olap_cubing.iter_sales_data_from_dw(conn, 40)], [40, 40, 14])
+            for chunk_rows in (7, 1000):
+                chunked = olap_cubing.create_olap_cube_chunked(
+                    conn, olap_cubing.CUBE_DIMENSIONS, olap_cubing.CUBE_METRICS, chunk_rows)
+                self.assert_cubes_equal(chunked, expected)
+
+        # The stored cube folds in its delta batch by batch too
+        olap_cubing.main(full=True, chunk_rows=10)
+        self.assert_cubes_equal(self.written_cube(), self.pandas_cube())
+
+    def test_sale_index_matches_group_members(self):
+        sales_df = olap_cubing.add_time_dimensions(olap_cubing.ingest_sales_data_from_dw())
+        dimensions = olap_cubing.CUBE_DIMENSIONS
+        cube = olap_cubing.create_olap_cube(sales_df, dimensions, olap_cubing.CUBE_METRICS)
+        sale_index = olap_cubing.build_sale_index(sales_df, dimensions)
+
+        olap_cubing.write_sale_index(sale_index, "sale_index.npz")
+        sale_index = olap_cubing.load_sale_index(self.output_dir.joinpath("sale_index.npz"))
+
+        self.assertEqual(len(sale_index["offsets"]), len(cube) + 1)
+        for _, cell in cube.iterrows():
+            members = sales_df
+            for dimension in dimensions:
+                members = members[members[dimension] == cell[dimension]]
+            expected = sorted(members["sale_id"].tolist())
+            self.assertEqual(olap_cubing.lookup_cell_sales(sale_index, cell["cell_id"]).tolist(), expected)
+            self.assertEqual(cell["sale_id_count"], len(expected))
+
+    def test_stored_cube_bridge_traces_sales(self):
+        olap_cubing.main()
+        cube = pd.read_csv(self.output_dir.joinpath("multidimensional_olap_cube.csv"))
+        traced = []
+        with sqlite3.connect(self.db_path) as conn:
+            for _, cell in cube.iterrows():
+                sale_ids = lookup_stored_cell_sales(conn, int(cell["cell_id"]))
+                self.assertEqual(len(sale_ids), cell["sale_id_count"])
+                traced.extend(sale_ids)
+            all_sales = [sale_id for (sale_id,) in conn.execute("SELECT sale_id FROM sale")]
+        self.assertEqual(sorted(traced), sorted(all_sales))
+
+    def test_grouping_sets_match_groupby_per_level(self):
+        sales_df = olap_cubing.add_time_dimensions(olap_cubing.ingest_sales_data_from_dw())
+        dimensions = olap_cubing.CUBE_DIMENSIONS
+        cube = olap_cubing.create_olap_cube(sales_df, dimensions, olap_cubing.CUBE_METRICS, grouping_sets="cube")
+
+        grouping_sets = resolve_grouping_sets(dimensions, "cube")
+        self.assertEqual(len(grouping_sets), 2 ** len(dimensions))
+        self.assertEqual(sorted(cube["grouping_id"].unique()), list(range(2 ** len(dimensions))))
+        for grouping_set in grouping_sets:
+            level = select_grouping_set(cube, dimensions, grouping_set)
+            if grouping_set:
+                expected = olap_cubing.create_olap_cube(sales_df, grouping_set, olap_cubing.CUBE_METRICS)
+                expected = expected.drop(columns=["cell_id"])
+            else:
+                in_cube = sales_df.dropna(subset=dimensions)
+                expected = pd.DataFrame({"sale_amount_sum": [in_cube["sale_amount"].sum()],
+                                         "sale_amount_mean": [in_cube["sale_amount"].mean()],
+                                         "sale_id_count": [len(in_cube)]})
+            self.assert_cubes_equal(level, expected)
+
+        self.assertEqual(grouping_id(dimensions, ["Year", "Month", "region_key"]), 1)
+        self.assertEqual(resolve_grouping_sets(dimensions, "rollup")[-2], ["Year"])
+        with self.assertRaises(KeyError):
+            select_grouping_set(cube.iloc[:0], dimensions, [])
+
+    def test_main_writes_grouping_sets_from_stored_cube(self):
+        olap_cubing.main()
+        written = read_table(find_table(self.output_dir, "multidimensional_olap_cube_grouping_sets"))
+        sales_df = olap_cubing.add_time_dimensions(olap_cubing.ingest_sales_data_from_dw())
+        expected = olap_cubing.create_olap_cube(sales_df, olap_cubing.CUBE_DIMENSIONS, olap_cubing.CUBE_METRICS,
+                                                grouping_sets=olap_cubing.CUBE_GROUPING_SETS)
+        self.assert_cubes_equal(written, self.decode(expected))
+
+    def test_parallel_cube_matches_serial_cube(self):
+        sales_df = olap_cubing.add_time_dimensions(olap_cubing.ingest_sales_data_from_dw())
+        dimensions = olap_cubing.CUBE_DIMENSIONS
+        serial = olap_cubing.create_olap_cube(sales_df, dimensions, olap_cubing.CUBE_METRICS)
+        for partition_by in ("product_id", "Year"):
+            parallel = olap_cubing.create_olap_cube(sales_df, dimensions, olap_cubing.CUBE_METRICS,
+                                                    workers=3, partition_by=partition_by)
+            pd.testing.assert_frame_equal(parallel, serial, check_exact=True)
+
+        with self.assertRaises(ValueError):
+            olap_cubing.create_olap_cube(sales_df, dimensions, olap_cubing.CUBE_METRICS, workers=2,
+                                         partition_by="customer_id")
+
+        # A parallel refresh starts one process pool for all of its batches
+        with mock.patch.object(cube_store, "ProcessPoolExecutor", wraps=cube_store.ProcessPoolExecutor) as pool:
+            olap_cubing.main(full=True, workers=2, chunk_rows=20)
+        pool.assert_called_once_with(max_workers=2)
+        self.assert_cubes_equal(self.written_cube(), self.pandas_cube())
+
+    def test_sql_cube_matches_pandas_cube(self):
+        # Include a sale on a day without a calendar row, so the date parts come from date_key
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                INSERT INTO sale (sale_id, customer_id, product_id, sale_amount, date_key)
+                VALUES (999999, 1001, 101, 10.0, 20251224)
+            """)
+        sales_df = olap_cubing.add_time_dimensions(olap_cubing.ingest_sales_data_from_dw())
+        dimensions = olap_cubing.CUBE_DIMENSIONS + ["DayOfWeek"]
+        metrics = {"sale_amount": ["sum", "mean", "min", "max"], "sale_id": "count"}
+        with sqlite3.connect(self.db_path) as conn:
+            for grouping_sets in (None, "rollup"):
+                expected = olap_cubing.create_olap_cube(sales_df, dimensions, metrics, grouping_sets=grouping_sets)
+                self.assert_cubes_equal(create_sql_cube(conn, dimensions, metrics, grouping_sets), expected)
+
+            # Labels can be grouped on directly as well
+            labelled = create_sql_cube(conn, ["region", "product_name"], {"sale_amount": "sum"})
+        expected = self.decode(olap_cubing.create_olap_cube(sales_df, ["region_key", "product_id"],
+                                                            {"sale_amount": "sum"}))
+        self.assert_cubes_equal(labelled.sort_values(["region", "product_name"]).drop(columns=["cell_id"]),
+                                expected.sort_values(["region", "product_name"]).drop(columns=["cell_id"]))
+        with self.assertRaises(ValueError):
+            build_cube_query(["customer_id"], {"sale_amount": "sum"})
+
+        olap_cubing.main(engine="sql")
+        self.assert_cubes_equal(self.written_cube(), self.pandas_cube())
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertIsNone(conn.execute("SELECT name FROM sqlite_master WHERE name = 'olap_cube'").fetchone())
+
+    def test_top_k_per_group_matches_sort_and_head(self):
+        sales_df = olap_cubing.add_time_dimensions(olap_cubing.ingest_sales_data_from_dw())
+        cube = olap_cubing.create_olap_cube(sales_df, olap_cubing.CUBE_DIMENSIONS, olap_cubing.CUBE_METRICS)
+        keys = ["Year", "Month", "region_key"]
+        for k in (1, 2, 3, 50):
+            expected = (cube.sort_values(keys + ["sale_id_count"], ascending=[True, True, True, False], kind="stable")
+                        .groupby(keys).head(k).reset_index(drop=True))
+            pd.testing.assert_frame_equal(top_k_per_group(cube, keys, "sale_id_count", k), expected)
+
+        cells = pd.DataFrame({"region": ["East", "East", "East", "East", "West", None],
+                              "sale_id_count": [5, 7, 5, 1, None, 9]})
+        self.assertEqual(top_k_per_group(cells, ["region"], "sale_id_count", 2)["sale_id_count"].tolist(), [7, 5])
+        tied = top_k_per_group(cells, ["region"], "sale_id_count", 2, ties="all")
+        self.assertEqual(tied["sale_id_count"].tolist(), [7, 5, 5])
+        last = top_k_per_group(cells.reset_index(), ["region"], "sale_id_count", 2, ties="last")
+        self.assertEqual(last["index"].tolist(), [1, 2])
+        lowest = top_k_per_group(cells, ["region"], "sale_id_count", 1, largest=False)
+        self.assertEqual(lowest["sale_id_count"].tolist(), [1])
+        with self.assertRaises(ValueError):
+            top_k_per_group(cells, ["region"], "sale_id_count", 2, ties="random")
+
+
+# Run the tests with verbosity=2 for detailed output
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,195 @@
+r"""
+tests/test_prepare_streaming.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_prepare_streaming.py
+    python3 tests\test_prepare_streaming.py
+
+This test suite verifies that the chunked streaming mode of the data preparation
+scripts writes exactly the same prepared files as the in-memory mode.
+"""
+
+import itertools
+import unittest
+import os
+import pathlib
+import sys
+import tempfile
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+# Write the logs and metrics of the test run to a temporary folder, not the project's logs/
+os.environ.setdefault("SMART_LOG_DIR", str(pathlib.Path(tempfile.gettempdir()).joinpath("smart_test_logs")))
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.data_preparation import prepare_customers_data  # noqa: E402
+from scripts.data_preparation import prepare_products_data  # noqa: E402
+from scripts.data_preparation import prepare_sales_data  # noqa: E402
+from scripts.data_preparation.streaming import SeenKeys, StreamingMedian  # noqa: E402
+from utils.storage import PARQUET_AVAILABLE, find_table, read_table, write_table, write_table_chunks  # noqa: E402
+
+FORMATS = ["csv", "parquet"] if PARQUET_AVAILABLE else ["csv"]
+
+
+CUSTOMERS_CSV = """CustomerID,Name,Region,JoinDate,LastActiveYear,PreferredContactMethod
+1001,William White,East,11/11/2021,2022,Phone
+1002,Wylie Coyote,East,2/14/2023,,Email
+1003,Dan Brown,West,10/19/2023,2023,
+1001,William White,East,11/11/2021,2019,Phone
+1004,Chewbacca,West,11/9/2022,2024,Phone
+1005,Hermione Granger,North,8/13/2021,,Text
+1002,Wylie Coyote,East,2/14/2023,2020,Email
+1006,Tony Stark,South,1/1/2020,2030,Email
+1007,Bruce Wayne,North,3/3/2022,2021,Phone
+"""
+
+PRODUCTS_CSV = """ProductID,ProductName,Category,UnitPrice,StockQuantity,StoreSection
+101,laptop,Electronics,793.12,37,a
+102,hoodie,Clothing,39.1,,b
+103,cable,Electronics,22.76,109,A
+101,laptop,Electronics,793.12,999,A
+104,hat,Clothing,43.1,24,b
+105,football,Sports,19.78,,c
+106,controller,Electronics,55.0,300,A
+"""
+
+SALES_CSV = """TransactionID,SaleDate,CustomerID,ProductID,StoreID,CampaignID,SaleAmount,DiscountPercent,PaymentType
+550,1/6/2024,1008,102,404,0,39.1,5,cash
+551,1/6/2024,1009,105,403,0,19.78,,Credit
+552,1/16/2024,1004,107,404,0,335.1,0,debit
+550,1/6/2024,1008,102,404,0,39.1,5,cash
+553,1/16/2024,1006,102,406,0,195.5,75,Debit
+554,2/1/2024,1001,101,401,1,793.12,10,Credit
+551,1/6/2024,1009,105,403,0,19.78,10,Credit
+"""
+
+
+class TestPrepareStreaming(unittest.TestCase):
+
+    def setUp(self):
+        """Write the raw files to a temporary data folder."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.temp_dir.name)
+        self.raw_dir = root.joinpath("raw")
+        self.prepared_dir = root.joinpath("prepared")
+        self.raw_dir.mkdir()
+        self.prepared_dir.mkdir()
+        self.raw_dir.joinpath("customers_data.csv").write_text(CUSTOMERS_CSV)
+        self.raw_dir.joinpath("products_data.csv").write_text(PRODUCTS_CSV)
+        self.raw_dir.joinpath("sales_data.csv").write_text(SALES_CSV)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_both_modes(self, module, prepared_name: str, chunksize: int, fmt: str):
+        """Run the script in memory and streaming, returning both prepared frames."""
+        prepared_path = self.prepared_dir.joinpath(f"{prepared_name}.{fmt}")
+        with mock.patch.object(module, "RAW_DATA_DIR", self.raw_dir), \
+                mock.patch.object(module, "PREPARED_DATA_DIR", self.prepared_dir):
+            module.main(fmt=fmt)
+            in_memory = read_table(prepared_path)
+            module.main(chunksize=chunksize, fmt=fmt)
+            streamed = read_table(prepared_path)
+        return in_memory, streamed
+
+    def test_customers_streaming_matches_in_memory(self):
+        for fmt, chunksize in itertools.product(FORMATS, (1, 2, 3, 100)):
+            in_memory, streamed = self.run_both_modes(prepare_customers_data, "customers_data_prepared", chunksize, fmt)
+            pd.testing.assert_frame_equal(streamed, in_memory, check_categorical=False)
+
+    def test_products_streaming_matches_in_memory(self):
+        for fmt, chunksize in itertools.product(FORMATS, (1, 2, 4, 100)):
+            in_memory, streamed = self.run_both_modes(prepare_products_data, "products_data_prepared", chunksize, fmt)
+            pd.testing.assert_frame_equal(streamed, in_memory, check_categorical=False)
+
+    def test_sales_streaming_matches_in_memory(self):
+        for fmt, chunksize in itertools.product(FORMATS, (1, 2, 3, 100)):
+            in_memory, streamed = self.run_both_modes(prepare_sales_data, "sales_data_prepared", chunksize, fmt)
+            pd.testing.assert_frame_equal(streamed, in_memory, check_categorical=False)
+            self.assertEqual(streamed["TransactionID"].tolist(), [550, 551, 552, 554])
+
+    @unittest.skipUnless(PARQUET_AVAILABLE, "pyarrow is not installed")
+    def test_parquet_keeps_sale_dates_typed(self):
+        with mock.patch.object(prepare_sales_data, "RAW_DATA_DIR", self.raw_dir), \
+                mock.patch.object(prepare_sales_data, "PREPARED_DATA_DIR", self.prepared_dir):
+            prepare_sales_data.main(fmt="parquet")
+        prepared_path = find_table(self.prepared_dir, "sales_data_prepared")
+        sales_df = read_table(prepared_path, columns=["TransactionID", "SaleDate"])
+        self.assertEqual(sales_df.columns.tolist(), ["TransactionID", "SaleDate"])
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(sales_df["SaleDate"]))
+
+    @unittest.skipUnless(PARQUET_AVAILABLE, "pyarrow is not installed")
+    def test_find_table_prefers_the_configured_format(self):
+        table = pd.DataFrame({"ID": [1, 2]})
+        write_table(table, self.prepared_dir.joinpath("ids.csv"))
+        self.assertEqual(find_table(self.prepared_dir, "ids", fmt="parquet").suffix, ".csv")
+
+        # A CSV touched after the Parquet file (e.g. by a git checkout) does not win
+        write_table(table, self.prepared_dir.joinpath("ids.parquet"))
+        os.utime(self.prepared_dir.joinpath("ids.csv"))
+        self.assertEqual(find_table(self.prepared_dir, "ids", fmt="parquet").suffix, ".parquet")
+        self.assertEqual(find_table(self.prepared_dir, "ids", fmt="csv").suffix, ".csv")
+        with self.assertRaises(FileNotFoundError):
+            find_table(self.prepared_dir, "missing")
+
+    def test_chunks_with_changing_dtypes_write_one_table(self):
+        chunks = [
+            pd.DataFrame({"ID": [1, 2], "DiscountPercent": np.array([5, 10], dtype="int8"), "Note": ["a", "b"]}),
+            pd.DataFrame({"ID": [3, 4], "DiscountPercent": [7.5, np.nan], "Note": ["c", "d"]}),
+            pd.DataFrame({"ID": [5, 6], "DiscountPercent": [0, 15], "Note": ["e", "f"]}),
+        ]
+        expected = pd.concat(chunks, ignore_index=True)
+        for fmt in FORMATS:
+            file_path = self.prepared_dir.joinpath(f"discounts.{fmt}")
+            self.assertEqual(write_table_chunks(iter(chunks), file_path), 6)
+            written = read_table(file_path)
+            pd.testing.assert_frame_equal(written, expected, check_dtype=False)
+            self.assertEqual(written["DiscountPercent"].dtype, np.float64)
+            self.assertEqual(written["ID"].dtype, np.int64)
+
+    def test_seen_keys_across_many_runs(self):
+        seen = SeenKeys()
+        rng = np.random.default_rng(0)
+        expected = set()
+        for _ in range(20):
+            keys = pd.Series(rng.integers(0, 500, size=50))
+            found = seen.contains(keys)
+            self.assertEqual(found.tolist(), [key in expected for key in keys])
+            seen.add(keys[~found])
+            expected.update(keys.tolist())
+        self.assertEqual(len(seen), len(expected))
+
+    def test_seen_keys_match_across_chunk_dtypes(self):
+        # The same IDs read as int, as float (a missing key) and as object (a malformed key)
+        chunks = [
+            pd.Series([1001, 1002]),
+            pd.Series([1002.0, np.nan, 1003.0]),
+            pd.Series(["1003", "n/a", "1001", "1004"]),
+            pd.Series([1004, 1005]),
+        ]
+        expected = [[False, False], [True, False, False], [True, False, True, False], [True, False]]
+        seen = SeenKeys()
+        for chunk, expected_found in zip(chunks, expected):
+            self.assertEqual(seen.contains(chunk).tolist(), expected_found)
+            seen.add(chunk)
+        self.assertTrue(seen.contains(pd.Series(["n/a", None])).all())
+        self.assertEqual(len(seen), 7)  # 1001-1005, "n/a" and the missing key
+
+    def test_streaming_median_matches_pandas(self):
+        values = pd.Series([2022, np.nan, 2023, 2019, 2024, 2024, 2021, np.nan])
+        running_median = StreamingMedian()
+        for start in range(0, len(values), 3):
+            running_median.update(values.iloc[start:start + 3])
+        self.assertEqual(running_median.median(), values.median())
+
+
+# Run the tests with verbosity=2 for detailed output
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,111 @@
+r"""
+tests/test_run_pipeline.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_run_pipeline.py
+    python3 tests\test_run_pipeline.py
+
+This test suite runs the pipeline runner on small stand-in scripts in a temporary
+folder and checks parallel starts, skipping of unchanged stages and failure handling.
+"""
+
+import unittest
+import os
+import pathlib
+import sys
+import tempfile
+
+# Write the logs and metrics of the test run to a temporary folder, not the project's logs/
+os.environ.setdefault("SMART_LOG_DIR", str(pathlib.Path(tempfile.gettempdir()).joinpath("smart_test_logs")))
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.run_pipeline import Stage, run_pipeline, validate_stages  # noqa: E402
+
+# Stand-in stage: record start and end times, then copy its input file to its output file
+COPY_SCRIPT = """
+import pathlib, time
+source, target = pathlib.Path("{source}"), pathlib.Path("{target}")
+started = time.time()
+time.sleep(0.3)
+target.write_text(source.read_text())
+pathlib.Path("{target}.times").write_text(f"{{started}} {{time.time()}}")
+"""
+
+
+class TestRunPipeline(unittest.TestCase):
+
+    def setUp(self):
+        """Create three independent copy stages and one stage that combines their outputs."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.temp_dir.name)
+        self.stages = []
+        for name in ("a", "b", "c"):
+            self.root.joinpath(f"{name}.raw").write_text(name)
+            self.root.joinpath(f"{name}.py").write_text(COPY_SCRIPT.format(source=f"{name}.raw", target=f"{name}.out"))
+            self.stages.append(Stage(name, f"{name}.py", [f"{name}.raw"], [f"{name}.out"]))
+        self.root.joinpath("combine.py").write_text(
+            "import pathlib\n"
+            "pathlib.Path('all.out').write_text(''.join(pathlib.Path(f'{n}.out').read_text() for n in 'abc'))\n")
+        self.stages.append(Stage("combine", "combine.py", ["[abc].out"], ["all.out"], ["a", "b", "c"]))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_stages(self, stages=None, force=False):
+        return run_pipeline(stages or self.stages, workers=3, force=force, root=self.root)
+
+    def statuses(self, results):
+        return {name: result["status"] for name, result in results.items()}
+
+    def test_independent_stages_run_in_parallel(self):
+        results = self.run_stages()
+        self.assertEqual(set(self.statuses(results).values()), {"ran"})
+        self.assertEqual(self.root.joinpath("all.out").read_text(), "abc")
+        times = [tuple(map(float, self.root.joinpath(f"{name}.out.times").read_text().split())) for name in "abc"]
+        self.assertLess(max(start for start, _ in times), min(end for _, end in times),
+                        "The independent stages did not overlap")
+
+    def test_unchanged_stages_are_skipped(self):
+        self.run_stages()
+        self.assertEqual(set(self.statuses(self.run_stages()).values()), {"skipped"})
+
+        self.root.joinpath("b.raw").write_text("B")
+        statuses = self.statuses(self.run_stages())
+        self.assertEqual(statuses, {"a": "skipped", "b": "ran", "c": "skipped", "combine": "ran"})
+        self.assertEqual(self.root.joinpath("all.out").read_text(), "aBc")
+
+        self.root.joinpath("all.out").unlink()
+        self.assertEqual(self.statuses(self.run_stages())["combine"], "ran", "Missing output not rebuilt")
+        self.assertEqual(set(self.statuses(self.run_stages(force=True)).values()), {"ran"})
+
+    def test_changed_imported_module_reruns_stage(self):
+        self.root.joinpath("helper.py").write_text("SEPARATOR = ''\n")
+        self.root.joinpath("combine.py").write_text(
+            "import pathlib\n"
+            "from helper import SEPARATOR\n"
+            "pathlib.Path('all.out').write_text(SEPARATOR.join(pathlib.Path(f'{n}.out').read_text() for n in 'abc'))\n")
+        self.run_stages()
+        self.root.joinpath("helper.py").write_text("SEPARATOR = '-'\n")
+        statuses = self.statuses(self.run_stages())
+        self.assertEqual(statuses, {"a": "skipped", "b": "skipped", "c": "skipped", "combine": "ran"})
+        self.assertEqual(self.root.joinpath("all.out").read_text(), "a-b-c")
+
+    def test_failed_stage_blocks_dependents(self):
+        self.root.joinpath("b.py").write_text("raise SystemExit('broken')\n")
+        statuses = self.statuses(self.run_stages())
+        self.assertEqual(statuses, {"a": "ran", "b": "failed", "c": "ran", "combine": "blocked"})
+
+    def test_validate_stages_rejects_unknown_and_later_dependencies(self):
+        with self.assertRaises(ValueError):
+            validate_stages([Stage("x", "x.py", [], [], ["y"]), Stage("y", "y.py", [], [])])
+
+
+# Run the tests with verbosity=2 for detailed output
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,112 @@
+r"""
+tests/test_stage_cache.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_stage_cache.py
+    python3 tests\test_stage_cache.py
+
+This test suite verifies the keys, hits and LRU eviction of the stage output cache.
+"""
+
+import unittest
+import os
+import pathlib
+import sys
+import tempfile
+import pandas as pd
+
+# Write the logs and metrics of the test run to a temporary folder, not the project's logs/
+os.environ.setdefault("SMART_LOG_DIR", str(pathlib.Path(tempfile.gettempdir()).joinpath("smart_test_logs")))
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.stage_cache import StageCache, project_modules, source_fingerprint  # noqa: E402
+
+
+class TestStageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.temp_dir.name)
+        self.input_path = self.root.joinpath("input.csv")
+        self.input_path.write_text("a,b\n1,2\n")
+        self.cache = StageCache(self.root.joinpath("cache"))
+        self.calls = 0
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def compute(self) -> pd.DataFrame:
+        self.calls += 1
+        return pd.DataFrame({"region": pd.Categorical(["East", "West"]), "total": [1.5, 2.5]})
+
+    def cached(self, params=None) -> pd.DataFrame:
+        return self.cache.get_or_compute("stage", params or {"top_k": 3}, [self.input_path], self.compute)
+
+    def test_hit_returns_stored_artifact_without_recomputing(self):
+        first = self.cached()
+        second = self.cached()
+        self.assertEqual(self.calls, 1)
+        pd.testing.assert_frame_equal(second, first)
+
+    def test_changed_input_or_parameters_miss(self):
+        self.cached()
+        self.cached({"top_k": 5})
+        self.assertEqual(self.calls, 2, "Different parameters must not share an entry")
+        self.input_path.write_text("a,b\n1,3\n")
+        self.cached()
+        self.assertEqual(self.calls, 3, "A changed input file must not hit")
+        self.input_path.unlink()
+        self.cached()
+        self.assertEqual(self.calls, 4, "A missing input file must not hit")
+
+    def test_source_fingerprint_follows_imported_project_modules(self):
+        helpers = self.root.joinpath("helpers")
+        helpers.mkdir()
+        helpers.joinpath("__init__.py").write_text("")
+        helpers.joinpath("top_k.py").write_text("from helpers import common\nimport pandas\n")
+        helpers.joinpath("common.py").write_text("LIMIT = 3\n")
+        helpers.joinpath("unused.py").write_text("")
+        script = self.root.joinpath("stage.py")
+        script.write_text("import os\nfrom helpers.top_k import top_k\n")
+
+        names = [path.relative_to(self.root.resolve()).as_posix() for path in project_modules(script, self.root)]
+        self.assertEqual(names, ["helpers/__init__.py", "helpers/common.py", "helpers/top_k.py", "stage.py"])
+
+        before = source_fingerprint(script, self.root)
+        helpers.joinpath("common.py").write_text("LIMIT = 5\n")
+        self.assertNotEqual(source_fingerprint(script, self.root), before,
+                            "A changed helper imported through another module must change the fingerprint")
+
+    def test_least_recently_used_entries_are_evicted(self):
+        artifact = "x" * 1000
+        for key in ("a", "b"):
+            self.cache.put(key, artifact)
+        entry_size = self.cache.entry_path("a").stat().st_size
+        self.cache.max_bytes = 2 * entry_size
+
+        # Make "a" older than "b", then use it so "b" becomes the least recently used
+        os.utime(self.cache.entry_path("a"), ns=(1, 1))
+        os.utime(self.cache.entry_path("b"), ns=(2, 2))
+        self.assertEqual(self.cache.get("a"), artifact)
+        self.cache.put("c", artifact)
+
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("c"))
+
+    def test_disabled_cache_always_recomputes(self):
+        self.cache = StageCache(self.root.joinpath("cache"), max_bytes=0)
+        self.cached()
+        self.cached()
+        self.assertEqual(self.calls, 2)
+
+
+# Run the tests with verbosity=2 for detailed output
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,85 @@
+"""
+Date Handling
+File: utils/dates.py
+
+This module parses the project's date columns and builds the calendar (date) dimension.
+
+parse_dates() parses each distinct date string once: a column of a million sales holds
+only a few thousand different days, so the strings are factorized, the unique values are
+parsed with explicit formats (no per-value format guessing), and the parsed dates are
+spread back to the rows. Values that match none of the known formats fall back to
+pandas' flexible parser.
+
+Dates are joined to the calendar through an integer key, YYYYMMDD (2024-01-06 -> 20240106),
+which sorts and compares like the date itself.
+"""
+
+# Imports from Python Standard Library
+from typing import List
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+
+# Define global constants
+# Formats tried in order: raw and prepared CSV files use month/day/year; dates written
+# back from datetime columns (Parquet prepared files, to_sql) are ISO.
+DATE_FORMATS: List[str] = ["%m/%d/%Y", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S"]
+DATETIME_DTYPE: str = "datetime64[us]"
+
+
+def parse_dates(values: pd.Series, formats: List[str] = DATE_FORMATS, errors: str = "raise") -> pd.Series:
+    """
+    Parse a column of date strings, parsing each distinct string only once.
+
+    Args:
+        values (pd.Series): Date strings (a datetime column is returned unchanged).
+        formats (list): strptime formats to try, in order.
+        errors (str): "raise" or "coerce" (unparseable values become NaT), as in pd.to_datetime.
+
+    Returns:
+        pd.Series: datetime64 values with the index of values.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values
+
+    codes, uniques = pd.factorize(values)
+    strings = pd.Series(uniques, dtype=object).astype(str)
+    parsed = pd.Series(pd.NaT, index=strings.index, dtype=DATETIME_DTYPE)
+    remaining = np.ones(len(strings), dtype=bool)
+    for fmt in formats:
+        if not remaining.any():
+            break
+        parsed[remaining] = pd.to_datetime(strings[remaining], format=fmt, errors="coerce")
+        remaining &= parsed.isna().to_numpy()
+    if remaining.any():
+        parsed[remaining] = pd.to_datetime(strings[remaining], format="mixed", errors=errors)
+
+    # Missing values have code -1 and stay NaT
+    dates = np.where(codes >= 0, parsed.to_numpy()[codes], np.datetime64("NaT"))
+    return pd.Series(dates, index=values.index, name=values.name).astype(DATETIME_DTYPE)
+
+
+def date_keys(dates: pd.Series) -> pd.Series:
+    """Return the YYYYMMDD integer key of each date (missing dates give <NA>)."""
+    return (dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day).astype("Int64")
+
+
+def build_date_dimension(start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    """
+    Return one calendar row per day from start to end (inclusive).
+
+    Columns: date_key (YYYYMMDD), full_date (ISO text), year, quarter, month, day,
+    day_of_week (e.g. "Monday") and day_of_week_number (Monday = 1 ... Sunday = 7).
+    """
+    days = pd.Series(pd.date_range(start.normalize(), end.normalize(), freq="D"))
+    return pd.DataFrame({
+        "date_key": date_keys(days).astype("int64"),
+        "full_date": days.dt.strftime("%Y-%m-%d"),
+        "year": days.dt.year,
+        "quarter": days.dt.quarter,
+        "month": days.dt.month,
+        "day": days.dt.day,
+        "day_of_week": days.dt.day_name(),
+        "day_of_week_number": days.dt.dayofweek + 1,
+    })
@@ -5,10 +5,39 @@ File: utils/logger.py
 This script provides logging functions for the project. Logging is an essential way to
 track events and issues during software execution. This logger setup uses Loguru to log
 messages and errors both to a file and to the console.
+
+Logging is kept cheap enough to run per chunk and from several processes at once:
+
+- Enqueued writes: every sink hands its messages to a background writer thread
+  through a multiprocessing-safe queue, so a log call never waits on the disk or the
+  terminal, and worker processes forked from a script write through the parent's
+  queue instead of fighting over the file. Processes started separately (like the
+  pipeline stages) each write whole lines in append mode and reopen the log file when
+  another process rotates it. Set SMART_LOG_ENQUEUE=0 to write synchronously.
+- Lazy formatting: pass values as arguments instead of using f-strings, e.g.
+  logger.debug("Chunk shape={}", df.shape), and wrap costly values in a lambda with
+  logger.opt(lazy=True). Messages below the lowest sink level are dropped before
+  anything is formatted or evaluated.
+- Sampling: per-chunk messages go through sampled(), which logs the first call of a
+  function and every SMART_LOG_SAMPLE_EVERY-th call after it (all calls when DEBUG
+  logging is on).
+- Rotation: the log files are rotated at SMART_LOG_ROTATION (a size like "10 MB" or a
+  time like "1 day" or "00:00"), compressed to zip, and only the newest
+  SMART_LOG_RETENTION rotated files (or those newer than a duration like "30 days")
+  are kept.
+
+SMART_LOG_LEVEL and SMART_CONSOLE_LEVEL set the file and console levels (INFO by default).
+SMART_LOG_DIR moves the log files (and the metrics and profiles next to them) out of the
+project's logs folder; the tests point it at a temporary folder.
 """
 
 # Imports from Python Standard Library
+import os
 import pathlib
+import sys
+import threading
+from collections import Counter
+from typing import Optional, Union
 
 # Imports from external packages
 from loguru import logger
@@ -16,17 +45,97 @@ from loguru import logger
 # Define global constants
 CURRENT_SCRIPT = pathlib.Path(__file__).stem  # Gets the current file name without the extension
 PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent  # Navigate to the project's root directory
-LOG_FOLDER: pathlib.Path = PROJECT_ROOT.joinpath("logs")  # Directory where logs will be stored
+# Directory where logs will be stored
+LOG_FOLDER: pathlib.Path = pathlib.Path(os.environ.get("SMART_LOG_DIR", PROJECT_ROOT.joinpath("logs")))
 LOG_FILE: pathlib.Path = LOG_FOLDER.joinpath("project_log.log")  # Path to the log file
+METRICS_FILE: pathlib.Path = LOG_FOLDER.joinpath("metrics.jsonl")  # Stage metrics, one JSON object per line
+METRICS_LEVEL: str = "METRICS"  # Just above INFO; only the metrics sink keeps these records
+
+LOG_LEVEL: str = os.environ.get("SMART_LOG_LEVEL", "INFO").upper()  # Level of the log file
+CONSOLE_LEVEL: str = os.environ.get("SMART_CONSOLE_LEVEL", "INFO").upper()  # Level of the console output
+LOG_ENQUEUE: bool = os.environ.get("SMART_LOG_ENQUEUE", "1") != "0"  # Write through a background thread
+LOG_ROTATION: str = os.environ.get("SMART_LOG_ROTATION", "10 MB")  # Size or time at which a log file rotates
+LOG_COMPRESSION: str = os.environ.get("SMART_LOG_COMPRESSION", "zip")  # Format of the rotated files
+LOG_SAMPLE_EVERY: int = int(os.environ.get("SMART_LOG_SAMPLE_EVERY", "10"))  # Log 1 in N sampled calls
+
+
+def _retention(value: str) -> Union[int, str]:
+    """A plain number keeps that many rotated files; anything else ("30 days") is a duration."""
+    return int(value) if value.isdigit() else value
+
+
+LOG_RETENTION: Union[int, str] = _retention(os.environ.get("SMART_LOG_RETENTION", "10"))
+
+
+def _not_metrics(record: dict) -> bool:
+    return record["level"].name != METRICS_LEVEL
+
+
+def _only_metrics(record: dict) -> bool:
+    return record["level"].name == METRICS_LEVEL
+
 
 # Ensure the log folder exists or create it
-LOG_FOLDER.mkdir(exist_ok=True)
+LOG_FOLDER.mkdir(parents=True, exist_ok=True)
+
+# Replace Loguru's default console handler (synchronous, DEBUG) with our own
+logger.remove()
+logger.add(sys.stderr, level=CONSOLE_LEVEL, enqueue=LOG_ENQUEUE, filter=_not_metrics)
 
 # Configure Loguru to write to the log file
-logger.add(LOG_FILE, level="INFO")
+logger.add(LOG_FILE, level=LOG_LEVEL, enqueue=LOG_ENQUEUE, filter=_not_metrics, watch=True,
+           rotation=LOG_ROTATION, retention=LOG_RETENTION, compression=LOG_COMPRESSION)
 
-# Optionally, add console output for logging (Uncomment the following line if needed)
-# logger.add(sys.stderr, level="DEBUG")
+# Stage metrics (see utils/metrics.py) go to their own file as bare JSON lines. The level sits
+# above INFO so it does not lower the threshold below which log calls return without formatting.
+logger.level(METRICS_LEVEL, no=21)
+logger.add(METRICS_FILE, level=METRICS_LEVEL, format="{message}", enqueue=LOG_ENQUEUE, filter=_only_metrics,
+           watch=True, rotation=LOG_ROTATION, retention=LOG_RETENTION, compression=LOG_COMPRESSION)
+
+# Lowest level any text sink writes; sampling is off at or below DEBUG
+_LOWEST_LEVEL_NO: int = min(logger.level(LOG_LEVEL).no, logger.level(CONSOLE_LEVEL).no)
+_sample_counts: Counter = Counter()
+_sample_lock = threading.Lock()
+
+
+class _SkippedLogger:
+    """Stands in for the logger when a sampled call is skipped: every method call does nothing."""
+
+    def __getattr__(self, name: str) -> "_SkippedLogger":
+        return self
+
+    def __call__(self, *args, **kwargs) -> "_SkippedLogger":
+        return self
+
+
+_SKIPPED = _SkippedLogger()
+
+
+def sampled(key: Optional[str] = None, every: Optional[int] = None):
+    """
+    Return the logger for 1 in `every` calls with the same key, and a do-nothing logger otherwise.
+
+    Use it for messages logged once per chunk, so streaming a large file writes a few lines
+    instead of thousands. The first call always logs, and every call logs when DEBUG logging
+    is on (SMART_LOG_LEVEL or SMART_CONSOLE_LEVEL=DEBUG).
+
+    Args:
+        key (str, optional): Counter to sample on; defaults to the calling function.
+        every (int, optional): Sampling interval; defaults to SMART_LOG_SAMPLE_EVERY.
+
+    Returns:
+        The Loguru logger, or an object that ignores every log call (including opt()).
+    """
+    every = every or LOG_SAMPLE_EVERY
+    if every <= 1 or _LOWEST_LEVEL_NO <= logger.level("DEBUG").no:
+        return logger
+    if key is None:
+        code = sys._getframe(1).f_code
+        key = f"{code.co_filename}:{code.co_name}"
+    with _sample_lock:
+        count = _sample_counts[key]
+        _sample_counts[key] = count + 1
+    return logger if count % every == 0 else _SKIPPED
 
 
 def log_example() -> None:
@@ -39,14 +148,14 @@ def log_example() -> None:
 def main() -> None:
     """Main function to execute the logger setup and demonstrate its usage."""
     logger.info(f"STARTING {CURRENT_SCRIPT}.py")
-    
+
     # Call the example logging function
     log_example()
-    
+
     logger.info(f"View the log output at {LOG_FILE}")
     logger.info(f"EXITING {CURRENT_SCRIPT}.py.")
 
 
 # Conditional execution block that calls main() only when this file is executed directly
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,291 @@
+"""
+Stage Metrics
+File: utils/metrics.py
+
+This module measures pipeline functions and writes one JSON object per call to
+logs/metrics.jsonl, through the project logger (utils/logger.py routes the METRICS
+level to that file only). Decorate a function with @instrument(), or wrap a block in
+stage_metrics(), and each call records:
+
+- run_id: shared by every stage of one run (run_pipeline.py passes its own to the
+  stage scripts in SMART_RUN_ID, so a pipeline run can be summarized as a whole)
+- stage, status ("ok" or "error"), wall_s and cpu_s (process CPU time, all threads)
+- peak_rss_mb: the process's peak resident memory when the stage ended, and
+  rss_growth_mb: how much the stage raised that peak (0 when an earlier stage peaked
+  higher). Both are null where the resource module is missing (Windows).
+- rows_in and rows_out: the lengths of the DataFrame / Series arguments and result,
+  plus anything the function adds with record_rows()
+
+Set SMART_PROFILE to capture more, at some cost in speed:
+
+- SMART_PROFILE=tracemalloc adds traced_peak_mb, the most Python and NumPy memory
+  allocated during the stage (nested stages included)
+- SMART_PROFILE=cprofile saves a cProfile file per outermost stage to logs/profiles
+  (open it with python -m pstats or snakeviz) and records its path
+
+To summarize the stages of a run:
+
+    py utils\\metrics.py
+    python3 utils/metrics.py --run <run_id>
+"""
+
+# Imports from Python Standard Library
+import argparse
+import contextlib
+import cProfile
+import functools
+import itertools
+import json
+import os
+import pathlib
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Imports from external packages
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import LOG_FOLDER, METRICS_FILE, METRICS_LEVEL, logger  # noqa: E402
+
+# Define global constants
+RUN_ID: str = os.environ.get("SMART_RUN_ID") or f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+PROFILE_MODE: str = os.environ.get("SMART_PROFILE", "").lower()  # "", "tracemalloc" or "cprofile"
+PROFILE_MODES = ("tracemalloc", "cprofile")
+PROFILE_DIR: pathlib.Path = LOG_FOLDER.joinpath("profiles")
+MB: int = 1024 * 1024
+
+# Stages open in each thread, innermost last
+_local = threading.local()
+# Only one cProfile profiler can run per process at a time
+_profiler_lock = threading.Lock()
+_profile_numbers = itertools.count(1)
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Return the peak resident memory of this process so far, or None if it cannot be read."""
+    # On Linux, ru_maxrss keeps the peak of the parent a script was started from (fork + exec
+    # carries it over), so read the process's own high-water mark instead
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, KiB elsewhere
+
+
+def count_rows(value: object) -> Optional[int]:
+    """Return the row count of a DataFrame or Series (or of the first item of a tuple result), else None."""
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+
+def _open_stages() -> list:
+    if not hasattr(_local, "stages"):
+        _local.stages = []
+    return _local.stages
+
+
+def record_rows(rows_in: Optional[int] = None, rows_out: Optional[int] = None) -> None:
+    """
+    Add row counts to the innermost stage running in this thread (does nothing outside a stage).
+
+    For functions whose rows are not DataFrame arguments or results, e.g. a load that reads
+    its own files.
+    """
+    stages = _open_stages()
+    if not stages:
+        return
+    record = stages[-1]["record"]
+    for field, rows in (("rows_in", rows_in), ("rows_out", rows_out)):
+        if rows is not None:
+            record[field] = (record[field] or 0) + int(rows)
+
+
+def emit(record: Dict[str, object]) -> None:
+    """Write one metrics record as a JSON line to the metrics sink."""
+    logger.log(METRICS_LEVEL, json.dumps(record, default=str))
+
+
+@contextlib.contextmanager
+def stage_metrics(stage: str, rows_in: Optional[int] = None) -> Iterator[Dict[str, object]]:
+    """
+    Measure a block of code as one stage and emit its metrics when it ends.
+
+    Args:
+        stage (str): Stage name, e.g. "etl_to_dw.load_data_to_db".
+        rows_in (int, optional): Rows the stage starts from.
+
+    Yields:
+        dict: The record being built; set "rows_out" (or call record_rows()) inside the block.
+    """
+    stages = _open_stages()
+    record: Dict[str, object] = {
+        "run_id": RUN_ID, "stage": stage, "status": "ok", "started": datetime.now().isoformat(timespec="milliseconds"),
+        "rows_in": rows_in, "rows_out": None,
+    }
+    frame = {"record": record, "traced_peak": 0}
+
+    # Memory tracing: the peak is reset per stage, so hand the peak reached so far to the enclosing stage
+    tracing = PROFILE_MODE == "tracemalloc"
+    started_tracing = tracing and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if tracing:
+        traced_base, traced_peak = tracemalloc.get_traced_memory()
+        if stages:
+            stages[-1]["traced_peak"] = max(stages[-1]["traced_peak"], traced_peak)
+        tracemalloc.reset_peak()
+
+    profiler = None
+    if PROFILE_MODE == "cprofile" and not stages and _profiler_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    stages.append(frame)
+    rss_before = peak_rss_bytes()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["status"] = "error"
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["wall_s"] = round(time.perf_counter() - wall_start, 6)
+        record["cpu_s"] = round(time.process_time() - cpu_start, 6)
+        rss_after = peak_rss_bytes()
+        record["peak_rss_mb"] = None if rss_after is None else round(rss_after / MB, 1)
+        record["rss_growth_mb"] = None if rss_after is None else round((rss_after - rss_before) / MB, 1)
+        stages.pop()
+
+        if tracing:
+            peak = max(tracemalloc.get_traced_memory()[1], frame["traced_peak"])
+            record["traced_peak_mb"] = round((peak - traced_base) / MB, 1)
+            if stages:
+                stages[-1]["traced_peak"] = max(stages[-1]["traced_peak"], peak)
+            if started_tracing:
+                tracemalloc.stop()
+
+        if profiler is not None:
+            profiler.disable()
+            _profiler_lock.release()
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            safe_name = re.sub(r"[^\w.-]", "_", stage)
+            profile_path = PROFILE_DIR.joinpath(f"{RUN_ID}-{os.getpid()}-{next(_profile_numbers):03d}-{safe_name}.prof")
+            profiler.dump_stats(profile_path)
+            record["profile"] = str(profile_path)
+
+        emit(record)
+
+
+def instrument(stage: Optional[str] = None) -> Callable:
+    """
+    Decorate a function so each call is measured as a stage (see stage_metrics).
+
+    Args:
+        stage (str, optional): Stage name; defaults to "<file stem>.<function name>", which
+            stays the same when the script runs as __main__.
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorator(func: Callable) -> Callable:
+        name = stage or f"{pathlib.Path(func.__code__.co_filename).stem}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            frames = [value for value in list(args) + list(kwargs.values())
+                      if isinstance(value, (pd.DataFrame, pd.Series))]
+            with stage_metrics(name, sum(len(frame) for frame in frames) if frames else None) as record:
+                result = func(*args, **kwargs)
+                rows_out = count_rows(result)
+                if rows_out is not None:
+                    record["rows_out"] = (record["rows_out"] or 0) + rows_out
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def read_metrics(metrics_file: pathlib.Path = METRICS_FILE, run_id: Optional[str] = None) -> pd.DataFrame:
+    """
+    Read the metrics records of one run (by default the latest run in the file).
+
+    Returns:
+        pd.DataFrame: One row per stage call, in the order they finished; empty if there are none.
+    """
+    metrics_file = pathlib.Path(metrics_file)
+    if not metrics_file.exists():
+        return pd.DataFrame()
+    metrics = pd.read_json(metrics_file, lines=True, dtype={"run_id": str})
+    if metrics.empty:
+        return metrics
+    run_id = run_id or metrics["run_id"].iloc[-1]
+    return metrics[metrics["run_id"] == run_id].reset_index(drop=True)
+
+
+def summarize_run(metrics: pd.DataFrame) -> pd.DataFrame:
+    """
+    Total the metrics of a run per stage, slowest first.
+
+    Returns:
+        pd.DataFrame: calls, errors, wall_s and cpu_s summed per stage, the highest
+        peak_rss_mb (and traced_peak_mb, when profiled), and rows_in and rows_out summed.
+    """
+    if metrics.empty:
+        return pd.DataFrame()
+    metrics = metrics.assign(calls=1, errors=(metrics["status"] != "ok").astype(int))
+    totals = {"calls": "sum", "errors": "sum", "wall_s": "sum", "cpu_s": "sum", "peak_rss_mb": "max"}
+    if "traced_peak_mb" in metrics.columns:
+        totals["traced_peak_mb"] = "max"
+    grouped = metrics.groupby("stage", sort=False)
+    # Row counts stay missing for stages that never reported any
+    rows = grouped[["rows_in", "rows_out"]].sum(min_count=1).astype("Int64")
+    summary = grouped.agg(totals).join(rows)
+    return summary.sort_values("wall_s", ascending=False)
+
+
+def format_summary(summary: pd.DataFrame, run_id: str = "") -> str:
+    """Return the run summary as a text table."""
+    if summary.empty:
+        return f"No stage metrics recorded for run {run_id}"
+    return f"Stage metrics for run {run_id}\n{summary.round(3).to_string()}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarize the stage metrics of a run.")
+    parser.add_argument("--run", default=None, help="run_id to summarize (default: the latest run)")
+    parser.add_argument("--file", type=pathlib.Path, default=METRICS_FILE, help="metrics file")
+    args = parser.parse_args()
+
+    metrics = read_metrics(args.file, args.run)
+    run_id = args.run or (metrics["run_id"].iloc[0] if not metrics.empty else "")
+    print(format_summary(summarize_run(metrics), run_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Stage Output Cache
+File: utils/stage_cache.py
+
+This module stores the results of pipeline stages (for example the OLAP cubes) so a
+rerun on unchanged inputs returns them instead of recomputing them.
+
+An entry is addressed by a key that hashes together:
+
+- the stage name,
+- the stage parameters (dimensions, metrics, top-k size, ...), as sorted JSON,
+- a fingerprint of every input file: its SHA-256, plus its SQLite write-ahead log
+  when one exists next to it. SQLite's PRAGMA data_version only compares states
+  within one connection, so it cannot tell whether a database changed between runs;
+  the file hash can,
+- the source of the stage script and of every project module it imports, directly or
+  through other project modules (project_modules()), so editing a helper such as
+  scripts/olap/top_k.py invalidates the results computed with the old code.
+
+Hashing a large input still costs one read of the file, so digests are remembered by
+file size and modification time and only recomputed when either changes.
+
+Entries are pickled, which keeps every dtype (categoricals, datetimes) and loads in
+milliseconds. The cache is bounded in bytes: after each write the least recently used
+entries (by file modification time, refreshed on every hit) are deleted until the
+total fits. Every file is written to a temporary name and renamed, so stages running
+in parallel processes can share the cache.
+
+Set SMART_CACHE_MAX_BYTES=0 to turn the cache off.
+"""
+
+# Imports from Python Standard Library
+import ast
+import hashlib
+import json
+import os
+import pathlib
+from typing import Callable, Dict, List, Optional
+
+# Imports from external packages
+import pandas as pd
+
+from utils.storage import hash_file
+
+# Define global constants
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+CACHE_DIR: pathlib.Path = PROJECT_ROOT.joinpath("data", "cache")
+CACHE_MAX_BYTES: int = int(os.environ.get("SMART_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+ENTRY_SUFFIX: str = ".pkl"
+FILE_HASHES_NAME: str = "file_hashes.json"
+
+
+def _module_file(name: str, root: pathlib.Path) -> Optional[pathlib.Path]:
+    """Return the file of a dotted module name under root (a module or a package), or None."""
+    base = root.joinpath(*name.split("."))
+    for candidate in (base.with_name(base.name + ".py"), base.joinpath("__init__.py")):
+        if candidate.is_file():
+            return candidate.resolve()
+    return None
+
+
+def project_modules(script_path: pathlib.Path, root: pathlib.Path = PROJECT_ROOT) -> List[pathlib.Path]:
+    """
+    Return a script and every project module it imports, directly or through other project modules.
+
+    The imports are read from the source with ast, so nothing is executed. Modules that
+    are not files under root (the standard library, pandas, ...) are left out.
+
+    Args:
+        script_path (pathlib.Path): The stage script (or module) to start from.
+        root (pathlib.Path): Folder the absolute imports resolve against (the project root).
+
+    Returns:
+        list: The resolved file paths, sorted, starting set included.
+    """
+    root = pathlib.Path(root).resolve()
+    pending = [pathlib.Path(script_path).resolve()]
+    found = set()
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.add(path)
+        try:
+            tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+        except (OSError, SyntaxError, ValueError):
+            continue  # missing or unparsable: the caller's hash of the file covers it
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+                base = root
+            elif isinstance(node, ast.ImportFrom):
+                # "from scripts.olap import top_k" imports a module, "from top_k import x" a name
+                module = node.module or ""
+                names = [module] if module else []
+                names += [f"{module}.{alias.name}" if module else alias.name for alias in node.names]
+                base = path.parents[node.level - 1] if node.level else root
+            else:
+                continue
+            for name in names:
+                module_path = _module_file(name, base)
+                if module_path is not None:
+                    pending.append(module_path)
+    return sorted(found)
+
+
+def source_fingerprint(script_path: pathlib.Path, root: pathlib.Path = PROJECT_ROOT) -> str:
+    """Return a SHA-256 over the names and contents of a script and the project modules it imports."""
+    root = pathlib.Path(root).resolve()
+    digest = hashlib.sha256()
+    for path in project_modules(script_path, root):
+        relative = path.relative_to(root).as_posix() if path.is_relative_to(root) else str(path)
+        digest.update(f"{relative}:{hash_file(path) if path.exists() else 'missing'}\n".encode())
+    return digest.hexdigest()
+
+
+class StageCache:
+    """Content-addressed, size-bounded LRU cache of stage outputs on disk."""
+
+    def __init__(self, cache_dir: pathlib.Path = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = max_bytes > 0
+
+    def _replace(self, target: pathlib.Path, write: Callable[[pathlib.Path], None]) -> None:
+        """Write a file under a temporary name, then rename it over target in one step."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        write(temp_path)
+        os.replace(temp_path, target)
+
+    def file_fingerprint(self, file_path: pathlib.Path) -> str:
+        """Return the SHA-256 of a file (and of its SQLite -wal file, if any), or 'missing'."""
+        file_path = pathlib.Path(file_path).resolve()
+        hashes_path = self.cache_dir.joinpath(FILE_HASHES_NAME)
+        try:
+            known = json.loads(hashes_path.read_text())
+        except (FileNotFoundError, ValueError):
+            known = {}
+
+        changed = False
+        digests = []
+        wal_path = file_path.with_name(file_path.name + "-wal")
+        for path in (file_path, wal_path):
+            # An empty -wal (left by a checkpoint) holds nothing, the same as no -wal at all
+            if not path.exists() or (path == wal_path and path.stat().st_size == 0):
+                continue
+            stat = path.stat()
+            signature = [stat.st_size, stat.st_mtime_ns]
+            entry = known.get(str(path))
+            if entry is None or entry[:2] != signature:
+                entry = known[str(path)] = signature + [hash_file(path)]
+                changed = True
+            digests.append(entry[2])
+        if changed and self.enabled:
+            self._replace(hashes_path, lambda temp: temp.write_text(json.dumps(known)))
+        return ":".join(digests) if file_path.exists() else "missing"
+
+    def key(self, stage: str, params: Dict[str, object], inputs: List[pathlib.Path],
+            code: Optional[pathlib.Path] = None) -> str:
+        """
+        Return the cache key for a stage run on the given parameters and input files.
+
+        Args:
+            stage (str): Stage name.
+            params (dict): Stage parameters (JSON-serializable, or str()-able).
+            inputs (list): Files the stage reads.
+            code (pathlib.Path, optional): The stage script (usually __file__); its source and
+                that of the project modules it imports are part of the key.
+
+        Returns:
+            str: The hex key.
+        """
+        digest = hashlib.sha256()
+        digest.update(stage.encode())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        if code is not None:
+            digest.update(f"\ncode:{source_fingerprint(code)}".encode())
+        for path in inputs:
+            digest.update(f"\n{pathlib.Path(path).name}:{self.file_fingerprint(path)}".encode())
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> pathlib.Path:
+        return self.cache_dir.joinpath(key + ENTRY_SUFFIX)
+
+    def get(self, key: str) -> Optional[object]:
+        """Return the stored artifact for a key and mark it recently used, or None on a miss."""
+        path = self.entry_path(key)
+        if not self.enabled or not path.exists():
+            return None
+        try:
+            artifact = pd.read_pickle(path)
+        except Exception:
+            path.unlink(missing_ok=True)  # unreadable entry: drop it and recompute
+            return None
+        os.utime(path)
+        return artifact
+
+    def put(self, key: str, artifact: object) -> None:
+        """Store an artifact (not None) under a key, then evict least recently used entries over the size limit."""
+        if not self.enabled:
+            return
+        path = self.entry_path(key)
+        self._replace(path, lambda temp: pd.to_pickle(artifact, temp))
+        self.evict()
+
+    def evict(self) -> List[pathlib.Path]:
+        """Delete least recently used entries until the cache fits in max_bytes; return the deleted paths."""
+        entries = []
+        for path in self.cache_dir.glob(f"*{ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # evicted by another process meanwhile
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        evicted = []
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted.append(path)
+        return evicted
+
+    def get_or_compute(self, stage: str, params: Dict[str, object], inputs: List[pathlib.Path],
+                       compute: Callable[[], object], code: Optional[pathlib.Path] = None) -> object:
+        """Return the cached artifact for this stage run, computing and storing it on a miss (see key())."""
+        key = self.key(stage, params, inputs, code)
+        artifact = self.get(key)
+        if artifact is None:
+            artifact = compute()
+            self.put(key, artifact)
+        return artifact
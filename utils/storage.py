@@ -0,0 +1,194 @@
+"""
+Storage Layer
+File: utils/storage.py
+
+This module reads and writes the tables that move between pipeline stages (prepared
+data and OLAP cubes) in a pluggable file format:
+
+- parquet: columnar, typed (dates stay dates), compressed, and readable one column
+  at a time. Requires the optional pyarrow package.
+- csv: plain text, kept as the export format and as the fallback when pyarrow is missing.
+
+The format of a file is taken from its suffix. A table is addressed by its path
+without caring about the format via find_table(), which returns <name> in
+DEFAULT_FORMAT, or in the other format only when that file is missing. The choice
+never depends on modification times, which a git checkout can change.
+"""
+
+# Imports from Python Standard Library
+import hashlib
+import os
+import pathlib
+from typing import Iterator, List, Optional
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; fall back to CSV
+    pa = None
+    pq = None
+
+# Define global constants
+SUPPORTED_FORMATS: List[str] = ["parquet", "csv"]
+PARQUET_AVAILABLE: bool = pq is not None
+
+# Format used for intermediate tables unless a caller asks for another one.
+# Set SMART_STORE_FORMAT=csv to keep everything as text.
+DEFAULT_FORMAT: str = os.environ.get("SMART_STORE_FORMAT", "parquet" if PARQUET_AVAILABLE else "csv")
+PARQUET_COMPRESSION: str = "zstd"
+
+
+def format_of(file_path: pathlib.Path) -> str:
+    """
+    Return the storage format of a file from its suffix.
+
+    Raises:
+        ValueError: If the suffix is not a supported format.
+    """
+    fmt = file_path.suffix.lstrip(".").lower()
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported table format '{file_path.suffix}' for {file_path}.")
+    if fmt == "parquet" and not PARQUET_AVAILABLE:
+        raise ValueError("Reading or writing Parquet requires the pyarrow package (pip install pyarrow).")
+    return fmt
+
+
+def hash_file(file_path: pathlib.Path) -> str:
+    """Return the SHA-256 hex digest of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def with_format(file_path: pathlib.Path, fmt: Optional[str] = None) -> pathlib.Path:
+    """Return file_path with the suffix of the given format (DEFAULT_FORMAT if None)."""
+    return file_path.with_suffix(f".{fmt or DEFAULT_FORMAT}")
+
+
+def write_table(df: pd.DataFrame, file_path: pathlib.Path) -> pathlib.Path:
+    """Write a DataFrame in the format given by the file suffix and return the path."""
+    if format_of(file_path) == "parquet":
+        df.to_parquet(file_path, index=False, compression=PARQUET_COMPRESSION)
+    else:
+        df.to_csv(file_path, index=False)
+    return file_path
+
+
+def read_table(file_path: pathlib.Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read a table, optionally only some of its columns.
+
+    Parquet reads only the requested column chunks from disk; CSV still parses every
+    line but keeps only the requested columns in memory.
+    """
+    if format_of(file_path) == "parquet":
+        return pd.read_parquet(file_path, columns=columns)
+    df = pd.read_csv(file_path, usecols=columns)
+    return df if columns is None else df[columns]
+
+
+def find_table(directory: pathlib.Path, name: str, fmt: Optional[str] = None) -> pathlib.Path:
+    """
+    Return the file of a table name in the preferred format, or in another one if it is missing.
+
+    Args:
+        directory (pathlib.Path): Folder holding the table.
+        name (str): Table file name without suffix (a suffix, if given, is ignored).
+        fmt (str, optional): Preferred format; defaults to DEFAULT_FORMAT (SMART_STORE_FORMAT).
+
+    Raises:
+        FileNotFoundError: If the table exists in no supported format.
+    """
+    stem = pathlib.Path(name).stem
+    preferred = fmt or DEFAULT_FORMAT
+    for candidate in [preferred] + [other for other in SUPPORTED_FORMATS if other != preferred]:
+        path = directory.joinpath(f"{stem}.{candidate}")
+        if path.exists() and (PARQUET_AVAILABLE or candidate != "parquet"):
+            return path
+    raise FileNotFoundError(f"No table named '{stem}' in {directory}")
+
+
+def widen_dtypes(dtypes: pd.Series, chunk: pd.DataFrame) -> pd.Series:
+    """
+    Return the column dtypes written so far, widened to hold a new chunk's numbers too.
+
+    A column that is int64 in one chunk and float64 in the next (a 7.5 after a 5, or a
+    missing value) becomes float64; int8 and int64 become int64. Other dtypes are kept.
+    """
+    widened = dtypes.copy()
+    for column, dtype in chunk.dtypes.items():
+        current = widened.get(column)
+        if (isinstance(current, np.dtype) and isinstance(dtype, np.dtype)
+                and current.kind in "iuf" and dtype.kind in "iuf"):
+            widened[column] = np.result_type(current, dtype)
+    return widened
+
+
+def _rewrite_parquet(writer, temp_path: pathlib.Path, schema):
+    """
+    Close a Parquet writer, copy the row groups it wrote into a new file with a wider
+    schema, and return a writer that continues that file.
+    """
+    writer.close()
+    narrow_path = temp_path.with_name(temp_path.name + ".narrow")
+    temp_path.replace(narrow_path)
+    try:
+        writer = pq.ParquetWriter(temp_path, schema, compression=PARQUET_COMPRESSION)
+        with pq.ParquetFile(narrow_path) as written:
+            for row_group in range(written.num_row_groups):
+                writer.write_table(written.read_row_group(row_group).cast(schema))
+    finally:
+        narrow_path.unlink()
+    return writer
+
+
+def write_table_chunks(chunks: Iterator[pd.DataFrame], file_path: pathlib.Path) -> int:
+    """
+    Write DataFrame chunks one after another to a single table and return the row count.
+
+    Parquet chunks become row groups of one schema, taken from the first chunk. When a later
+    chunk needs a wider number type (e.g. floats in a column that was all integers so far),
+    the row groups already written are rewritten once with the widened schema.
+    Rows go to a temporary file first and replace the target only after the last chunk.
+    """
+    fmt = format_of(file_path)
+    temp_path = file_path.with_name(file_path.name + ".tmp")
+    row_count = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            if fmt == "parquet":
+                if writer is None:
+                    dtypes = chunk.dtypes
+                    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                    writer = pq.ParquetWriter(temp_path, schema, compression=PARQUET_COMPRESSION)
+                else:
+                    widened = widen_dtypes(dtypes, chunk)
+                    if not widened.equals(dtypes):
+                        dtypes = widened
+                        schema = pa.Schema.from_pandas(chunk.head(0).astype(dtypes.to_dict()), preserve_index=False)
+                        writer = _rewrite_parquet(writer, temp_path, schema)
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            else:
+                chunk.to_csv(temp_path, mode="a" if row_count else "w", header=not row_count, index=False)
+            row_count += len(chunk)
+        if writer is not None:
+            writer.close()
+            writer = None
+        if not temp_path.exists():
+            # No rows at all: still write an empty table so downstream steps find it
+            write_table(pd.DataFrame(), temp_path.with_name(file_path.name))
+        else:
+            temp_path.replace(file_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if temp_path.exists():
+            temp_path.unlink()
+    return row_count